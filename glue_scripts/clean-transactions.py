@@ -4,30 +4,56 @@ from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
 from awsglue.context import GlueContext
 from awsglue.job import Job
-from pyspark.sql.functions import col, hour, to_timestamp
-from pyspark.sql.types import DoubleType
+from pyspark.sql.functions import expr
+from transaction_schema import read_transactions, split_transactions
 
-args = getResolvedOptions(sys.argv, ['JOB_NAME', 'INPUT_PATH', 'OUTPUT_PATH'])
+# --PARTITION_BY_HOUR true adds an hour level under each date partition;
+# --QUARANTINE_PATH defaults to a sibling of OUTPUT_PATH;
+# --WRITERS_PER_PARTITION is how many tasks write each date (or hour) in parallel
+OPTIONAL_ARGS = [name for name in ['PARTITION_BY_HOUR', 'QUARANTINE_PATH', 'WRITERS_PER_PARTITION']
+                 if f'--{name}' in sys.argv]
+
+# Rows per Parquet file, so a busy day is still split into files readers can parallelize over
+MAX_RECORDS_PER_FILE = 1000000
+
+args = getResolvedOptions(sys.argv, ['JOB_NAME', 'INPUT_PATH', 'OUTPUT_PATH'] + OPTIONAL_ARGS)
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
 job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
-# Read CSV file
-df = spark.read.option("header", "true").csv(args['INPUT_PATH'])
+# Overwrite only the partitions this run writes; earlier days are left as they are
+spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
+
+partition_columns = ["transaction_date"]
+if args.get('PARTITION_BY_HOUR', 'false').lower() == 'true':
+    partition_columns.append("transaction_hour")
+
+quarantine_path = args.get('QUARANTINE_PATH') or args['OUTPUT_PATH'].rstrip('/') + '_quarantine/'
+writers_per_partition = int(args.get('WRITERS_PER_PARTITION', 8))
 
-# Drop rows with null or malformed values
-df_clean = df.dropna()
+# Read CSV file with the declared schema: amount and timestamp are typed in the
+# same pass, and rows that are malformed or missing a column are set aside
+df_clean, df_quarantined = split_transactions(read_transactions(spark, args['INPUT_PATH']))
 
-# Cast amount column to Double
-df_clean = df_clean.withColumn("amount", col("amount").cast(DoubleType()))
+# Write cleaned dataset in parquet format, one directory per date (and hour):
+# cleaned/transaction_date=2025-01-15/[transaction_hour=10/]part-*.parquet.
+# Repartitioning on the date columns alone would send a daily run's single date
+# through one task; a salt hashed from transaction_id spreads each date over
+# WRITERS_PER_PARTITION tasks (and files), and is stable across retries.
+salt = expr(f"pmod(hash(transaction_id), {writers_per_partition})")
+df_clean.repartition(*partition_columns, salt) \
+    .write.mode("overwrite") \
+    .option("maxRecordsPerFile", MAX_RECORDS_PER_FILE) \
+    .partitionBy(*partition_columns) \
+    .parquet(args['OUTPUT_PATH'])
 
-# Extract transaction_hour from timestamp
-df_clean = df_clean.withColumn("timestamp", to_timestamp(col("timestamp"), "yyyy-MM-dd HH:mm:ss"))
-df_clean = df_clean.withColumn("transaction_hour", hour(col("timestamp")))
+# Rejected rows, with the raw line and reason, for inspection and replay
+df_quarantined.write.mode("append") \
+    .partitionBy("quarantine_date") \
+    .json(quarantine_path)
 
-# Write cleaned dataset in parquet format
-df_clean.write.mode("overwrite").parquet(args['OUTPUT_PATH'])
+print(f"Quarantined {df_quarantined.count()} rows to {quarantine_path}")
 
-job.commit()
\ No newline at end of file
+job.commit()
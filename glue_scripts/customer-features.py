@@ -0,0 +1,43 @@
+import sys
+from datetime import date, timedelta
+from awsglue.transforms import *
+from awsglue.utils import getResolvedOptions
+from pyspark.context import SparkContext
+from awsglue.context import GlueContext
+from awsglue.job import Job
+from pyspark.sql.functions import col, lit
+from transaction_features import add_customer_features
+
+# --END_DATE defaults to today; --DAYS is how many dates up to it are rewritten;
+# --HISTORY_DAYS is how far back customer history is read for those dates
+OPTIONAL_ARGS = [name for name in ['END_DATE', 'DAYS', 'HISTORY_DAYS'] if f'--{name}' in sys.argv]
+
+args = getResolvedOptions(sys.argv, ['JOB_NAME', 'INPUT_PATH', 'OUTPUT_PATH'] + OPTIONAL_ARGS)
+sc = SparkContext()
+glueContext = GlueContext(sc)
+spark = glueContext.spark_session
+job = Job(glueContext)
+job.init(args['JOB_NAME'], args)
+
+# Overwrite only the dates this run computes
+spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
+
+end_date = date.fromisoformat(args['END_DATE']) if 'END_DATE' in args else date.today()
+first_date = end_date - timedelta(days=int(args.get('DAYS', 1)) - 1)
+history_start = first_date - timedelta(days=int(args.get('HISTORY_DAYS', 30)))
+
+# Read the cleaned transactions; the date filter prunes partitions, so only the
+# history window is listed and read, not the full dataset
+df = spark.read.parquet(args['INPUT_PATH']) \
+    .filter(col("transaction_date").between(lit(history_start), lit(end_date)))
+
+# Rolling per-customer features over the history window
+df_features = add_customer_features(df)
+
+# Write features for the requested dates only; history rows were context
+df_features.filter(col("transaction_date") >= lit(first_date)) \
+    .write.mode("overwrite") \
+    .partitionBy("transaction_date") \
+    .parquet(args['OUTPUT_PATH'])
+
+job.commit()
@@ -1,12 +1,17 @@
 import sys
+import boto3
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from pyspark.sql.functions import *
+from fraud_rules import apply_rules, load_rules
 
-args = getResolvedOptions(sys.argv, ['JOB_NAME', 'bucket-name'])
+# --RULES_PATH defaults to the rules config uploaded next to this script
+OPTIONAL_ARGS = [name for name in ['RULES_PATH'] if f'--{name}' in sys.argv]
+
+args = getResolvedOptions(sys.argv, ['JOB_NAME', 'bucket-name'] + OPTIONAL_ARGS)
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
@@ -15,15 +20,20 @@ job.init(args['JOB_NAME'], args)
 
 bucket_name = args['bucket_name']
 
+# Load and validate the rule definitions before touching the data
+rules_path = args.get('RULES_PATH') or f"s3://{bucket_name}/scripts/fraud_rules.json"
+rules_bucket, rules_key = rules_path[len('s3://'):].split('/', 1)
+rules = load_rules(boto3.client('s3').get_object(Bucket=rules_bucket, Key=rules_key)['Body'].read())
+print(f"Loaded {len(rules)} fraud rules from {rules_path}: {', '.join(rule['name'] for rule in rules)}")
+
 # Read transactions data
 df = spark.read.option("header", "true").csv(f"s3://{bucket_name}/input/transactions.csv")
 
-# Basic fraud detection logic
-fraud_df = df.withColumn("is_fraud", 
-    when((col("amount") > 1500) | (col("country") != "US"), 1).otherwise(0)
-)
+# Rule-based fraud detection: every rule in one projection, with the names of
+# the rules each transaction matched in fired_rules
+fraud_df = apply_rules(df, rules)
 
 # Write results
 fraud_df.write.mode("overwrite").option("header", "true").csv(f"s3://{bucket_name}/output/fraud_results/")
 
-job.commit()
\ No newline at end of file
+job.commit()
@@ -0,0 +1,93 @@
+import json
+
+# Condition keys a rule may use; all conditions of one rule must hold for it to fire
+CONDITIONS = (
+    'amount_above', 'amount_below',
+    'country_in', 'country_not_in',
+    'merchant_category_in', 'merchant_category_not_in',
+    'hour_between',
+)
+
+# List conditions: key -> (column, whether the value must be outside the list)
+MEMBERSHIP_CONDITIONS = {
+    'country_in': ('country', False),
+    'country_not_in': ('country', True),
+    'merchant_category_in': ('merchant_category', False),
+    'merchant_category_not_in': ('merchant_category', True),
+}
+
+# Column listing the names of the rules a transaction matched, ';'-separated
+FIRED_RULES_COLUMN = 'fired_rules'
+
+def load_rules(text):
+    """Validated rule definitions from the JSON rules config
+
+    {"rules": [{"name": "high_amount", "amount_above": 1500}, ...]}. Rules with
+    "enabled": false are dropped. Unknown condition keys, unnamed, duplicate or
+    condition-less rules raise ValueError before any data is read.
+    """
+    rules = []
+    names = set()
+    for rule in json.loads(text)['rules']:
+        name = rule.get('name')
+        if not name:
+            raise ValueError(f"Rule without a name: {rule}")
+        if name in names:
+            raise ValueError(f"Duplicate rule name: {name}")
+        names.add(name)
+
+        conditions = {key: value for key, value in rule.items() if key not in ('name', 'enabled', 'description')}
+        unknown = sorted(set(conditions) - set(CONDITIONS))
+        if unknown:
+            raise ValueError(f"Rule {name} has unknown conditions: {', '.join(unknown)}")
+        if not conditions:
+            raise ValueError(f"Rule {name} has no conditions")
+        if 'hour_between' in conditions and len(conditions['hour_between']) != 2:
+            raise ValueError(f"Rule {name}: hour_between takes [start, end]")
+
+        if rule.get('enabled', True):
+            rules.append({'name': name, 'conditions': conditions})
+    return rules
+
+def _condition(key, value):
+    from pyspark.sql import functions as F
+
+    amount = F.col('amount').cast('double')
+    if key == 'amount_above':
+        return amount > value
+    if key == 'amount_below':
+        return amount < value
+    if key == 'hour_between':
+        # Inclusive, wrapping past midnight when start > end (e.g. [22, 5])
+        start, end = value
+        hour = F.hour(F.col('timestamp'))
+        return hour.between(start, end) if start <= end else (hour >= start) | (hour <= end)
+
+    column, negate = MEMBERSHIP_CONDITIONS[key]
+    matched = F.col(column).isin(list(value))
+    return ~matched if negate else matched
+
+def compile_rules(rules):
+    """One Spark column naming every rule a row matches, '' when none do
+
+    Each rule becomes when(all its conditions, name), and concat_ws joins the
+    names while skipping the rules that did not fire, so dozens of rules are
+    still a single projection evaluated in one pass over the data.
+    """
+    from pyspark.sql import functions as F
+
+    fired = []
+    for rule in rules:
+        matched = None
+        for key, value in rule['conditions'].items():
+            condition = _condition(key, value)
+            matched = condition if matched is None else matched & condition
+        fired.append(F.when(matched, F.lit(rule['name'])))
+    return F.concat_ws(';', *fired) if fired else F.lit('')
+
+def apply_rules(df, rules):
+    """df with fired_rules and is_fraud (1 when any rule fired)"""
+    from pyspark.sql import functions as F
+
+    df = df.withColumn(FIRED_RULES_COLUMN, compile_rules(rules))
+    return df.withColumn('is_fraud', (F.col(FIRED_RULES_COLUMN) != '').cast('int'))
@@ -0,0 +1,162 @@
+import json
+import numpy as np
+from botocore.exceptions import ClientError
+
+# Model inputs, in the order the scorers stack them
+FEATURE_COLUMNS = ['amount', 'transaction_hour', 'country_encoded', 'category_encoded', 'day_of_week']
+
+# The RCF training data uses the first four (feature_dim 4 in the SageMaker job)
+RCF_FEATURE_COLUMNS = FEATURE_COLUMNS[:4]
+
+# Raw categorical column -> the feature holding its code
+CATEGORICAL_COLUMNS = {'country': 'country_encoded', 'merchant_category': 'category_encoded'}
+
+# Code for a category the encodings were never fitted on
+UNKNOWN_CODE = -1
+
+# Where training leaves the encodings for later scoring runs
+ENCODINGS_KEY = 'models/feature-encodings.json'
+
+class FeatureEncodings:
+    """Category -> integer code for each categorical column, persisted as JSON
+
+    A code never changes once assigned: refitting keeps existing codes and
+    appends unseen categories in sorted order, so a model trained on an earlier
+    fit still reads the same numbers. A first fit gives LabelEncoder's codes.
+    """
+
+    def __init__(self, vocabularies=None):
+        vocabularies = vocabularies or {}
+        self.vocabularies = {column: dict(vocabularies.get(column, {})) for column in CATEGORICAL_COLUMNS}
+
+    def fit(self, frame):
+        """Add the categories in frame that have no code yet"""
+        for column, codes in self.vocabularies.items():
+            for value in np.unique(_as_strings(frame[column])).tolist():
+                if value not in codes:
+                    codes[value] = len(codes)
+        return self
+
+    def encode(self, column, values):
+        """Codes for a column of values, UNKNOWN_CODE for unseen ones
+
+        One dictionary lookup per distinct value; rows are mapped by index.
+        """
+        distinct, inverse = np.unique(_as_strings(values), return_inverse=True)
+        codes = self.vocabularies[column]
+        lookup = np.array([codes.get(value, UNKNOWN_CODE) for value in distinct.tolist()], dtype=np.int64)
+        return lookup[inverse.reshape(-1)]
+
+    def to_json(self):
+        return json.dumps({'vocabularies': self.vocabularies}, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text)['vocabularies'])
+
+def _as_strings(values):
+    # Like the old astype(str): a missing category becomes 'nan' instead of failing
+    return np.asarray(values).astype(str)
+
+def time_features(timestamps):
+    """transaction_hour and day_of_week (Monday=0, as in pandas) from a timestamp column"""
+    seconds = np.asarray(timestamps, dtype='datetime64[s]').astype(np.int64)
+    # 1970-01-01 was a Thursday
+    return {'transaction_hour': seconds // 3600 % 24, 'day_of_week': (seconds // 86400 + 3) % 7}
+
+def compute_features(frame, encodings):
+    """Every model feature for a batch of transactions, column by column
+
+    frame is anything indexed by column name (a pandas DataFrame or a dict of
+    arrays); the result maps each FEATURE_COLUMNS name to a NumPy array.
+    """
+    features = {'amount': np.asarray(frame['amount'], dtype=np.float64)}
+    features.update(time_features(frame['timestamp']))
+    for column, feature in CATEGORICAL_COLUMNS.items():
+        features[feature] = encodings.encode(column, frame[column])
+    return features
+
+def feature_matrix(features, columns=FEATURE_COLUMNS):
+    """Features stacked into the float matrix the models take, one row per transaction"""
+    return np.column_stack([features[column] for column in columns]).astype(np.float64)
+
+def load_encodings(s3, bucket, key=ENCODINGS_KEY):
+    """The persisted encodings, or empty ones before the first training run"""
+    try:
+        obj = s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return FeatureEncodings()
+        raise
+    return FeatureEncodings.from_json(obj['Body'].read())
+
+def save_encodings(s3, bucket, encodings, key=ENCODINGS_KEY):
+    s3.put_object(Bucket=bucket, Key=key, Body=encodings.to_json(), ContentType='application/json')
+
+def add_spark_features(df, encodings=None):
+    """The same features as columns of a Spark DataFrame with a typed timestamp
+
+    Time features are always added; the encoded columns only when fitted
+    encodings are given, as a map lookup so no Python UDF runs per row.
+    """
+    from pyspark.sql import functions as F
+
+    # Spark's dayofweek is Sunday=1 .. Saturday=7
+    df = df.withColumn('transaction_hour', F.hour('timestamp')) \
+        .withColumn('day_of_week', (F.dayofweek('timestamp') + 5) % 7)
+
+    if encodings is not None:
+        for column, feature in CATEGORICAL_COLUMNS.items():
+            codes = encodings.vocabularies[column]
+            if codes:
+                mapping = F.create_map(*[F.lit(part) for pair in codes.items() for part in pair])
+                code = F.coalesce(mapping[F.col(column).cast('string')], F.lit(UNKNOWN_CODE))
+            else:
+                code = F.lit(UNKNOWN_CODE)
+            df = df.withColumn(feature, code)
+    return df
+
+# Per-customer behaviour, from the customer's own earlier transactions
+CUSTOMER_FEATURE_COLUMNS = ['txn_count_1h', 'txn_count_24h', 'amount_zscore', 'is_new_country']
+
+def add_customer_features(df):
+    """Rolling per-customer features on a Spark DataFrame with a typed timestamp
+
+    - txn_count_1h / txn_count_24h: this customer's transactions in the hour /
+      day up to and including this one
+    - amount_zscore: amount against the mean and standard deviation of the
+      customer's earlier amounts (0 until there are two to compare with)
+    - is_new_country: 1 when an existing customer transacts from a country
+      they have not used before
+
+    Every window is partitioned by customer_id first. After the one shuffle
+    on customer_id, the (customer_id, country) window needs only a sort, since
+    data clustered by customer is already clustered by customer and country.
+    Work therefore grows with the rows per partition, not with the number of
+    customers.
+    """
+    from pyspark.sql import Window
+    from pyspark.sql import functions as F
+
+    seconds = F.col('timestamp').cast('long')
+    # Range frames take a single numeric ordering; the row-based ones break
+    # same-second ties on transaction_id so reruns give the same answer
+    by_time = Window.partitionBy('customer_id').orderBy(seconds)
+    by_customer = Window.partitionBy('customer_id').orderBy(seconds, 'transaction_id')
+    by_country = Window.partitionBy('customer_id', 'country').orderBy(seconds, 'transaction_id')
+    history = by_customer.rowsBetween(Window.unboundedPreceding, -1)
+
+    df = df.repartition('customer_id')
+    df = df.withColumn('txn_count_1h', F.count(F.lit(1)).over(by_time.rangeBetween(-3600, 0))) \
+        .withColumn('txn_count_24h', F.count(F.lit(1)).over(by_time.rangeBetween(-86400, 0))) \
+        .withColumn('_history_mean', F.avg('amount').over(history)) \
+        .withColumn('_history_stddev', F.stddev_samp('amount').over(history)) \
+        .withColumn('_customer_seq', F.row_number().over(by_customer)) \
+        .withColumn('_country_seq', F.row_number().over(by_country))
+
+    zscore = (F.col('amount') - F.col('_history_mean')) / F.col('_history_stddev')
+    return df.withColumn('amount_zscore',
+                         F.when(F.col('_history_stddev') > 0, zscore).otherwise(F.lit(0.0))) \
+        .withColumn('is_new_country',
+                    ((F.col('_country_seq') == 1) & (F.col('_customer_seq') > 1)).cast('int')) \
+        .drop('_history_mean', '_history_stddev', '_customer_seq', '_country_seq')
@@ -0,0 +1,63 @@
+from pyspark.sql.functions import coalesce, col, current_date, lit, to_date, when
+from pyspark.sql.types import DoubleType, StringType, StructField, StructType, TimestampType
+from transaction_features import add_spark_features
+
+# Raw text of rows Spark could not parse against the schema
+CORRUPT_RECORD_COLUMN = "_corrupt_record"
+
+TIMESTAMP_FORMAT = "yyyy-MM-dd HH:mm:ss"
+
+# Columns of input/transactions.csv as written by upload-transactions.py, typed at read time
+TRANSACTION_SCHEMA = StructType([
+    StructField("transaction_id", StringType(), True),
+    StructField("customer_id", StringType(), True),
+    StructField("amount", DoubleType(), True),
+    StructField("country", StringType(), True),
+    StructField("merchant_category", StringType(), True),
+    StructField("timestamp", TimestampType(), True),
+])
+
+# Every column must be present for a row to be kept
+REQUIRED_COLUMNS = [field.name for field in TRANSACTION_SCHEMA.fields]
+
+def read_transactions(spark, path, schema=TRANSACTION_SCHEMA):
+    """Parse the transactions CSV once against the declared schema
+
+    No inference pass and no string-then-cast step: amounts and timestamps are
+    converted while the file is read. Rows that do not fit keep their raw line
+    in CORRUPT_RECORD_COLUMN instead of failing the job.
+    """
+    return spark.read \
+        .option("header", "true") \
+        .option("mode", "PERMISSIVE") \
+        .option("columnNameOfCorruptRecord", CORRUPT_RECORD_COLUMN) \
+        .option("timestampFormat", TIMESTAMP_FORMAT) \
+        .schema(StructType(schema.fields + [StructField(CORRUPT_RECORD_COLUMN, StringType(), True)])) \
+        .csv(path)
+
+def quarantine_reason():
+    """Why a parsed row is rejected ('malformed' or 'missing_<column>'), null for a good row"""
+    checks = [when(col(CORRUPT_RECORD_COLUMN).isNotNull(), lit("malformed"))]
+    checks += [when(col(column).isNull(), lit(f"missing_{column}")) for column in REQUIRED_COLUMNS]
+    return coalesce(*checks)
+
+def split_transactions(parsed):
+    """(clean, quarantined) DataFrames from one parse of the input
+
+    The tagged rows are cached, so both outputs are produced from a single read
+    of the CSV; Spark also refuses to filter on the corrupt record column of an
+    uncached CSV scan. Clean rows gain transaction_date plus transaction_hour and
+    day_of_week from the shared feature pipeline; quarantined rows keep the raw
+    line, the reason and the date they were set aside.
+    """
+    tagged = parsed.withColumn("quarantine_reason", quarantine_reason()).cache()
+
+    clean = tagged.filter(col("quarantine_reason").isNull()) \
+        .drop(CORRUPT_RECORD_COLUMN, "quarantine_reason") \
+        .withColumn("transaction_date", to_date(col("timestamp")))
+    clean = add_spark_features(clean)
+
+    quarantined = tagged.filter(col("quarantine_reason").isNotNull()) \
+        .withColumn("quarantine_date", current_date())
+
+    return clean, quarantined
@@ -0,0 +1,153 @@
+import heapq
+import sys
+from array import array
+from alert_scan import scan_items
+from alert_metrics import CRITICAL_SCORE, HIGH_SCORE, MODERATE_SCORE
+
+try:
+    import numpy as np
+except ImportError:
+    # The Lambda runtime has no NumPy layer; the array('d') fallbacks cover it
+    np = None
+
+# Attributes held as columns; scans only need to project these
+COLUMN_ATTRIBUTES = ('transaction_id', 'customer_id', 'amount', 'anomaly_score', 'timestamp', 'status')
+
+class AlertColumns:
+    """Fraud alerts stored column by column instead of as one dict per item
+
+    amount and anomaly_score are converted from Decimal exactly once, into
+    array('d') columns; customer IDs are dictionary encoded as integer codes and
+    statuses are interned. With NumPy installed, sorts, sums, bucket counts and
+    top-K run vectorized on zero-copy views of the arrays.
+    """
+
+    def __init__(self):
+        self.transaction_ids = []
+        self.timestamps = []
+        self.statuses = []
+        self.amounts = array('d')
+        self.scores = array('d')
+        self.customer_codes = array('l')
+        self.customers = []
+        self._customer_codes = {}
+
+    @classmethod
+    def from_items(cls, items):
+        columns = cls()
+        for item in items:
+            columns.append(item)
+        return columns
+
+    def __len__(self):
+        return len(self.scores)
+
+    def append(self, item):
+        """Add one scanned alert item"""
+        customer = item.get('customer_id')
+        code = self._customer_codes.get(customer)
+        if code is None:
+            code = self._customer_codes[customer] = len(self.customers)
+            self.customers.append(customer)
+
+        status = item.get('status')
+        self.transaction_ids.append(item.get('transaction_id'))
+        self.timestamps.append(item.get('timestamp'))
+        self.statuses.append(sys.intern(status) if status is not None else None)
+        self.amounts.append(float(item.get('amount', 0)))
+        self.scores.append(float(item['anomaly_score']))
+        self.customer_codes.append(code)
+
+    def row(self, index):
+        """One alert as a dict with float amount and score, for rendering"""
+        return {
+            'transaction_id': self.transaction_ids[index],
+            'customer_id': self.customers[self.customer_codes[index]],
+            'amount': self.amounts[index],
+            'anomaly_score': self.scores[index],
+            'timestamp': self.timestamps[index],
+            'status': self.statuses[index]
+        }
+
+    def _view(self, column):
+        values = getattr(self, column)
+        return np.frombuffer(values, dtype=np.float64) if np is not None else values
+
+    def total(self, column='scores'):
+        if np is not None:
+            return float(self._view(column).sum())
+        return sum(getattr(self, column))
+
+    def maximum(self, column='scores'):
+        if not len(self):
+            return None
+        return float(self._view(column).max()) if np is not None else max(getattr(self, column))
+
+    def minimum(self, column='scores'):
+        if not len(self):
+            return None
+        return float(self._view(column).min()) if np is not None else min(getattr(self, column))
+
+    def count_above(self, threshold, column='scores'):
+        if np is not None:
+            return int(np.count_nonzero(self._view(column) > threshold))
+        return sum(1 for value in getattr(self, column) if value > threshold)
+
+    def bucket_counts(self):
+        """Alerts per risk bucket, same boundaries as the metrics item"""
+        critical = self.count_above(CRITICAL_SCORE)
+        high = self.count_above(HIGH_SCORE)
+        moderate = self.count_above(MODERATE_SCORE)
+        return {'critical': critical, 'high': high - critical, 'moderate': moderate - high}
+
+    def sorted_indices(self, column='scores', reverse=False):
+        """Row indices ordered by a numeric column; ties keep scan order"""
+        if np is not None:
+            values = self._view(column)
+            return np.argsort(-values if reverse else values, kind='stable').tolist()
+        values = getattr(self, column)
+        return sorted(range(len(values)), key=values.__getitem__, reverse=reverse)
+
+    def top_indices(self, k):
+        """Row indices of the k highest scores, highest first, ties in scan order like top_k"""
+        n = len(self)
+        if k <= 0 or not n:
+            return []
+        if np is None or k >= n:
+            return heapq.nlargest(k, range(n), key=self.scores.__getitem__)
+
+        # O(n) selection of the k-th largest score, then order only the k winners
+        scores = self._view('scores')
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        chosen = np.concatenate((above, ties))
+        return chosen[np.lexsort((chosen, -scores[chosen]))].tolist()
+
+    def top_rows(self, k):
+        return [self.row(index) for index in self.top_indices(k)]
+
+    def best_row_per_customer(self):
+        """For each customer, in first-seen order, the row index of their highest score"""
+        if not len(self):
+            return []
+        if np is not None:
+            scores = self._view('scores')
+            codes = np.frombuffer(self.customer_codes, dtype=f'i{self.customer_codes.itemsize}')
+            best = np.full(len(self.customers), -np.inf)
+            np.maximum.at(best, codes, scores)
+            # First row reaching each customer's maximum
+            candidates = np.flatnonzero(scores == best[codes])
+            _, first = np.unique(codes[candidates], return_index=True)
+            return candidates[first].tolist()
+
+        best_rows = [None] * len(self.customers)
+        for index, (code, score) in enumerate(zip(self.customer_codes, self.scores)):
+            current = best_rows[code]
+            if current is None or score > self.scores[current]:
+                best_rows[code] = index
+        return best_rows
+
+def load_alert_columns(table, segments=1):
+    """Scan the fraud alerts table straight into columns, converting each value once"""
+    return AlertColumns.from_items(scan_items(table, attributes=COLUMN_ATTRIBUTES, segments=segments))
@@ -0,0 +1,227 @@
+import hashlib
+import math
+import threading
+from datetime import datetime
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# The single summary item maintained by the processor in the METRICS_TABLE table
+METRICS_KEY = {'metric_id': 'alerts-summary'}
+
+# Risk buckets reported by the investigator's summary
+CRITICAL_SCORE = 5.0
+HIGH_SCORE = 4.0
+MODERATE_SCORE = 2.5
+
+# HyperLogLog sketch of unique customers: 2^10 registers, about 3% standard error
+SKETCH_PRECISION = 10
+SKETCH_REGISTERS = 1 << SKETCH_PRECISION
+
+def risk_bucket(score):
+    """Risk bucket name for an anomaly score, or None below the moderate threshold"""
+    if score > CRITICAL_SCORE:
+        return 'critical'
+    if score > HIGH_SCORE:
+        return 'high'
+    if score > MODERATE_SCORE:
+        return 'moderate'
+    return None
+
+def sketch_register(customer_id):
+    """HyperLogLog (register, rank) pair for a customer ID"""
+    hashed = int.from_bytes(hashlib.blake2b(customer_id.encode('utf-8'), digest_size=8).digest(), 'big')
+    register = hashed & (SKETCH_REGISTERS - 1)
+    remaining_bits = 64 - SKETCH_PRECISION
+    rank = remaining_bits - (hashed >> SKETCH_PRECISION).bit_length() + 1
+    return register, rank
+
+def estimate_cardinality(sketch):
+    """Estimate unique customers from stored sketch entries
+
+    Each entry encodes register * 64 + rank. DynamoDB can only union number
+    sets atomically, not take a per-register max, so the max is taken here.
+    """
+    registers = [0] * SKETCH_REGISTERS
+    for entry in sketch:
+        register, rank = divmod(int(entry), 64)
+        registers[register] = max(registers[register], rank)
+
+    m = SKETCH_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -rank for rank in registers)
+
+    # Linear counting is far more accurate while many registers are still empty
+    empty = registers.count(0)
+    if estimate <= 2.5 * m and empty:
+        estimate = m * math.log(m / empty)
+
+    return int(round(estimate))
+
+class AlertMetrics:
+    """Running aggregates over the alerts written by one processor run
+
+    add() is called from the writer threads as alerts are stored; flush() then
+    folds the run into the summary item with a single atomic UpdateItem, so
+    concurrent processor runs never lose each other's counts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.total_alerts = 0
+        self.total_amount = Decimal(0)
+        self.total_score = Decimal(0)
+        self.max_score = None
+        self.max_transaction_id = None
+        self.buckets = {'critical': 0, 'high': 0, 'moderate': 0}
+        self.sketch = {}
+
+    def add(self, items):
+        """Fold written alert items into the running aggregates"""
+        with self._lock:
+            for item in items:
+                score = Decimal(str(item['anomaly_score']))
+                self.total_alerts += 1
+                self.total_amount += Decimal(str(item['amount']))
+                self.total_score += score
+                if self.max_score is None or score > self.max_score:
+                    self.max_score = score
+                    self.max_transaction_id = item['transaction_id']
+
+                bucket = risk_bucket(float(score))
+                if bucket:
+                    self.buckets[bucket] += 1
+
+                register, rank = sketch_register(item['customer_id'])
+                if rank > self.sketch.get(register, 0):
+                    self.sketch[register] = rank
+
+    def flush(self, table):
+        """Atomically add the pending aggregates to the summary item and start over"""
+        with self._lock:
+            if not self.total_alerts:
+                return False
+
+            table.update_item(
+                Key=METRICS_KEY,
+                UpdateExpression=(
+                    'ADD total_alerts :alerts, total_amount :amount, total_score :score, '
+                    'critical_alerts :critical, high_alerts :high, moderate_alerts :moderate, '
+                    'customer_sketch :sketch, #version :one '
+                    'SET updated_at = :now, max_score = if_not_exists(max_score, :max), '
+                    'max_transaction_id = if_not_exists(max_transaction_id, :txn)'
+                ),
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={
+                    ':alerts': self.total_alerts,
+                    ':amount': self.total_amount,
+                    ':score': self.total_score,
+                    ':critical': self.buckets['critical'],
+                    ':high': self.buckets['high'],
+                    ':moderate': self.buckets['moderate'],
+                    ':sketch': {register * 64 + rank for register, rank in self.sketch.items()},
+                    ':one': 1,
+                    ':now': datetime.now().isoformat(),
+                    ':max': self.max_score,
+                    ':txn': self.max_transaction_id
+                }
+            )
+
+            # The first flush sets max_score with the totals above; there is no atomic
+            # max, so later flushes only raise it if theirs is higher
+            try:
+                table.update_item(
+                    Key=METRICS_KEY,
+                    UpdateExpression='SET max_score = :max, max_transaction_id = :txn',
+                    ConditionExpression='attribute_not_exists(max_score) OR max_score < :max',
+                    ExpressionAttributeValues={':max': self.max_score, ':txn': self.max_transaction_id}
+                )
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+
+            self._reset()
+            return True
+
+    def overwrite(self, table):
+        """Replace the summary item's totals with the pending aggregates in one UpdateItem
+
+        Used when the aggregates were recomputed from the whole table. The version
+        keeps counting up rather than restarting, so caches keyed on it never see
+        an old version string again.
+        """
+        with self._lock:
+            assignments = [
+                'total_alerts = :alerts', 'total_amount = :amount', 'total_score = :score',
+                'critical_alerts = :critical', 'high_alerts = :high', 'moderate_alerts = :moderate',
+                'updated_at = :now'
+            ]
+            values = {
+                ':alerts': self.total_alerts,
+                ':amount': self.total_amount,
+                ':score': self.total_score,
+                ':critical': self.buckets['critical'],
+                ':high': self.buckets['high'],
+                ':moderate': self.buckets['moderate'],
+                ':one': 1,
+                ':now': datetime.now().isoformat()
+            }
+            removals = []
+
+            # DynamoDB rejects empty sets, and an empty table has no maximum
+            if self.sketch:
+                assignments.append('customer_sketch = :sketch')
+                values[':sketch'] = {register * 64 + rank for register, rank in self.sketch.items()}
+            else:
+                removals.append('customer_sketch')
+            if self.max_score is not None:
+                assignments += ['max_score = :max', 'max_transaction_id = :txn']
+                values[':max'] = self.max_score
+                values[':txn'] = self.max_transaction_id
+            else:
+                removals += ['max_score', 'max_transaction_id']
+
+            expression = 'SET ' + ', '.join(assignments) + ' ADD #version :one'
+            if removals:
+                expression += ' REMOVE ' + ', '.join(removals)
+
+            table.update_item(
+                Key=METRICS_KEY,
+                UpdateExpression=expression,
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues=values
+            )
+            self._reset()
+
+def read_metrics(table):
+    """Summary aggregates from the metrics item, or None if nothing has been recorded yet"""
+    item = table.get_item(Key=METRICS_KEY).get('Item')
+    if not item or not item.get('total_alerts'):
+        return None
+
+    return {
+        'total_alerts': int(item['total_alerts']),
+        'total_amount': float(item.get('total_amount', 0)),
+        'total_score': float(item.get('total_score', 0)),
+        'max_score': float(item['max_score']) if 'max_score' in item else None,
+        'critical': int(item.get('critical_alerts', 0)),
+        'high': int(item.get('high_alerts', 0)),
+        'moderate': int(item.get('moderate_alerts', 0)),
+        'unique_customers': estimate_cardinality(item.get('customer_sketch', ())),
+        'version': int(item.get('version', 0))
+    }
+
+def metrics_version(table):
+    """Version counter bumped by every processor flush, for invalidating cached snapshots"""
+    try:
+        item = table.get_item(
+            Key=METRICS_KEY,
+            ProjectionExpression='#v',
+            ExpressionAttributeNames={'#v': 'version'}
+        ).get('Item')
+    except ClientError as e:
+        print(f"Could not read metrics version: {str(e)}")
+        return None
+    return int(item['version']) if item and 'version' in item else None
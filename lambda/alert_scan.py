@@ -0,0 +1,186 @@
+import heapq
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from boto3.dynamodb.conditions import Key
+
+# Marks a segment worker as finished in the parallel scan page queue
+_SEGMENT_DONE = object()
+
+# GSI keyed on score_shard with anomaly_score as sort key ('' disables the query path)
+SCORE_INDEX = os.environ.get('SCORE_INDEX', 'score-index')
+
+# GSI keyed on customer_id for per-customer lookups
+CUSTOMER_INDEX = os.environ.get('CUSTOMER_INDEX', 'customer-index')
+
+# Alerts are spread over this many score_shard partitions to avoid a hot GSI key
+SCORE_SHARDS = int(os.environ.get('SCORE_SHARDS', 4))
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+MAX_BATCH_GET_RETRIES = int(os.environ.get('MAX_BATCH_GET_RETRIES', 5))
+BATCH_GET_BACKOFF_SECONDS = float(os.environ.get('BATCH_GET_BACKOFF_SECONDS', 0.05))
+
+def score_shard(transaction_id, shards=SCORE_SHARDS):
+    """Stable score-index partition for an alert; must match between writer and readers"""
+    return str(zlib.crc32(transaction_id.encode('utf-8')) % shards)
+
+def _projection_args(attributes):
+    # Attribute names go through placeholders since e.g. 'timestamp' and 'status' are reserved words
+    names = {f'#p{i}': attribute for i, attribute in enumerate(attributes)}
+    return {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
+
+def scan_pages(scan, **kwargs):
+    """Yield every page of a scan or query call, following LastEvaluatedKey until exhausted"""
+    while True:
+        response = scan(**kwargs)
+        yield response
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+
+def scan_items(table, attributes=None, segments=1):
+    """Stream every item in the table one page at a time
+
+    attributes limits the transferred attributes with a projection expression.
+    segments > 1 runs a parallel segmented scan, one thread per segment.
+    """
+    kwargs = _projection_args(attributes) if attributes else {}
+
+    if segments <= 1:
+        for page in scan_pages(table.scan, **kwargs):
+            yield from page.get('Items', [])
+        return
+
+    yield from _parallel_scan_items(table, kwargs, segments)
+
+def count_items(table):
+    """Count items with Select=COUNT so no item data is transferred"""
+    total = 0
+    for page in scan_pages(table.scan, Select='COUNT'):
+        total += page.get('Count', len(page.get('Items', [])))
+    return total
+
+def score_of(item):
+    """Sort key for alerts by anomaly score"""
+    return float(item['anomaly_score'])
+
+def top_k(items, k, key=score_of):
+    """Return the k highest items (highest first) from any iterable, e.g. a scan stream
+
+    Keeps a bounded heap of k items, so it costs O(n log k) time and O(k) memory
+    rather than sorting everything, and breaks ties like sorted(..., reverse=True).
+    """
+    return heapq.nlargest(k, items, key=key)
+
+def query_top_scores(table, k, attributes=None, index_name=SCORE_INDEX, shards=SCORE_SHARDS):
+    """Return the k highest-scoring alerts by reading at most k items per score shard"""
+    kwargs = _projection_args(attributes) if attributes else {}
+    shard_tops = []
+
+    for shard in range(shards):
+        items = []
+        query_args = dict(
+            kwargs,
+            IndexName=index_name,
+            KeyConditionExpression=Key('score_shard').eq(str(shard)),
+            ScanIndexForward=False,
+            Limit=k
+        )
+        for page in scan_pages(table.query, **query_args):
+            items.extend(page.get('Items', []))
+            if len(items) >= k:
+                break
+        shard_tops.append(items[:k])
+
+    # Each shard is already in descending score order; merge and keep the overall top k
+    merged = heapq.merge(*shard_tops, key=score_of, reverse=True)
+    return [item for _, item in zip(range(k), merged)]
+
+def query_customer_alerts(table, customer_id, attributes=None, index_name=CUSTOMER_INDEX):
+    """Stream every alert for one customer with an indexed query instead of a table scan"""
+    kwargs = _projection_args(attributes) if attributes else {}
+    kwargs.update(IndexName=index_name, KeyConditionExpression=Key('customer_id').eq(customer_id))
+
+    for page in scan_pages(table.query, **kwargs):
+        yield from page.get('Items', [])
+
+def batch_get_alerts(table, transaction_ids, attributes=None, max_retries=MAX_BATCH_GET_RETRIES,
+                     backoff_seconds=BATCH_GET_BACKOFF_SECONDS):
+    """Fetch alerts by transaction ID in 100-key BatchGetItem calls
+
+    Returns a dict of transaction ID to item; IDs with no alert are simply absent.
+    Unprocessed keys are retried with jittered exponential backoff, so N IDs cost
+    about ceil(N / 100) round trips instead of N.
+    """
+    client = table.meta.client
+    extra = _projection_args(('transaction_id',) + tuple(attributes)) if attributes else {}
+    unique_ids = list(dict.fromkeys(transaction_ids))
+    found = {}
+
+    for start in range(0, len(unique_ids), BATCH_GET_SIZE):
+        keys = [{'transaction_id': transaction_id} for transaction_id in unique_ids[start:start + BATCH_GET_SIZE]]
+        attempt = 0
+
+        while keys:
+            response = client.batch_get_item(RequestItems={table.name: dict(extra, Keys=keys)})
+            for item in response.get('Responses', {}).get(table.name, []):
+                found[item['transaction_id']] = item
+
+            keys = response.get('UnprocessedKeys', {}).get(table.name, {}).get('Keys', [])
+            if keys:
+                if attempt >= max_retries:
+                    raise RuntimeError(f"{len(keys)} transactions still unprocessed after {attempt} retries")
+                time.sleep(random.uniform(0, backoff_seconds * (2 ** attempt)))
+                attempt += 1
+
+    return found
+
+def _parallel_scan_items(table, kwargs, segments):
+    # Segment workers use the table's low-level client, which is thread safe unlike the resource
+    client = table.meta.client
+    pages = queue.Queue(maxsize=segments * 2)
+    stop = threading.Event()
+
+    def put(value):
+        # Give up if the consumer stopped early so workers never block forever
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment):
+        try:
+            for page in scan_pages(client.scan, TableName=table.name, Segment=segment,
+                                   TotalSegments=segments, **kwargs):
+                if not put(page.get('Items', [])):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    workers = [threading.Thread(target=scan_segment, args=(segment,), daemon=True) for segment in range(segments)]
+    for worker in workers:
+        worker.start()
+
+    finished = 0
+    try:
+        while finished < segments:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                finished += 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop.set()
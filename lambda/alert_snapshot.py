@@ -0,0 +1,135 @@
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from alert_scan import scan_items
+from alert_columns import AlertColumns, COLUMN_ATTRIBUTES
+
+# Every attribute any investigator query reads, so one scan can answer them all
+SNAPSHOT_ATTRIBUTES = COLUMN_ATTRIBUTES
+
+# Seconds a snapshot is served before rescanning; 0 disables the cache
+SNAPSHOT_TTL_SECONDS = float(os.environ.get('SNAPSHOT_TTL_SECONDS', 30))
+
+# Tables larger than this are never held in memory; queries stream scans instead
+SNAPSHOT_MAX_ITEMS = int(os.environ.get('SNAPSHOT_MAX_ITEMS', 200000))
+
+class AlertSnapshotCache:
+    """In-process columnar copy of the fraud alerts table shared by every query while fresh
+
+    A snapshot is reused until it is older than ttl_seconds or, when a
+    version_source callable is given, until the version it returns changes.
+    Inside pinned() every get() after the first returns the same snapshot without checking.
+    """
+
+    def __init__(self, table, ttl_seconds=SNAPSHOT_TTL_SECONDS, max_items=SNAPSHOT_MAX_ITEMS,
+                 segments=1, version_source=None):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.segments = segments
+        self.version_source = version_source
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._items = None
+        self._loaded_at = None
+        self._version = None
+        self._fingerprint = None
+        self._pinned = False
+        self._pin_taken = False
+
+    def get(self):
+        """Return the cached alerts, rescanning if stale; None if caching is off or the table is too large"""
+        if self._pinned and self._pin_taken:
+            if self._items is not None:
+                self.hits += 1
+            return self._items
+
+        if self.ttl_seconds <= 0 and not self._pinned:
+            return None
+
+        now = time.monotonic()
+        version = self.version_source() if self.version_source else None
+        self._pin_taken = self._pinned
+
+        if self.ttl_seconds > 0 and self._is_fresh(now, version):
+            if self._items is not None:
+                self.hits += 1
+            return self._items
+
+        self.misses += 1
+        self._load(now, version)
+        return self._items
+
+    @contextmanager
+    def pinned(self):
+        """Serve one snapshot to every get() in the block, e.g. a batch of questions
+
+        Nothing is scanned on entry: the first get() in the block refreshes the
+        snapshot if stale (even when the TTL is 0, so a batch still shares a single
+        scan) and later get() calls reuse it. A block whose questions never need the
+        snapshot never scans.
+        """
+        self._pinned = True
+        self._pin_taken = False
+        try:
+            yield self
+        finally:
+            self._pinned = False
+            self._pin_taken = False
+            if self.ttl_seconds <= 0:
+                # Caching is off outside batches, so do not hold on to the items
+                self._items = None
+                self._loaded_at = None
+
+    def fingerprint(self):
+        """Digest of the held snapshot's contents, or None when no snapshot is held
+
+        Derived from the data alone and independent of scan order, so containers
+        holding the same alerts report the same value and different alerts differ.
+        """
+        if self._items is None:
+            return None
+        return self._fingerprint
+
+    def invalidate(self):
+        """Force the next get() to rescan the table"""
+        self._loaded_at = None
+
+    def stats(self):
+        """Hit/miss counters and snapshot state for responses and logs"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'items': len(self._items) if self._items is not None else None,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None
+        }
+
+    def _is_fresh(self, now, version):
+        return (
+            self._loaded_at is not None
+            and now - self._loaded_at < self.ttl_seconds
+            and version == self._version
+        )
+
+    def _load(self, now, version):
+        items = AlertColumns()
+        # Summing per-item digests makes the fingerprint independent of segment order
+        digest_sum = 0
+        for item in scan_items(self.table, attributes=SNAPSHOT_ATTRIBUTES, segments=self.segments):
+            items.append(item)
+            digest = hashlib.blake2b(repr(sorted(item.items())).encode('utf-8'), digest_size=8).digest()
+            digest_sum = (digest_sum + int.from_bytes(digest, 'big')) % (1 << 64)
+            if len(items) > self.max_items:
+                print(f"Alert snapshot exceeds {self.max_items} items; streaming scans instead")
+                items = None
+                break
+
+        # An oversized table is remembered for the TTL too, so it is not rescanned per query
+        self.loads += 1
+        self._items = items
+        self._fingerprint = f"snapshot-{len(items)}-{digest_sum:016x}" if items is not None else None
+        self._loaded_at = now
+        self._version = version
@@ -0,0 +1,132 @@
+import json
+import os
+import time
+from collections import OrderedDict, namedtuple
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# Seconds an answer is reused for the same normalized question; 0 disables the cache
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get('ANSWER_CACHE_TTL_SECONDS', 10))
+
+# Distinct questions kept per container by the in-memory backend
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 256))
+
+# One cached answer: the data version it was computed at and when it was stored/expires (epoch seconds)
+CacheEntry = namedtuple('CacheEntry', ['version', 'value', 'stored_at', 'expires_at'])
+
+# The parts of a parsed question each intent's answer depends on; everything
+# else in the wording is ignored, so "fraud summary" and "summary of metrics" share an entry
+INTENT_PARAMETERS = {
+    'top_anomalous': lambda parsed: parsed.limit,
+    'customer_alerts': lambda parsed: parsed.customer_ids[0],
+    'explain_transaction': lambda parsed: ','.join(dict.fromkeys(parsed.transaction_ids)),
+}
+
+def cache_key(parsed, response_format):
+    """Normalized key for a parsed question: intent, format and the parameters the intent uses"""
+    parameter = INTENT_PARAMETERS.get(parsed.intent)
+    parts = [parsed.intent, response_format]
+    if parameter:
+        parts.append(str(parameter(parsed)))
+    return '|'.join(parts)
+
+class MemoryCacheBackend:
+    """Per-container LRU of cache entries"""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class DynamoDBCacheBackend:
+    """Cache entries shared by every container, one item per key in the answer cache table
+
+    expires_at is the table's TTL attribute, so DynamoDB deletes old answers itself.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, key):
+        item = self.table.get_item(Key={'cache_key': key}).get('Item')
+        if not item:
+            return None
+        version = item.get('data_version')
+        return CacheEntry(
+            version,
+            json.loads(item['answer']),
+            float(item['stored_at']),
+            float(item['expires_at'])
+        )
+
+    def put(self, key, entry):
+        item = {
+            'cache_key': key,
+            'answer': json.dumps(entry.value, separators=(',', ':')),
+            'stored_at': Decimal(str(round(entry.stored_at, 3))),
+            'expires_at': int(entry.expires_at) + 1
+        }
+        if entry.version is not None:
+            item['data_version'] = entry.version
+        self.table.put_item(Item=item)
+
+class AnswerCache:
+    """Short-lived cache of investigator answers keyed on the normalized question
+
+    An entry is served only while it is younger than ttl_seconds and was computed
+    at the current data version, so a processor write invalidates every answer
+    at once. Backend errors are logged and treated as misses.
+    """
+
+    def __init__(self, backend, ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """The live entry for key at this data version, or None"""
+        if self.ttl_seconds <= 0:
+            return None
+
+        try:
+            entry = self.backend.get(key)
+        except ClientError as e:
+            print(f"Answer cache read failed: {str(e)}")
+            entry = None
+
+        if entry is None or entry.expires_at <= time.time() or entry.version != version:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def put(self, key, version, value):
+        if self.ttl_seconds <= 0:
+            return
+
+        now = time.time()
+        try:
+            self.backend.put(key, CacheEntry(version, value, now, now + self.ttl_seconds))
+        except ClientError as e:
+            print(f"Answer cache write failed: {str(e)}")
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl_seconds': self.ttl_seconds,
+            'backend': type(self.backend).__name__
+        }
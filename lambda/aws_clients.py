@@ -0,0 +1,63 @@
+import json
+import time
+import boto3
+from botocore.config import Config
+
+# Objects cached here live as long as the Lambda container, so warm invocations
+# reuse the same clients, table handles and HTTP connection pools.
+_cache = {}
+_warm = False
+
+def _get_or_create(key, factory):
+    if key not in _cache:
+        _cache[key] = factory()
+    return _cache[key]
+
+def _client_config(max_pool_connections):
+    return Config(max_pool_connections=max_pool_connections, tcp_keepalive=True)
+
+def get_s3_client():
+    """S3 client shared by every invocation in this container"""
+    return _get_or_create('s3', lambda: boto3.client('s3', config=_client_config(10)))
+
+def get_dynamodb_resource(max_pool_connections=10):
+    """DynamoDB resource shared by every invocation in this container"""
+    return _get_or_create(
+        ('dynamodb', max_pool_connections),
+        lambda: boto3.resource('dynamodb', config=_client_config(max_pool_connections))
+    )
+
+def get_table(table_name, max_pool_connections=10):
+    """DynamoDB table handle shared by every invocation in this container"""
+    return _get_or_create(
+        ('table', table_name, max_pool_connections),
+        lambda: get_dynamodb_resource(max_pool_connections).Table(table_name)
+    )
+
+def get_cached(key, factory):
+    """Build an arbitrary object once per container, e.g. a FraudInvestigator"""
+    return _get_or_create(('object', key), factory)
+
+def reset_clients():
+    """Drop every cached object so the next invocation behaves like a cold start"""
+    global _warm
+    _cache.clear()
+    _warm = False
+
+def begin_invocation():
+    """Start timing an invocation and note whether the container was cold"""
+    global _warm
+    timing = {'cold_start': not _warm, 'started': time.perf_counter()}
+    _warm = True
+    return timing
+
+def end_invocation(timing, function_name):
+    """Finish timing an invocation and log it for cold vs warm percentiles"""
+    result = {
+        'cold_start': timing['cold_start'],
+        'duration_ms': round((time.perf_counter() - timing['started']) * 1000, 2)
+    }
+    # One JSON line per invocation so CloudWatch Logs Insights can compute
+    # pct(duration_ms, 50/99) grouped by cold_start
+    print(json.dumps({'event': 'invocation_timing', 'function': function_name, **result}))
+    return result
@@ -1,205 +1,376 @@
+import sys
 import boto3
 import json
 from datetime import datetime, timedelta
 from decimal import Decimal
+from botocore.exceptions import ClientError
+from alert_scan import (
+    scan_items, count_items, top_k, score_of, query_top_scores, query_customer_alerts, batch_get_alerts, SCORE_INDEX
+)
+from alert_snapshot import AlertSnapshotCache
+from query_router import parse_query
+from alert_metrics import read_metrics, metrics_version, risk_bucket
+from response_render import Response, alert_record
 
 class FraudInvestigator:
-    def __init__(self):
+    def __init__(self, scan_segments=1, score_index=SCORE_INDEX):
         self.dynamodb = boto3.resource('dynamodb')
         self.table = self.dynamodb.Table('fraud-alerts')
+        # Running totals maintained by the processor Lambda
+        self.metrics_table = self.dynamodb.Table('fraud-alert-metrics')
+        self.scan_segments = scan_segments
+        self.score_index = score_index
+        # One scan answers every question until the snapshot goes stale or the processor writes
+        self.snapshot = AlertSnapshotCache(
+            self.table,
+            segments=scan_segments,
+            version_source=lambda: metrics_version(self.metrics_table)
+        )
+    
+        # Intent name -> handler; a new intent is one entry here plus a rule in query_router
+        self._handlers = {
+            'customer_alerts': self._get_customer_alerts,
+            'top_anomalous': self._get_top_anomalous_transactions,
+            'highest_scores': self._get_highest_fraud_scores,
+            'explain_transaction': self._explain_transaction_flag,
+            'summary': self._get_summary_metrics,
+            'count': self._get_anomaly_count,
+            'overview': self._general_fraud_overview,
+        }
+    
+    def _columns(self):
+        """The cached columnar snapshot, or None when caching is off or the table is too large"""
+        return self.snapshot.get()
+    
+    def _scan(self, *attributes):
+        """A streamed scan of only the given attributes, for when there is no snapshot"""
+        return scan_items(self.table, attributes=attributes, segments=self.scan_segments)
+    
+    def _top_scores(self, limit, *attributes):
+        """Highest-scoring alerts via the score-ordered GSI, reading only `limit` items per shard"""
+        if self.score_index:
+            try:
+                return query_top_scores(self.table, limit, attributes=attributes, index_name=self.score_index)
+            except ClientError as e:
+                print(f"Score index query failed, falling back to scan: {str(e)}")
+        
+        # Selection over the snapshot's score column, or a bounded heap over the
+        # scan stream; neither is a full sort
+        columns = self._columns()
+        if columns is not None:
+            return columns.top_rows(limit)
+        return top_k(self._scan(*attributes), limit)
+    
+    def _metrics(self):
+        """Pre-aggregated totals kept by the processor, or None to fall back to scanning"""
+        try:
+            return read_metrics(self.metrics_table)
+        except ClientError as e:
+            print(f"Metrics read failed, falling back to scan: {str(e)}")
+            return None
+    
+    def _count(self):
+        metrics = self._metrics()
+        if metrics:
+            return metrics['total_alerts']
+        
+        items = self.snapshot.get()
+        if items is not None:
+            return len(items)
+        return count_items(self.table)
         
     def query_fraud_data(self, query):
         """Process natural language queries about fraud data"""
-        query_lower = query.lower()
-        
-        if "top" in query_lower and "anomalous" in query_lower:
-            return self._get_top_anomalous_transactions(query)
-        elif "highest fraud scores" in query_lower or "highest scores" in query_lower:
-            return self._get_highest_fraud_scores()
-        elif "explain" in query_lower and "transaction" in query_lower:
-            return self._explain_transaction_flag(query)
-        elif "summary" in query_lower or "metrics" in query_lower:
-            return self._get_summary_metrics()
-        elif "count" in query_lower:
-            return self._get_anomaly_count()
-        else:
-            return self._general_fraud_overview()
+        return self.answer(query).text()
     
-    def _get_top_anomalous_transactions(self, query):
+    def answer(self, query):
+        """Answer a question as a Response carrying both the text and its records"""
+        parsed = parse_query(query)
+        response = self._handlers[parsed.intent](parsed)
+        response.intent = parsed.intent
+        return response
+    
+    def _get_top_anomalous_transactions(self, parsed):
         """Get top N anomalous transactions"""
-        # Extract number from query
-        words = query.split()
-        limit = 5  # default
-        for word in words:
-            if word.isdigit():
-                limit = int(word)
-                break
-        
-        response = self.table.scan()
-        items = response['Items']
+        limit = parsed.limit if parsed.limit is not None else 5
         
-        # Sort by anomaly score (highest first)
-        sorted_items = sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)
-        top_items = sorted_items[:limit]
+        # Highest anomaly scores first
+        top_items = self._top_scores(limit, 'transaction_id', 'customer_id', 'amount', 'anomaly_score', 'timestamp')
         
-        result = f"Here are the top {len(top_items)} most anomalous transactions:\n\n"
+        response = Response().add(f"Here are the top {len(top_items)} most anomalous transactions:", "")
         
         for i, item in enumerate(top_items, 1):
-            result += f"{i}. Transaction {item['transaction_id']}\n"
-            result += f"   Customer: {item['customer_id']}\n"
-            result += f"   Amount: ${float(item['amount']):,.2f}\n"
-            result += f"   Risk Score: {float(item['anomaly_score']):.1f}\n"
-            result += f"   Time: {item['timestamp']}\n\n"
+            record = alert_record(item, 'transaction_id', 'customer_id', 'amount', 'anomaly_score', 'timestamp')
+            response.record(record).add(
+                f"{i}. Transaction {record['transaction_id']}",
+                f"   Customer: {record['customer_id']}",
+                f"   Amount: ${record['amount']:,.2f}",
+                f"   Risk Score: {record['anomaly_score']:.1f}",
+                f"   Time: {record['timestamp']}",
+                ""
+            )
         
-        return result
+        return response
     
-    def _get_highest_fraud_scores(self):
+    def _get_highest_fraud_scores(self, parsed):
         """Get customers with highest fraud scores"""
-        response = self.table.scan()
-        items = response['Items']
+        # Each customer's highest-scoring alert, then the top 5 customers by score
+        columns = self._columns()
+        if columns is not None:
+            best_rows = top_k(columns.best_row_per_customer(), 5, key=columns.scores.__getitem__)
+            top_customers = [columns.row(index) for index in best_rows]
+        else:
+            customer_rows = {}
+            for item in self._scan('customer_id', 'anomaly_score', 'transaction_id', 'amount'):
+                customer = item['customer_id']
+                score = float(item['anomaly_score'])
+                if customer not in customer_rows or score > customer_rows[customer]['anomaly_score']:
+                    customer_rows[customer] = {
+                        'customer_id': customer,
+                        'anomaly_score': score,
+                        'transaction_id': item['transaction_id'],
+                        'amount': float(item['amount'])
+                    }
+            top_customers = top_k(customer_rows.values(), 5, key=lambda row: row['anomaly_score'])
         
-        # Group by customer and get max score
-        customer_scores = {}
-        for item in items:
-            customer = item['customer_id']
-            score = float(item['anomaly_score'])
-            if customer not in customer_scores or score > customer_scores[customer]['score']:
-                customer_scores[customer] = {
-                    'score': score,
-                    'transaction_id': item['transaction_id'],
-                    'amount': float(item['amount'])
-                }
-        
-        # Sort by score
-        sorted_customers = sorted(customer_scores.items(), key=lambda x: x[1]['score'], reverse=True)
-        
-        result = "Customers with the highest fraud scores:\n\n"
-        for i, (customer, data) in enumerate(sorted_customers[:5], 1):
-            result += f"{i}. Customer {customer}\n"
-            result += f"   Highest Risk Score: {data['score']:.1f}\n"
-            result += f"   Transaction: {data['transaction_id']}\n"
-            result += f"   Amount: ${data['amount']:,.2f}\n\n"
-        
-        return result
-    
-    def _explain_transaction_flag(self, query):
-        """Explain why a transaction was flagged"""
-        # Extract transaction ID from query
-        words = query.split()
-        transaction_id = None
-        for word in words:
-            if word.startswith('TXN'):
-                transaction_id = word
-                break
-        
-        if not transaction_id:
-            return "Please specify a transaction ID (e.g., TXN999001) to explain why it was flagged."
+        response = Response().add("Customers with the highest fraud scores:", "")
+        for i, row in enumerate(top_customers, 1):
+            response.record(alert_record(row, 'customer_id', 'anomaly_score', 'transaction_id', 'amount')).add(
+                f"{i}. Customer {row['customer_id']}",
+                f"   Highest Risk Score: {row['anomaly_score']:.1f}",
+                f"   Transaction: {row['transaction_id']}",
+                f"   Amount: ${row['amount']:,.2f}",
+                ""
+            )
+        
+        return response
+    
+    def _get_customer_alerts(self, parsed):
+        """Show one customer's alerts and highest score via the customer-index GSI"""
+        customer_id = parsed.customer_ids[0]
+        items = list(query_customer_alerts(
+            self.table, customer_id,
+            attributes=('transaction_id', 'anomaly_score', 'amount', 'timestamp', 'status')
+        ))
+        
+        if not items:
+            return Response.message(f"No fraud alerts found for customer {customer_id}.")
+        
+        items.sort(key=score_of, reverse=True)
+        total_amount = sum(float(item['amount']) for item in items)
+        
+        response = Response().add(f"Fraud alerts for customer {customer_id}:", "")
+        for i, item in enumerate(items, 1):
+            record = alert_record(item, 'transaction_id', 'anomaly_score', 'amount', 'timestamp', 'status')
+            response.record(record).add(
+                f"{i}. Transaction {record['transaction_id']}",
+                f"   Risk Score: {record['anomaly_score']:.1f}",
+                f"   Amount: ${record['amount']:,.2f}",
+                f"   Time: {record['timestamp']}",
+                f"   Status: {record['status'] or 'UNKNOWN'}",
+                ""
+            )
+        
+        response.add(
+            f"🚨 Highest Risk Score: {score_of(items[0]):.1f}",
+            f"💰 Total Amount at Risk: ${total_amount:,.2f}"
+        )
+        
+        return response
+    
+    def _explain_transaction_flag(self, parsed):
+        """Explain why one or more transactions were flagged"""
+        transaction_ids = list(dict.fromkeys(parsed.transaction_ids))
+        
+        if not transaction_ids:
+            return Response.message("Please specify a transaction ID (e.g., TXN999001) to explain why it was flagged.")
         
         try:
-            response = self.table.get_item(Key={'transaction_id': transaction_id})
-            if 'Item' not in response:
-                return f"Transaction {transaction_id} not found in fraud alerts."
-            
-            item = response['Item']
-            score = float(item['anomaly_score'])
-            amount = float(item['amount'])
-            
-            explanation = f"Transaction {transaction_id} was flagged as suspicious because:\n\n"
-            explanation += f"• Anomaly Score: {score:.1f} (threshold: >2.5)\n"
-            explanation += f"• Transaction Amount: ${amount:,.2f}\n"
-            explanation += f"• Customer: {item['customer_id']}\n"
-            explanation += f"• Transaction Time: {item['timestamp']}\n\n"
-            
-            # Risk factors based on score and amount
-            if score > 5.0:
-                explanation += "🚨 CRITICAL RISK: Extremely high anomaly score indicates highly unusual transaction pattern.\n"
-            elif score > 4.0:
-                explanation += "⚠️ HIGH RISK: Significantly abnormal transaction behavior detected.\n"
-            elif score > 3.0:
-                explanation += "⚠️ MODERATE RISK: Transaction shows suspicious characteristics.\n"
-            
-            if amount > 30000:
-                explanation += "💰 Large transaction amount increases fraud risk.\n"
-            
-            # Time-based analysis
-            timestamp = item['timestamp']
-            if '02:' in timestamp or '03:' in timestamp or '23:' in timestamp:
-                explanation += "🌙 Unusual transaction time (late night/early morning).\n"
-            
-            return explanation
-            
+            # One GetItem for a single ID, otherwise 100-key BatchGetItem round trips
+            if len(transaction_ids) == 1:
+                response = self.table.get_item(Key={'transaction_id': transaction_ids[0]})
+                items = {transaction_ids[0]: response['Item']} if 'Item' in response else {}
+            else:
+                items = batch_get_alerts(self.table, transaction_ids)
         except Exception as e:
-            return f"Error retrieving transaction details: {str(e)}"
+            return Response.error(f"Error retrieving transaction details: {str(e)}")
+        
+        response = Response()
+        for i, transaction_id in enumerate(transaction_ids):
+            if i:
+                response.add("-" * 40, "")
+            item = items.get(transaction_id)
+            if item is None:
+                response.add(f"Transaction {transaction_id} not found in fraud alerts.")
+            else:
+                self._format_explanation(item, response)
+        
+        return response
     
-    def _get_summary_metrics(self):
+    def _format_explanation(self, item, response):
+        record = alert_record(item, 'transaction_id', 'customer_id', 'anomaly_score', 'amount', 'timestamp')
+        score = record['anomaly_score']
+        amount = record['amount']
+        
+        response.record(record).add(
+            f"Transaction {record['transaction_id']} was flagged as suspicious because:",
+            "",
+            f"• Anomaly Score: {score:.1f} (threshold: >2.5)",
+            f"• Transaction Amount: ${amount:,.2f}",
+            f"• Customer: {record['customer_id']}",
+            f"• Transaction Time: {record['timestamp']}",
+            ""
+        )
+        
+        # Risk factors based on score and amount
+        if score > 5.0:
+            response.add("🚨 CRITICAL RISK: Extremely high anomaly score indicates highly unusual transaction pattern.")
+        elif score > 4.0:
+            response.add("⚠️ HIGH RISK: Significantly abnormal transaction behavior detected.")
+        elif score > 3.0:
+            response.add("⚠️ MODERATE RISK: Transaction shows suspicious characteristics.")
+        
+        if amount > 30000:
+            response.add("💰 Large transaction amount increases fraud risk.")
+        
+        # Time-based analysis
+        timestamp = record['timestamp']
+        if '02:' in timestamp or '03:' in timestamp or '23:' in timestamp:
+            response.add("🌙 Unusual transaction time (late night/early morning).")
+        
+        return response
+    
+    def _get_summary_metrics(self, parsed):
         """Get summary metrics of fraud alerts"""
-        response = self.table.scan()
-        items = response['Items']
+        # O(1) read of the processor's running totals; scan only if they are unavailable
+        metrics = self._metrics() or self._scan_summary_metrics()
+        total_alerts = metrics['total_alerts']
+        total_amount = metrics['total_amount']
+        total_score = metrics['total_score']
+        max_score = metrics['max_score']
+        unique_customers = metrics['unique_customers']
+        critical, high, moderate = metrics['critical'], metrics['high'], metrics['moderate']
         
-        if not items:
-            return "No fraud alerts found in the system."
-        
-        # Calculate metrics
-        total_alerts = len(items)
-        amounts = [float(item['amount']) for item in items]
-        scores = [float(item['anomaly_score']) for item in items]
-        
-        total_amount = sum(amounts)
-        avg_amount = total_amount / len(amounts)
-        avg_score = sum(scores) / len(scores)
-        max_score = max(scores)
-        
-        # Customer analysis
-        customers = set(item['customer_id'] for item in items)
-        
-        result = "FRAUD DETECTION SUMMARY METRICS\n"
-        result += "=" * 40 + "\n\n"
-        result += f"📊 Total Fraud Alerts: {total_alerts}\n"
-        result += f"👥 Unique Customers Affected: {len(customers)}\n"
-        result += f"💰 Total Amount at Risk: ${total_amount:,.2f}\n"
-        result += f"📈 Average Transaction: ${avg_amount:,.2f}\n"
-        result += f"⚠️ Average Risk Score: {avg_score:.1f}\n"
-        result += f"🚨 Highest Risk Score: {max_score:.1f}\n\n"
-        
-        # Risk distribution
-        critical = sum(1 for s in scores if s > 5.0)
-        high = sum(1 for s in scores if 4.0 < s <= 5.0)
-        moderate = sum(1 for s in scores if 2.5 < s <= 4.0)
-        
-        result += "RISK DISTRIBUTION:\n"
-        result += f"🔴 Critical (>5.0): {critical} alerts\n"
-        result += f"🟠 High (4.0-5.0): {high} alerts\n"
-        result += f"🟡 Moderate (2.5-4.0): {moderate} alerts\n"
-        
-        return result
-    
-    def _get_anomaly_count(self):
-        """Get count of anomalies"""
-        response = self.table.scan()
-        items = response['Items']
+        if not total_alerts:
+            return Response.message("No fraud alerts found in the system.")
+        
+        avg_amount = total_amount / total_alerts
+        avg_score = total_score / total_alerts
+        # Metrics items written before max_score was set with the totals may still lack it
+        highest = f"{max_score:.1f}" if max_score is not None else "n/a"
+        
+        response = Response().record({
+            'total_alerts': total_alerts,
+            'unique_customers': unique_customers,
+            'total_amount': total_amount,
+            'average_amount': avg_amount,
+            'average_score': avg_score,
+            'max_score': max_score,
+            'critical': critical,
+            'high': high,
+            'moderate': moderate
+        })
+        response.add(
+            "FRAUD DETECTION SUMMARY METRICS",
+            "=" * 40,
+            "",
+            f"📊 Total Fraud Alerts: {total_alerts}",
+            f"👥 Unique Customers Affected: {unique_customers}",
+            f"💰 Total Amount at Risk: ${total_amount:,.2f}",
+            f"📈 Average Transaction: ${avg_amount:,.2f}",
+            f"⚠️ Average Risk Score: {avg_score:.1f}",
+            f"🚨 Highest Risk Score: {highest}",
+            ""
+        )
+        response.add(
+            "RISK DISTRIBUTION:",
+            f"🔴 Critical (>5.0): {critical} alerts",
+            f"🟠 High (4.0-5.0): {high} alerts",
+            f"🟡 Moderate (2.5-4.0): {moderate} alerts"
+        )
         
-        return f"Current fraud alert count: {len(items)} suspicious transactions detected."
+        return response
     
-    def _general_fraud_overview(self):
-        """General overview of fraud data"""
-        response = self.table.scan()
-        items = response['Items']
+    def _scan_summary_metrics(self):
+        """Calculate summary metrics when no metrics item is available
         
-        if not items:
-            return "No fraud alerts currently in the system."
+        From the snapshot's columns when there is one, otherwise page by page
+        instead of materializing the table.
+        """
+        columns = self._columns()
+        if columns is not None:
+            metrics = {
+                'total_alerts': len(columns),
+                'total_amount': columns.total('amounts'),
+                'total_score': columns.total('scores'),
+                'max_score': columns.maximum('scores'),
+                'unique_customers': len(columns.customers)
+            }
+            metrics.update(columns.bucket_counts())
+            return metrics
+        
+        metrics = {'total_alerts': 0, 'total_amount': 0.0, 'total_score': 0.0, 'max_score': None,
+                   'critical': 0, 'high': 0, 'moderate': 0}
+        customers = set()
+        
+        for item in self._scan('amount', 'anomaly_score', 'customer_id'):
+            score = float(item['anomaly_score'])
+            metrics['total_alerts'] += 1
+            metrics['total_amount'] += float(item['amount'])
+            metrics['total_score'] += score
+            if metrics['max_score'] is None or score > metrics['max_score']:
+                metrics['max_score'] = score
+            customers.add(item['customer_id'])
+            
+            bucket = risk_bucket(score)
+            if bucket:
+                metrics[bucket] += 1
+        
+        metrics['unique_customers'] = len(customers)
+        return metrics
+    
+    def _get_anomaly_count(self, parsed):
+        """Get count of anomalies"""
+        count = self._count()
+        return Response().record({'total_alerts': count}).add(
+            f"Current fraud alert count: {count} suspicious transactions detected."
+        )
+    
+    def _general_fraud_overview(self, parsed):
+        """General overview of fraud data"""
+        columns = self._columns()
+        if columns is not None:
+            total_alerts = len(columns)
+            top_3 = columns.top_rows(3)
+        else:
+            total_alerts = 0
+            
+            def counted(items):
+                nonlocal total_alerts
+                for item in items:
+                    total_alerts += 1
+                    yield item
+            
+            # Count and take the top 3 by score in a single pass
+            top_3 = top_k(counted(self._scan('transaction_id', 'anomaly_score', 'amount')), 3)
         
-        # Get top 3 by score
-        sorted_items = sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)
-        top_3 = sorted_items[:3]
+        if not total_alerts:
+            return Response.message("No fraud alerts currently in the system.")
         
-        result = f"FRAUD INVESTIGATION OVERVIEW\n"
-        result += f"Currently monitoring {len(items)} high-risk transactions.\n\n"
-        result += "Top 3 Critical Cases:\n"
+        response = Response().add(
+            "FRAUD INVESTIGATION OVERVIEW",
+            f"Currently monitoring {total_alerts} high-risk transactions.",
+            "",
+            "Top 3 Critical Cases:"
+        )
         
         for i, item in enumerate(top_3, 1):
-            result += f"{i}. {item['transaction_id']} - Score: {float(item['anomaly_score']):.1f} - ${float(item['amount']):,.2f}\n"
+            record = alert_record(item, 'transaction_id', 'anomaly_score', 'amount')
+            response.record(record).add(
+                f"{i}. {record['transaction_id']} - Score: {record['anomaly_score']:.1f} - ${record['amount']:,.2f}"
+            )
         
-        return result
+        return response
 
 def main():
     investigator = FraudInvestigator()
@@ -220,8 +391,10 @@ def main():
             continue
         
         try:
-            response = investigator.query_fraud_data(query)
-            print(f"\n📋 {response}\n")
+            # Written line by line, so a long answer is never held as one big string
+            print("\n📋 ", end="")
+            investigator.answer(query).write_to(sys.stdout)
+            print()
         except Exception as e:
             print(f"❌ Error: {str(e)}\n")
 
@@ -1,179 +1,482 @@
 import json
-import boto3
 import os
+import time
 from decimal import Decimal
+from aws_clients import get_table, get_cached, begin_invocation, end_invocation
+from botocore.exceptions import ClientError
+from alert_scan import (
+    scan_items, count_items, top_k, score_of, query_top_scores, query_customer_alerts, batch_get_alerts, SCORE_INDEX
+)
+from alert_snapshot import AlertSnapshotCache
+from query_router import parse_query
+from alert_metrics import read_metrics, metrics_version, risk_bucket
+from response_render import Response, RESPONSE_FORMATS, alert_record, encode_compact, etag
+from answer_cache import AnswerCache, MemoryCacheBackend, DynamoDBCacheBackend, cache_key
+
+# Parallel scan segments per query; 1 keeps scans sequential
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', 1))
+
+# Most questions one batch invocation will answer
+MAX_BATCH_QUERIES = int(os.environ.get('MAX_BATCH_QUERIES', 50))
+
+def parse_request(event):
+    """Request fields from a direct invocation, an API Gateway proxy body or a GET query string"""
+    body = event.get('body')
+    if isinstance(body, str) and body:
+        return json.loads(body)
+    if event.get('queryStringParameters'):
+        return event['queryStringParameters']
+    return event
+
+def request_header(event, name):
+    """A header from an API Gateway proxy event, matched case-insensitively"""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def build_answer_cache():
+    """Answer cache shared through ANSWER_CACHE_TABLE when set, otherwise held in this container"""
+    table_name = os.environ.get('ANSWER_CACHE_TABLE', '')
+    return AnswerCache(DynamoDBCacheBackend(get_table(table_name)) if table_name else MemoryCacheBackend())
+
+def cache_headers(answer_cache, entry):
+    """Cache headers for a single answer: hit or miss, its age, and how long it may be reused"""
+    if answer_cache.ttl_seconds <= 0:
+        return {'Cache-Control': 'no-cache'}
+    if entry is None:
+        return {'X-Cache': 'Miss', 'Cache-Control': f"max-age={int(answer_cache.ttl_seconds)}"}
+    now = time.time()
+    return {
+        'X-Cache': 'Hit',
+        'Age': str(int(now - entry.stored_at)),
+        'Cache-Control': f"max-age={max(int(entry.expires_at - now), 0)}"
+    }
 
 def lambda_handler(event, context):
-    """AWS Lambda handler for FraudInvestigator queries"""
+    """AWS Lambda handler for FraudInvestigator queries
     
-    # Initialize DynamoDB
-    dynamodb = boto3.resource('dynamodb')
-    table_name = os.environ['DYNAMODB_TABLE']
-    table = dynamodb.Table(table_name)
-    
-    # Get query from event
-    query = event.get('query', '')
+    Takes either a single 'query' or a list of 'queries'; a batch is answered in
+    order against one shared snapshot of the alerts table. With format=json the
+    prose is left out and only typed records are returned, compactly encoded.
+    Every answer carries an ETag over its content and the data version it was
+    read at; a matching If-None-Match gets an empty 304. Answers are reused for
+    the same normalized question until ANSWER_CACHE_TTL_SECONDS pass or the
+    processor writes new alerts.
+    """
+    timing = begin_invocation()
     
     try:
-        # Process the query
-        investigator = FraudInvestigator(table)
-        response = investigator.query_fraud_data(query)
+        # Get query or batch of queries from event
+        request = parse_request(event)
+        query = request.get('query', '')
+        queries = request.get('queries')
+        response_format = request.get('format') or (event.get('queryStringParameters') or {}).get('format') or 'text'
+        
+        if queries is not None and (not isinstance(queries, list) or len(queries) > MAX_BATCH_QUERIES):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': f"'queries' must be a list of at most {MAX_BATCH_QUERIES} questions",
+                    'timing': end_invocation(timing, 'fraud-investigator')
+                })
+            }
         
+        if response_format not in RESPONSE_FORMATS:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': f"'format' must be one of {', '.join(RESPONSE_FORMATS)}",
+                    'timing': end_invocation(timing, 'fraud-investigator')
+                })
+            }
+        
+        # Table handle and investigator are built once per container and reused while warm
+        table_name = os.environ['DYNAMODB_TABLE']
+        metrics_table_name = os.environ.get('METRICS_TABLE', '')
+        investigator = get_cached(
+            ('investigator', table_name, metrics_table_name),
+            lambda: FraudInvestigator(
+                get_table(table_name),
+                metrics_table=get_table(metrics_table_name) if metrics_table_name else None,
+                answer_cache=build_answer_cache()
+            )
+        )
+        
+        # Read once per request; cached answers from an older version are not served.
+        # Without a metrics table only the TTL expires cached answers.
+        version = investigator.data_version()
+        
+        # A dashboard's questions share one invocation and one table snapshot
+        if queries is not None:
+            payload = {'results': investigator.query_batch(queries, response_format, version)}
+            headers = {'Cache-Control': 'no-cache'}
+        else:
+            # Process the query; the text answer and the records behind it travel together
+            payload, entry = investigator.respond(query, response_format, version)
+            headers = cache_headers(investigator.answer_cache, entry)
+        
+        tag = etag(payload)
+        headers.update({'Content-Type': 'application/json', 'ETag': tag})
+        if request_header(event, 'If-None-Match') == tag:
+            end_invocation(timing, 'fraud-investigator')
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+        
+        # Without a metrics table the version is a digest of the snapshot's contents;
+        # answers that never needed a snapshot have no data version to report
+        data_version = version or investigator.snapshot.fingerprint()
+        if data_version:
+            payload['version'] = data_version
+        payload.update({
+            'etag': tag,
+            'cache': investigator.snapshot.stats(),
+            'answer_cache': investigator.answer_cache.stats(),
+            'timing': end_invocation(timing, 'fraud-investigator')
+        })
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'query': query,
-                'response': response
-            })
+            'headers': headers,
+            'body': encode_compact(payload) if response_format == 'json' else json.dumps(payload)
         }
         
     except Exception as e:
         return {
             'statusCode': 500,
             'body': json.dumps({
-                'error': str(e)
+                'error': str(e),
+                'timing': end_invocation(timing, 'fraud-investigator')
             })
         }
 
 class FraudInvestigator:
-    def __init__(self, table):
+    def __init__(self, table, scan_segments=SCAN_SEGMENTS, score_index=SCORE_INDEX, metrics_table=None,
+                 answer_cache=None):
         self.table = table
+        self.scan_segments = scan_segments
+        self.score_index = score_index
+        self.metrics_table = metrics_table
+        # Finished answers per normalized question; disabled (TTL 0) unless one is given
+        self.answer_cache = answer_cache or AnswerCache(MemoryCacheBackend(), ttl_seconds=0)
+        # One scan answers every question until the snapshot goes stale or the processor writes
+        self.snapshot = AlertSnapshotCache(
+            table,
+            segments=scan_segments,
+            version_source=(lambda: metrics_version(metrics_table)) if metrics_table else None
+        )
+    
+        # Intent name -> handler; a new intent is one entry here plus a rule in query_router
+        self._handlers = {
+            'customer_alerts': self._get_customer_alerts,
+            'top_anomalous': self._get_top_anomalous_transactions,
+            'highest_scores': self._get_highest_fraud_scores,
+            'explain_transaction': self._explain_transaction_flag,
+            'summary': self._get_summary_metrics,
+            'count': self._get_anomaly_count,
+            'overview': self._general_fraud_overview,
+        }
+    
+    def _columns(self):
+        """The cached columnar snapshot, or None when caching is off or the table is too large"""
+        return self.snapshot.get()
+    
+    def _scan(self, *attributes):
+        """A streamed scan of only the given attributes, for when there is no snapshot"""
+        return scan_items(self.table, attributes=attributes, segments=self.scan_segments)
+    
+    def _top_scores(self, limit, *attributes):
+        """Highest-scoring alerts via the score-ordered GSI, reading only `limit` items per shard"""
+        if self.score_index:
+            try:
+                return query_top_scores(self.table, limit, attributes=attributes, index_name=self.score_index)
+            except ClientError as e:
+                print(f"Score index query failed, falling back to scan: {str(e)}")
+        
+        # Selection over the snapshot's score column, or a bounded heap over the
+        # scan stream; neither sorts every alert
+        columns = self._columns()
+        if columns is not None:
+            return columns.top_rows(limit)
+        return top_k(self._scan(*attributes), limit)
+    
+    def _metrics(self):
+        """Pre-aggregated totals kept by the processor, or None to fall back to scanning"""
+        if not self.metrics_table:
+            return None
+        try:
+            return read_metrics(self.metrics_table)
+        except ClientError as e:
+            print(f"Metrics read failed, falling back to scan: {str(e)}")
+            return None
+    
+    def _count(self):
+        metrics = self._metrics()
+        if metrics:
+            return metrics['total_alerts']
+        
+        items = self.snapshot.get()
+        if items is not None:
+            return len(items)
+        return count_items(self.table)
         
     def query_fraud_data(self, query):
         """Process natural language queries about fraud data"""
-        query_lower = query.lower()
-        
-        if "top" in query_lower and ("anomalous" in query_lower or "risky" in query_lower):
-            return self._get_top_anomalous_transactions(query)
-        elif "highest" in query_lower and "scores" in query_lower:
-            return self._get_highest_fraud_scores()
-        elif "explain" in query_lower and "transaction" in query_lower:
-            return self._explain_transaction_flag(query)
-        elif "summary" in query_lower or "metrics" in query_lower:
-            return self._get_summary_metrics()
-        elif "count" in query_lower:
-            return self._get_anomaly_count()
-        else:
-            return self._general_fraud_overview()
+        return self.answer(query).text()
     
-    def _get_top_anomalous_transactions(self, query):
-        """Get top N anomalous transactions"""
-        words = query.split()
-        limit = 5
-        for word in words:
-            if word.isdigit():
-                limit = int(word)
-                break
+    def answer(self, query):
+        """Answer a question as a Response carrying both the text and its records"""
+        return self._answer(parse_query(query))
+    
+    def _answer(self, parsed):
+        response = self._handlers[parsed.intent](parsed)
+        response.intent = parsed.intent
+        return response
+    
+    def respond(self, query, response_format='text', version=None):
+        """The payload for one question: typed records, plus the prose unless format is json
         
-        response = self.table.scan()
-        items = response['Items']
+        Served from the answer cache when the same normalized question was answered
+        at this data version within the TTL. Returns (payload, cache entry or None).
+        """
+        parsed = parse_query(query)
+        key = cache_key(parsed, response_format)
+        entry = self.answer_cache.get(key, version)
+        if entry is not None:
+            return dict({'query': query}, **entry.value), entry
         
-        sorted_items = sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)
-        top_items = sorted_items[:limit]
+        response = self._answer(parsed)
+        value = {'intent': response.intent, 'records': response.records}
+        if response_format == 'text':
+            value['response'] = response.text()
+        if response.cacheable:
+            self.answer_cache.put(key, version, value)
+        return dict({'query': query}, **value), None
+    
+    def query_batch(self, queries, response_format='text', version=None):
+        """Answer several questions in order against one pinned snapshot of the alerts
+        
+        Each answer carries its own ETag, so a dashboard only re-renders the panels that changed.
+        """
+        results = []
+        with self.snapshot.pinned():
+            for query in queries:
+                try:
+                    result, entry = self.respond(query, response_format, version)
+                    result['etag'] = etag(result)
+                    result['cached'] = entry is not None
+                    results.append(result)
+                except Exception as e:
+                    results.append({'query': query, 'error': str(e)})
+        return results
+    
+    def data_version(self):
+        """The processor's metrics flush counter, which moves on every write; None without one"""
+        if self.metrics_table:
+            version = metrics_version(self.metrics_table)
+            if version is not None:
+                return f"metrics-{version}"
+        return None
+    
+    def _get_top_anomalous_transactions(self, parsed):
+        """Get top N anomalous transactions"""
+        limit = parsed.limit if parsed.limit is not None else 5
+        
+        top_items = self._top_scores(limit, 'transaction_id', 'anomaly_score', 'amount')
         
-        result = f"Top {len(top_items)} most anomalous transactions:\\n\\n"
+        response = Response().add(f"Top {len(top_items)} most anomalous transactions:", "")
         
         for i, item in enumerate(top_items, 1):
-            result += f"{i}. {item['transaction_id']} - Score: {float(item['anomaly_score']):.1f} - ${float(item['amount']):,.2f}\\n"
+            record = alert_record(item, 'transaction_id', 'anomaly_score', 'amount')
+            response.record(record).add(
+                f"{i}. {record['transaction_id']} - Score: {record['anomaly_score']:.1f} - ${record['amount']:,.2f}"
+            )
         
-        return result
+        return response
     
-    def _get_highest_fraud_scores(self):
+    def _get_highest_fraud_scores(self, parsed):
         """Get customers with highest fraud scores"""
-        response = self.table.scan()
-        items = response['Items']
+        columns = self._columns()
+        if columns is not None:
+            best_rows = top_k(columns.best_row_per_customer(), 5, key=columns.scores.__getitem__)
+            top_customers = [columns.row(index) for index in best_rows]
+        else:
+            customer_scores = {}
+            for item in self._scan('customer_id', 'anomaly_score'):
+                customer = item['customer_id']
+                score = float(item['anomaly_score'])
+                if customer not in customer_scores or score > customer_scores[customer]:
+                    customer_scores[customer] = score
+            top_customers = [
+                {'customer_id': customer, 'anomaly_score': score}
+                for customer, score in top_k(customer_scores.items(), 5, key=lambda x: x[1])
+            ]
         
-        customer_scores = {}
-        for item in items:
-            customer = item['customer_id']
-            score = float(item['anomaly_score'])
-            if customer not in customer_scores or score > customer_scores[customer]:
-                customer_scores[customer] = score
+        response = Response().add("Customers with highest fraud scores:")
+        for row in top_customers:
+            response.record(alert_record(row, 'customer_id', 'anomaly_score')).add(
+                f"• {row['customer_id']}: {row['anomaly_score']:.1f}"
+            )
+        
+        return response
+    
+    def _get_customer_alerts(self, parsed):
+        """List one customer's alerts and highest score via the customer-index GSI"""
+        customer_id = parsed.customer_ids[0]
+        items = list(query_customer_alerts(
+            self.table, customer_id,
+            attributes=('transaction_id', 'anomaly_score', 'amount', 'timestamp')
+        ))
         
-        sorted_customers = sorted(customer_scores.items(), key=lambda x: x[1], reverse=True)
+        if not items:
+            return Response.message(f"No fraud alerts found for customer {customer_id}.")
         
-        result = "Customers with highest fraud scores:\\n"
-        for customer, score in sorted_customers[:5]:
-            result += f"• {customer}: {score:.1f}\\n"
+        items.sort(key=score_of, reverse=True)
         
-        return result
+        response = Response().add(f"Alerts for customer {customer_id} ({len(items)}):")
+        for item in items:
+            record = alert_record(item, 'transaction_id', 'anomaly_score', 'amount', 'timestamp')
+            response.record(record).add(
+                f"• {record['transaction_id']} - Score: {record['anomaly_score']:.1f} - ${record['amount']:,.2f} - {record['timestamp']}"
+            )
+        response.add(f"Highest Score: {score_of(items[0]):.1f}")
+        
+        return response
     
-    def _explain_transaction_flag(self, query):
-        """Explain why a transaction was flagged"""
-        words = query.split()
-        transaction_id = None
-        for word in words:
-            if word.startswith('TXN'):
-                transaction_id = word
-                break
+    def _explain_transaction_flag(self, parsed):
+        """Explain why one or more transactions were flagged"""
+        transaction_ids = list(dict.fromkeys(parsed.transaction_ids))
         
-        if not transaction_id:
-            return "Please specify a transaction ID to explain."
+        if not transaction_ids:
+            return Response.message("Please specify a transaction ID to explain.")
         
         try:
-            response = self.table.get_item(Key={'transaction_id': transaction_id})
-            if 'Item' not in response:
-                return f"Transaction {transaction_id} not found."
-            
-            item = response['Item']
-            score = float(item['anomaly_score'])
-            amount = float(item['amount'])
-            
-            explanation = f"Transaction {transaction_id} flagged because:\\n"
-            explanation += f"• Anomaly Score: {score:.1f} (>2.5 threshold)\\n"
-            explanation += f"• Amount: ${amount:,.2f}\\n"
-            
-            if score > 5.0:
-                explanation += "• CRITICAL: Extremely unusual pattern\\n"
-            elif score > 4.0:
-                explanation += "• HIGH RISK: Abnormal behavior\\n"
-            
-            if amount > 30000:
-                explanation += "• Large transaction amount\\n"
-            
-            return explanation
-            
+            items = self._get_alerts(transaction_ids)
         except Exception as e:
-            return f"Error: {str(e)}"
+            return Response.error(f"Error: {str(e)}")
+        
+        response = Response()
+        for transaction_id in transaction_ids:
+            item = items.get(transaction_id)
+            if item is None:
+                response.add(f"Transaction {transaction_id} not found.")
+            else:
+                self._format_explanation(item, response)
+        
+        return response
+    
+    def _get_alerts(self, transaction_ids):
+        """Alerts by transaction ID: GetItem for one, 100-key BatchGetItem calls for many"""
+        if len(transaction_ids) == 1:
+            response = self.table.get_item(Key={'transaction_id': transaction_ids[0]})
+            return {transaction_ids[0]: response['Item']} if 'Item' in response else {}
+        return batch_get_alerts(self.table, transaction_ids)
+    
+    def _format_explanation(self, item, response):
+        record = alert_record(item, 'transaction_id', 'anomaly_score', 'amount')
+        score = record['anomaly_score']
+        amount = record['amount']
+        
+        response.record(record).add(
+            f"Transaction {record['transaction_id']} flagged because:",
+            f"• Anomaly Score: {score:.1f} (>2.5 threshold)",
+            f"• Amount: ${amount:,.2f}"
+        )
+        
+        if score > 5.0:
+            response.add("• CRITICAL: Extremely unusual pattern")
+        elif score > 4.0:
+            response.add("• HIGH RISK: Abnormal behavior")
+        
+        if amount > 30000:
+            response.add("• Large transaction amount")
+        
+        return response
     
-    def _get_summary_metrics(self):
+    def _get_summary_metrics(self, parsed):
         """Get summary metrics"""
-        response = self.table.scan()
-        items = response['Items']
+        metrics = self._metrics() or self._scan_summary_metrics()
+        total_alerts = metrics['total_alerts']
+        total_amount = metrics['total_amount']
+        total_score = metrics['total_score']
+        max_score = metrics['max_score']
         
-        if not items:
-            return "No fraud alerts found."
+        if not total_alerts:
+            return Response.message("No fraud alerts found.")
         
-        total_alerts = len(items)
-        amounts = [float(item['amount']) for item in items]
-        scores = [float(item['anomaly_score']) for item in items]
+        avg_score = total_score / total_alerts
+        # Metrics items written before max_score was set with the totals may still lack it
+        highest = f"{max_score:.1f}" if max_score is not None else "n/a"
         
-        total_amount = sum(amounts)
-        avg_score = sum(scores) / len(scores)
-        max_score = max(scores)
+        return Response().record({
+            'total_alerts': total_alerts,
+            'total_amount': total_amount,
+            'average_score': avg_score,
+            'max_score': max_score,
+            'critical': metrics['critical'],
+            'high': metrics['high'],
+            'moderate': metrics['moderate']
+        }).add(
+            "FRAUD SUMMARY:",
+            f"• Total Alerts: {total_alerts}",
+            f"• Total at Risk: ${total_amount:,.2f}",
+            f"• Average Score: {avg_score:.1f}",
+            f"• Highest Score: {highest}"
+        )
+    
+    def _scan_summary_metrics(self):
+        """Aggregate summary totals when no metrics item is available
         
-        result = f"FRAUD SUMMARY:\\n"
-        result += f"• Total Alerts: {total_alerts}\\n"
-        result += f"• Total at Risk: ${total_amount:,.2f}\\n"
-        result += f"• Average Score: {avg_score:.1f}\\n"
-        result += f"• Highest Score: {max_score:.1f}\\n"
+        From the snapshot's columns when there is one, otherwise page by page
+        over the scan stream without holding the alerts.
+        """
+        columns = self._columns()
+        if columns is not None:
+            metrics = {
+                'total_alerts': len(columns),
+                'total_amount': columns.total('amounts'),
+                'total_score': columns.total('scores'),
+                'max_score': columns.maximum('scores')
+            }
+            metrics.update(columns.bucket_counts())
+            return metrics
         
-        return result
+        metrics = {'total_alerts': 0, 'total_amount': 0.0, 'total_score': 0.0, 'max_score': None,
+                   'critical': 0, 'high': 0, 'moderate': 0}
+        for item in self._scan('amount', 'anomaly_score'):
+            score = float(item['anomaly_score'])
+            metrics['total_alerts'] += 1
+            metrics['total_amount'] += float(item['amount'])
+            metrics['total_score'] += score
+            if metrics['max_score'] is None or score > metrics['max_score']:
+                metrics['max_score'] = score
+            bucket = risk_bucket(score)
+            if bucket:
+                metrics[bucket] += 1
+        return metrics
     
-    def _get_anomaly_count(self):
+    def _get_anomaly_count(self, parsed):
         """Get count of anomalies"""
-        response = self.table.scan()
-        return f"Current fraud alerts: {len(response['Items'])}"
+        count = self._count()
+        return Response().record({'total_alerts': count}).add(f"Current fraud alerts: {count}")
     
-    def _general_fraud_overview(self):
+    def _general_fraud_overview(self, parsed):
         """General overview"""
-        response = self.table.scan()
-        items = response['Items']
-        
-        if not items:
-            return "No fraud alerts in system."
+        columns = self._columns()
+        if columns is not None:
+            total_alerts = len(columns)
+            top_item = columns.top_rows(1)[0] if total_alerts else None
+        else:
+            total_alerts = 0
+            top_item = None
+            for item in self._scan('transaction_id', 'anomaly_score'):
+                total_alerts += 1
+                if top_item is None or score_of(item) > score_of(top_item):
+                    top_item = item
         
-        sorted_items = sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)
-        top_item = sorted_items[0]
+        if not total_alerts:
+            return Response.message("No fraud alerts in system.")
         
-        return f"Monitoring {len(items)} fraud alerts. Highest risk: {top_item['transaction_id']} (Score: {float(top_item['anomaly_score']):.1f})"
\ No newline at end of file
+        record = alert_record(top_item, 'transaction_id', 'anomaly_score')
+        return Response().record(dict(record, total_alerts=total_alerts)).add(
+            f"Monitoring {total_alerts} fraud alerts. Highest risk: {record['transaction_id']} (Score: {record['anomaly_score']:.1f})"
+        )
\ No newline at end of file
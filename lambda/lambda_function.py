@@ -1,76 +1,638 @@
 import json
-import boto3
+import codecs
 import csv
+import hashlib
 import os
+import random
+import threading
+import time
+import urllib.parse
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
+from itertools import islice
+from aws_clients import get_s3_client, get_table, begin_invocation, end_invocation
+from alert_scan import score_shard, batch_get_alerts
+from alert_metrics import AlertMetrics
+
+SCORES_KEY = 'scored/anomaly_scores.csv'
+RESULTS_KEY = 'scored/anomaly_results.csv'
+
+# Where incremental runs record how far into each scored file they have got
+CHECKPOINT_KEY = os.environ.get('CHECKPOINT_KEY', 'checkpoints/fraud-processor.json')
+
+# Bytes before a checkpoint offset compared on the next run, to tell an appended
+# file (resume at the offset) from a replaced one (start over)
+CHECKPOINT_TAIL_BYTES = 1024
+
+# S3 notifications for objects under this prefix are processed one object at a time
+SCORED_PREFIX = 'scored/'
+
+# Columns a scored part needs before its rows can become alerts
+SCORED_PART_COLUMNS = ('transaction_id', 'anomaly_score')
+
+# Marker per processed object version, so a redelivered notification is a no-op
+PROCESSED_PREFIX = os.environ.get('PROCESSED_PREFIX', 'checkpoints/processed/')
+
+# Transactions scoring above this are written as fraud alerts
+ANOMALY_THRESHOLD = 2.5
+
+# Bytes pulled from the S3 body per read; bounds peak memory while parsing
+S3_READ_CHUNK_SIZE = int(os.environ.get('S3_READ_CHUNK_SIZE', 1024 * 1024))
+
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_SIZE = 25
+MAX_BATCH_RETRIES = int(os.environ.get('MAX_BATCH_RETRIES', 8))
+BATCH_BACKOFF_SECONDS = float(os.environ.get('BATCH_BACKOFF_SECONDS', 0.05))
+
+# Number of BatchWriteItem calls in flight at once
+WRITE_CONCURRENCY = int(os.environ.get('WRITE_CONCURRENCY', 4))
+
+# Errors that mean DynamoDB is shedding load rather than rejecting the request
+THROTTLE_ERROR_CODES = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'}
+
+# Cap on per-item errors echoed back in the response body
+MAX_REPORTED_ERRORS = 10
+
+def iter_s3_lines(body, chunk_size=S3_READ_CHUNK_SIZE):
+    """Yield decoded lines from an S3 streaming body one chunk at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    
+    while True:
+        chunk = body.read(chunk_size)
+        if not chunk:
+            break
+        
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+def read_s3_csv(s3, bucket, key, read=None):
+    """Stream rows of a CSV object in S3 as dicts without loading the whole file
+    
+    read is an incremental read plan from plan_incremental_read: rows before its
+    start offset are skipped with a ranged GET, and the header is taken from the
+    plan (or recorded into it when reading from the top).
+    """
+    if read is None:
+        response = s3.get_object(Bucket=bucket, Key=key)
+        return csv.DictReader(iter_s3_lines(response['Body']))
+    
+    if read['start'] >= read['size']:
+        return iter(())
+    
+    # IfMatch fails the run if the object is replaced between planning and reading
+    if read['start']:
+        response = s3.get_object(Bucket=bucket, Key=key, IfMatch=read['etag'], Range=f"bytes={read['start']}-")
+        return csv.DictReader(iter_s3_lines(response['Body']), fieldnames=read['fieldnames'])
+    
+    response = s3.get_object(Bucket=bucket, Key=key, IfMatch=read['etag'])
+    reader = csv.DictReader(iter_s3_lines(response['Body']))
+    read['fieldnames'] = reader.fieldnames
+    return reader
+
+def tail_digest(s3, bucket, key, end):
+    """Digest of the CHECKPOINT_TAIL_BYTES before offset end of an S3 object"""
+    if end <= 0:
+        return None
+    start = max(0, end - CHECKPOINT_TAIL_BYTES)
+    body = s3.get_object(Bucket=bucket, Key=key, Range=f'bytes={start}-{end - 1}')['Body'].read()
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def load_checkpoint(s3, bucket):
+    """Per-object state saved by the last successful incremental run, or {} before the first"""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=CHECKPOINT_KEY)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return {}
+        raise
+    return json.loads(response['Body'].read()).get('objects', {})
+
+def plan_incremental_read(s3, bucket, key, previous=None):
+    """Where to start reading a scored file given its checkpoint entry
+    
+    Unchanged (same ETag): nothing to read. Grown with the checkpointed bytes
+    intact: resume at the old size. Anything else, e.g. a rewrite by the next
+    batch transform: read it all again, relying on conditional writes to skip
+    alerts that already exist.
+    """
+    head = s3.head_object(Bucket=bucket, Key=key)
+    read = {'etag': head['ETag'], 'size': head['ContentLength'], 'start': 0, 'fieldnames': None}
+    if not previous:
+        return read
+    
+    if previous['etag'] == read['etag']:
+        read.update(start=read['size'], fieldnames=previous['fieldnames'])
+    elif (read['size'] > previous['size'] and previous['fieldnames']
+          and tail_digest(s3, bucket, key, previous['size']) == previous['tail_digest']):
+        read.update(start=previous['size'], fieldnames=previous['fieldnames'])
+    return read
+
+def save_checkpoint(s3, bucket, reads):
+    """Record every planned file as fully processed up to its current size"""
+    objects = {
+        key: {
+            'etag': read['etag'],
+            'size': read['size'],
+            'fieldnames': read['fieldnames'],
+            'tail_digest': tail_digest(s3, bucket, key, read['size'])
+        }
+        for key, read in reads.items()
+    }
+    s3.put_object(
+        Bucket=bucket,
+        Key=CHECKPOINT_KEY,
+        Body=json.dumps({'objects': objects, 'updated_at': datetime.now().isoformat()}).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+def build_alert_item(transaction_id, anomaly_score, details=None):
+    """Build the DynamoDB fraud alert item for a flagged transaction"""
+    details = details or {}
+    return {
+        'transaction_id': transaction_id,
+        'customer_id': details.get('customer_id', 'UNKNOWN'),
+        'amount': Decimal(str(float(details.get('amount', 0.0)))),
+        'anomaly_score': Decimal(str(anomaly_score)),
+        # Partition key of the score-ordered GSI used for top-N questions
+        'score_shard': score_shard(transaction_id),
+        'timestamp': details.get('timestamp', datetime.now().isoformat()),
+        'alert_created': datetime.now().isoformat(),
+        'status': 'PENDING_REVIEW'
+    }
+
+def load_flagged_scores(s3, bucket, read=None):
+    """Map transaction ID to anomaly score, keeping only rows above the alert threshold"""
+    flagged = {}
+    for row in read_s3_csv(s3, bucket, SCORES_KEY, read):
+        anomaly_score = float(row['anomaly_score'])
+        if anomaly_score > ANOMALY_THRESHOLD:
+            flagged[row['transaction_id']] = anomaly_score
+    return flagged
+
+def join_details(rows, flagged):
+    """Yield alerts for flagged transactions found in detail rows, removing each from flagged"""
+    for row in rows:
+        if not flagged:
+            break
+        anomaly_score = flagged.pop(row['transaction_id'], None)
+        if anomaly_score is not None:
+            yield build_alert_item(row['transaction_id'], anomaly_score, row)
+
+def iter_fraud_alerts(s3, bucket, joined=False, reads=None):
+    """Stream fraud alert items from the scored files without materializing either file
+    
+    With joined=True only anomaly_results.csv is read, since it already carries the
+    anomaly_score column. Otherwise the flagged IDs are collected from
+    anomaly_scores.csv first and the details file is streamed against that set.
+    reads maps each key to an incremental read plan; without it both files are
+    read from the top.
+    """
+    reads = reads or {}
+    if joined:
+        for row in read_s3_csv(s3, bucket, RESULTS_KEY, reads.get(RESULTS_KEY)):
+            anomaly_score = float(row['anomaly_score'])
+            if anomaly_score > ANOMALY_THRESHOLD:
+                yield build_alert_item(row['transaction_id'], anomaly_score, row)
+        return
+    
+    flagged = load_flagged_scores(s3, bucket, reads.get(SCORES_KEY))
+    if not flagged:
+        return
+    
+    details_read = reads.get(RESULTS_KEY)
+    yield from join_details(read_s3_csv(s3, bucket, RESULTS_KEY, details_read), flagged)
+    
+    # New scores whose details were written before the checkpoint: look in the older part too
+    if flagged and details_read and details_read['start']:
+        yield from join_details(read_s3_csv(s3, bucket, RESULTS_KEY, dict(details_read, start=0)), flagged)
+    
+    # Flagged transactions missing from the details file keep placeholder details
+    for transaction_id, anomaly_score in flagged.items():
+        yield build_alert_item(transaction_id, anomaly_score)
+
+def scored_objects(event):
+    """(key, etag) of each object under scored/ named by an S3 notification, or None for other events"""
+    records = [r for r in event.get('Records', []) if r.get('eventSource') == 'aws:s3']
+    if not records:
+        return None
+    
+    objects = []
+    for record in records:
+        key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+        # The folder placeholder and the score-only companion of anomaly_results.csv carry no alerts
+        if key.startswith(SCORED_PREFIX) and not key.endswith('/') and key != SCORES_KEY:
+            objects.append((key, record['s3']['object'].get('eTag')))
+    return objects
+
+def processed_marker(s3, bucket, key):
+    """The marker left by the last successful run over key, or None"""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=PROCESSED_PREFIX + key + '.json')
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+    return json.loads(response['Body'].read())
+
+def open_scored_object(s3, bucket, key, etag):
+    """CSV reader over one scored part, pinned to the notified version"""
+    response = s3.get_object(Bucket=bucket, Key=key, IfMatch=f'"{etag}"')
+    return csv.DictReader(iter_s3_lines(response['Body']))
+
+def iter_object_alerts(reader):
+    """Alerts from one scored part: every row above the threshold, with whatever details it carries"""
+    for row in reader:
+        anomaly_score = float(row['anomaly_score'])
+        if anomaly_score > ANOMALY_THRESHOLD:
+            yield build_alert_item(row['transaction_id'], anomaly_score, row)
+
+def process_scored_object(s3, bucket, key, etag, table, metrics, conditional=False):
+    """Write the alerts in one scored object, idempotently
+    
+    A marker per object version skips redelivered notifications outright, and the
+    writes skip alerts that are already stored, so a run that died before leaving
+    its marker can be repeated without overwriting alerts or counting them twice
+    in the metrics.
+    Parts without transaction_id and anomaly_score columns (e.g. raw RCF .out
+    files) are reported as skipped and get no marker.
+    """
+    if not etag:
+        # Hand-built or replayed events may lack the eTag; pin the current version instead
+        etag = s3.head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+    
+    marker = processed_marker(s3, bucket, key)
+    if marker and marker.get('etag') == etag:
+        return {'key': key, 'status': 'already_processed', 'alerts_written': 0}
+    
+    writer = AlertWriter(table, on_written=metrics.add, skip_existing=True, conditional=conditional)
+    try:
+        reader = open_scored_object(s3, bucket, key, etag)
+        missing = [column for column in SCORED_PART_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            print(f"Skipping s3://{bucket}/{key}: no {', '.join(missing)} column")
+            return {'key': key, 'status': 'skipped', 'alerts_written': 0, 'missing_columns': missing}
+        stats = writer.write(iter_object_alerts(reader))
+    except ClientError as e:
+        # The object was overwritten after this notification; the newer one has its own
+        if e.response.get('Error', {}).get('Code') == 'PreconditionFailed':
+            return {'key': key, 'status': 'superseded', 'alerts_written': 0}
+        raise
+    
+    result = {
+        'key': key,
+        'status': 'processed',
+        'alerts_written': stats['items_written'],
+        'skipped_existing': stats['skipped_existing'],
+        'failed_items': stats['failed_items'] + stats['unprocessed_items'],
+        'errors': writer.errors[:MAX_REPORTED_ERRORS]
+    }
+    if result['failed_items']:
+        # No marker, so the next delivery or a manual re-run retries the failed alerts
+        result['status'] = 'incomplete'
+        return result
+    
+    s3.put_object(
+        Bucket=bucket,
+        Key=PROCESSED_PREFIX + key + '.json',
+        Body=json.dumps({'etag': etag, 'alerts_written': stats['items_written'],
+                         'processed_at': datetime.now().isoformat()}).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return result
+
+class AlertWriter:
+    """Fan 25-item BatchWriteItem calls out across a bounded thread pool
+    
+    All workers share the table's single low-level client (boto3 clients are
+    thread safe) and a throttle gate: when any batch comes back throttled, every
+    worker holds off until the backoff window has passed before sending again.
+    on_written, if given, is called with the items of each batch DynamoDB accepted.
+    
+    With skip_existing=True each batch first looks its keys up with one
+    BatchGetItem and only writes, and reports to on_written, the alerts that are
+    not stored yet. Existing alerts, and any review status set on them, are left
+    alone and counted as skipped_existing. A concurrent writer can still create
+    one of the keys between the read and the write, in which case it is
+    overwritten and counted by both.
+    
+    conditional=True closes that gap at the cost of batching: each alert is a
+    PutItem that only succeeds if the transaction ID is not stored yet, since
+    BatchWriteItem cannot take conditions.
+    """
+    
+    def __init__(self, table, concurrency=WRITE_CONCURRENCY, max_retries=MAX_BATCH_RETRIES,
+                 backoff_seconds=BATCH_BACKOFF_SECONDS, on_written=None, conditional=False,
+                 skip_existing=False):
+        self.table = table
+        self.client = table.meta.client
+        self.table_name = table.name
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.on_written = on_written
+        self.conditional = conditional
+        self.skip_existing = skip_existing
+        self.stats = {'items_written': 0, 'batches': 0, 'retries': 0, 'unprocessed_items': 0, 'failed_items': 0}
+        if conditional or skip_existing:
+            self.stats['skipped_existing'] = 0
+        self.errors = []
+        self._lock = threading.Lock()
+        self._throttled_until = 0.0
+    
+    def write(self, items):
+        """Write all items and return the accumulated write statistics"""
+        batches = self._iter_batches(items)
+        
+        if self.concurrency == 1:
+            for batch in batches:
+                self._write_batch(batch)
+            return self.stats
+        
+        # Bound queued batches so a lazy item stream is never fully materialized
+        in_flight = threading.BoundedSemaphore(self.concurrency * 2)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for batch in batches:
+                in_flight.acquire()
+                future = pool.submit(self._write_batch, batch)
+                future.add_done_callback(lambda _: in_flight.release())
+        
+        return self.stats
+    
+    def _iter_batches(self, items):
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, BATCH_WRITE_SIZE))
+            if not chunk:
+                break
+            # A batch may not contain the same key twice; the last write wins as with put_item
+            unique_items = {item['transaction_id']: item for item in chunk}
+            yield [{'PutRequest': {'Item': item}} for item in unique_items.values()]
+    
+    def _write_batch(self, requests):
+        if self.conditional:
+            self._add(batches=1)
+            for request in requests:
+                self._put_new_item(request)
+            return
+        
+        if self.skip_existing:
+            requests = self._drop_existing(requests)
+        
+        attempt = 0
+        
+        while requests:
+            self._wait_for_throttle()
+            
+            try:
+                response = self.client.batch_write_item(RequestItems={self.table_name: requests})
+                unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in THROTTLE_ERROR_CODES:
+                    self._record_failure(requests, e)
+                    return
+                unprocessed = requests
+            except Exception as e:
+                self._record_failure(requests, e)
+                return
+            
+            self._add(batches=1, items_written=len(requests) - len(unprocessed))
+            if self.on_written:
+                self._notify_written(requests, unprocessed)
+            
+            if unprocessed and attempt >= self.max_retries:
+                print(f"Giving up on {len(unprocessed)} unprocessed items after {attempt} retries")
+                self._add(unprocessed_items=len(unprocessed))
+                return
+            
+            if unprocessed:
+                # Exponential backoff with full jitter, applied to every worker
+                self._throttle(random.uniform(0, self.backoff_seconds * (2 ** attempt)))
+                attempt += 1
+                self._add(retries=1)
+            
+            requests = unprocessed
+    
+    def _drop_existing(self, requests):
+        transaction_ids = [request['PutRequest']['Item']['transaction_id'] for request in requests]
+        try:
+            stored = batch_get_alerts(self.table, transaction_ids, attributes=('transaction_id',),
+                                      max_retries=self.max_retries, backoff_seconds=self.backoff_seconds)
+        except Exception as e:
+            self._record_failure(requests, e)
+            return []
+        
+        self._add(skipped_existing=len(stored))
+        return [request for request in requests if request['PutRequest']['Item']['transaction_id'] not in stored]
+    
+    def _put_new_item(self, request):
+        item = request['PutRequest']['Item']
+        attempt = 0
+        
+        while True:
+            self._wait_for_throttle()
+            
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item=item,
+                    ConditionExpression='attribute_not_exists(transaction_id)'
+                )
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code == 'ConditionalCheckFailedException':
+                    self._add(skipped_existing=1)
+                    return
+                if code not in THROTTLE_ERROR_CODES or attempt >= self.max_retries:
+                    self._record_failure([request], e)
+                    return
+                self._throttle(random.uniform(0, self.backoff_seconds * (2 ** attempt)))
+                attempt += 1
+                self._add(retries=1)
+                continue
+            except Exception as e:
+                self._record_failure([request], e)
+                return
+            
+            self._add(items_written=1)
+            if self.on_written:
+                self.on_written([item])
+            return
+    
+    def _notify_written(self, requests, unprocessed):
+        pending = {request['PutRequest']['Item']['transaction_id'] for request in unprocessed}
+        self.on_written([
+            request['PutRequest']['Item'] for request in requests
+            if request['PutRequest']['Item']['transaction_id'] not in pending
+        ])
+    
+    def _throttle(self, delay):
+        with self._lock:
+            self._throttled_until = max(self._throttled_until, time.monotonic() + delay)
+    
+    def _wait_for_throttle(self):
+        with self._lock:
+            remaining = self._throttled_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+    
+    def _add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+    
+    def _record_failure(self, requests, error):
+        print(f"Failed to write batch of {len(requests)} items: {str(error)}")
+        with self._lock:
+            self.stats['failed_items'] += len(requests)
+            for request in requests:
+                self.errors.append({
+                    'transaction_id': request['PutRequest']['Item']['transaction_id'],
+                    'error': str(error)
+                })
+
+def batch_write_alerts(table, items, max_retries=MAX_BATCH_RETRIES, backoff_seconds=BATCH_BACKOFF_SECONDS,
+                       concurrency=1):
+    """Write items with 25-item BatchWriteItem calls, retrying unprocessed items with exponential backoff"""
+    writer = AlertWriter(table, concurrency=concurrency, max_retries=max_retries, backoff_seconds=backoff_seconds)
+    return writer.write(items)
+
+def flush_alert_metrics(metrics, metrics_table):
+    """Fold this run's aggregates into the summary item; the alerts themselves are already stored"""
+    try:
+        metrics.flush(metrics_table)
+    except Exception as e:
+        print(f"Failed to update alert metrics: {str(e)}")
 
 def lambda_handler(event, context):
-    s3 = boto3.client('s3')
-    dynamodb = boto3.resource('dynamodb')
+    timing = begin_invocation()
     
+    # Clients and table handle are created once per container and reused while warm;
+    # one pooled connection per concurrent writer so batches never queue for a socket
+    s3 = get_s3_client()
     bucket = os.environ['S3_BUCKET']
     table_name = os.environ['DYNAMODB_TABLE']
-    table = dynamodb.Table(table_name)
+    table = get_table(table_name, max_pool_connections=max(10, WRITE_CONCURRENCY))
+    metrics_table_name = os.environ.get('METRICS_TABLE', '')
+    
+    # Running totals of what this run stores, folded into the summary item at the end
+    metrics = AlertMetrics()
+    
+    # Per-alert conditional puts instead of batched read-then-write, for deployments
+    # where two processor runs may write the same transaction at once
+    conditional = os.environ.get('CONDITIONAL_WRITES', 'false').lower() == 'true'
+    
+    # S3 notifications name the scored parts to process; each is handled on its own,
+    # so split transform output is spread over concurrent invocations
+    objects = scored_objects(event)
+    if objects is not None:
+        results = []
+        try:
+            for key, etag in objects:
+                try:
+                    results.append(process_scored_object(s3, bucket, key, etag, table, metrics, conditional))
+                except Exception as e:
+                    print(f"Error processing s3://{bucket}/{key}: {str(e)}")
+                    results.append({'key': key, 'status': 'error', 'alerts_written': 0, 'error': str(e)})
+        finally:
+            if metrics_table_name:
+                flush_alert_metrics(metrics, get_table(metrics_table_name))
+        
+        alerts_written = sum(result['alerts_written'] for result in results)
+        body = json.dumps({
+            'message': f'Processed {len(results)} scored objects, {alerts_written} new fraud alerts',
+            'alerts_written': alerts_written,
+            'write_mode': 'conditional_put' if conditional else 'batch_skip_existing',
+            'objects': results,
+            'timing': end_invocation(timing, 'fraud-processor')
+        })
+        
+        failed = [result['key'] for result in results if result['status'] in ('error', 'incomplete')]
+        if failed:
+            # Raising, not returning a 500, is what makes Lambda retry an async S3 event
+            print(body)
+            raise RuntimeError(f"Scored objects not fully processed: {', '.join(failed)}")
+        
+        return {'statusCode': 200, 'body': body}
     
     try:
-        # Read anomaly scores from S3
-        response = s3.get_object(Bucket=bucket, Key='scored/anomaly_scores.csv')
-        content = response['Body'].read().decode('utf-8')
+        # Join scores with transaction details, keeping only flagged transactions
+        joined = os.environ.get('SCORED_INPUT', 'split').lower() == 'joined'
         
-        # Parse CSV
-        csv_reader = csv.DictReader(content.splitlines())
-        fraud_alerts = []
+        # Incremental runs only read what was added to the scored files since the checkpoint
+        incremental = os.environ.get('INCREMENTAL', 'false').lower() == 'true'
+        reads = None
+        if incremental:
+            checkpoint = load_checkpoint(s3, bucket)
+            keys = [RESULTS_KEY] if joined else [SCORES_KEY, RESULTS_KEY]
+            reads = {key: plan_incremental_read(s3, bucket, key, checkpoint.get(key)) for key in keys}
         
-        for row in csv_reader:
-            anomaly_score = float(row['anomaly_score'])
-            
-            # Filter transactions with anomaly_score > 2.5
-            if anomaly_score > 2.5:
-                fraud_alerts.append({
-                    'transaction_id': row['transaction_id'],
-                    'anomaly_score': anomaly_score,
-                    'is_anomaly': row['is_anomaly']
-                })
+        alerts = iter_fraud_alerts(s3, bucket, joined=joined, reads=reads)
         
-        # Get additional transaction details from original results
-        response = s3.get_object(Bucket=bucket, Key='scored/anomaly_results.csv')
-        content = response['Body'].read().decode('utf-8')
-        csv_reader = csv.DictReader(content.splitlines())
-        
-        transaction_details = {}
-        for row in csv_reader:
-            transaction_details[row['transaction_id']] = {
-                'customer_id': row['customer_id'],
-                'amount': float(row['amount']),
-                'timestamp': row['timestamp']
-            }
+        # The metrics are ADDed for every alert a write stores, so while they are
+        # maintained only writes that create an alert may feed them: stored alerts
+        # are skipped instead of overwritten and recounted. Incremental runs skip
+        # them too, so re-read rows never reset an existing alert.
+        skip_existing = incremental or bool(metrics_table_name)
         
         # Write fraud alerts to DynamoDB
-        alerts_written = 0
-        for alert in fraud_alerts:
-            transaction_id = alert['transaction_id']
-            details = transaction_details.get(transaction_id, {})
-            
-            item = {
-                'transaction_id': transaction_id,
-                'customer_id': details.get('customer_id', 'UNKNOWN'),
-                'amount': Decimal(str(details.get('amount', 0.0))),
-                'anomaly_score': Decimal(str(alert['anomaly_score'])),
-                'timestamp': details.get('timestamp', datetime.now().isoformat()),
-                'alert_created': datetime.now().isoformat(),
-                'status': 'PENDING_REVIEW'
+        errors = []
+        try:
+            if skip_existing or os.environ.get('BATCH_WRITES', 'true').lower() == 'true':
+                writer = AlertWriter(table, on_written=metrics.add, skip_existing=skip_existing,
+                                     conditional=skip_existing and conditional)
+                write_stats = writer.write(alerts)
+                errors = writer.errors
+            else:
+                write_stats = {'items_written': 0, 'batches': 0, 'retries': 0, 'unprocessed_items': 0, 'failed_items': 0}
+                for item in alerts:
+                    table.put_item(Item=item)
+                    metrics.add([item])
+                    write_stats['items_written'] += 1
+        finally:
+            # Alerts stored before a failure are still counted
+            if metrics_table_name:
+                flush_alert_metrics(metrics, get_table(metrics_table_name))
+        
+        alerts_written = write_stats['items_written']
+        
+        body = {
+            'message': f'Successfully processed {alerts_written} fraud alerts',
+            'alerts_written': alerts_written,
+            'batches': write_stats['batches'],
+            'retries': write_stats['retries'],
+            'unprocessed_items': write_stats['unprocessed_items'],
+            'failed_items': write_stats['failed_items'],
+            'errors': errors[:MAX_REPORTED_ERRORS]
+        }
+        if skip_existing:
+            body['skipped_existing'] = write_stats['skipped_existing']
+            body['write_mode'] = 'conditional_put' if conditional else 'batch_skip_existing'
+        
+        if incremental:
+            # Only advance past rows whose alerts are all stored; otherwise the next run retries them
+            complete = not write_stats['failed_items'] and not write_stats['unprocessed_items']
+            if complete:
+                save_checkpoint(s3, bucket, reads)
+            body['incremental'] = {
+                'skipped_existing': write_stats['skipped_existing'],
+                'resumed_at': {key: read['start'] for key, read in reads.items()},
+                'checkpoint_saved': complete
             }
-            
-            table.put_item(Item=item)
-            alerts_written += 1
         
+        body['timing'] = end_invocation(timing, 'fraud-processor')
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'message': f'Successfully processed {alerts_written} fraud alerts',
-                'alerts_written': alerts_written
-            })
+            'body': json.dumps(body)
         }
         
     except Exception as e:
@@ -78,6 +640,7 @@ def lambda_handler(event, context):
         return {
             'statusCode': 500,
             'body': json.dumps({
-                'error': str(e)
+                'error': str(e),
+                'timing': end_invocation(timing, 'fraud-processor')
             })
         }
\ No newline at end of file
@@ -0,0 +1,87 @@
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Everything the investigator needs from a question, parsed once up front
+ParsedQuery = namedtuple('ParsedQuery', ['intent', 'limit', 'transaction_ids', 'customer_ids', 'date_range'])
+
+# Compiled once per container. Keywords come from one word scan; the entity
+# patterns only run when a cheap substring check says they can match.
+WORD_PATTERN = re.compile(r'[a-z]+')
+TRANSACTION_PATTERN = re.compile(r'\bTXN\w+')
+CUSTOMER_PATTERN = re.compile(r'\bCUST\d+\b')
+DATE_PATTERN = re.compile(r'\b\d{4}-\d{2}-\d{2}\b')
+# Bare numbers only, not digits inside IDs or dates
+NUMBER_PATTERN = re.compile(r'(?<![\w-])\d+(?![\w-])')
+
+# Words that carry meaning for routing, mapped to the feature they signal
+KEYWORDS = {
+    'top': 'top',
+    'anomalous': 'anomalous',
+    'risky': 'anomalous',
+    'suspicious': 'anomalous',
+    'highest': 'highest',
+    'scores': 'scores',
+    'explain': 'explain',
+    'transaction': 'transaction',
+    'summary': 'summary',
+    'metrics': 'summary',
+    'count': 'count',
+    'many': 'count',
+    'today': 'today',
+    'yesterday': 'yesterday',
+}
+_KEYWORD_SET = frozenset(KEYWORDS)
+
+# (intent, features that must all be present), highest priority first.
+# A question naming a customer ID is about that customer unless it asks to explain.
+INTENT_RULES = (
+    ('customer_alerts', frozenset({'customer'})),
+    ('top_anomalous', frozenset({'top', 'anomalous'})),
+    ('highest_scores', frozenset({'highest', 'scores'})),
+    ('explain_transaction', frozenset({'explain', 'transaction'})),
+    ('summary', frozenset({'summary'})),
+    ('count', frozenset({'count'})),
+)
+DEFAULT_INTENT = 'overview'
+
+def parse_query(query, today=None):
+    """Classify a question and pull out its limit, IDs and date range
+
+    Cost is a fixed handful of precompiled scans over the query, however many
+    intents exist; handlers read the result instead of re-splitting the text.
+    """
+    query_lower = query.lower()
+    features = {KEYWORDS[word] for word in _KEYWORD_SET.intersection(WORD_PATTERN.findall(query_lower))}
+
+    transaction_ids = TRANSACTION_PATTERN.findall(query) if 'txn' in query_lower else []
+    customer_ids = CUSTOMER_PATTERN.findall(query) if 'cust' in query_lower else []
+    dates = DATE_PATTERN.findall(query) if '-' in query else []
+    number = NUMBER_PATTERN.search(query)
+    limit = int(number.group()) if number else None
+
+    if transaction_ids:
+        features.add('transaction')
+    if customer_ids and 'explain' not in features:
+        features.add('customer')
+
+    intent = DEFAULT_INTENT
+    for candidate, required in INTENT_RULES:
+        if required <= features:
+            intent = candidate
+            break
+
+    return ParsedQuery(intent, limit, transaction_ids, customer_ids, _date_range(dates, features, today))
+
+def _date_range(dates, features, today):
+    """Inclusive (start, end) ISO dates mentioned in the question, or None"""
+    if dates:
+        return min(dates), max(dates)
+
+    today = today or date.today()
+    if 'today' in features:
+        return today.isoformat(), today.isoformat()
+    if 'yesterday' in features:
+        yesterday = (today - timedelta(days=1)).isoformat()
+        return yesterday, yesterday
+    return None
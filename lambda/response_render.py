@@ -0,0 +1,90 @@
+import hashlib
+import json
+from decimal import Decimal
+from alert_metrics import risk_bucket
+
+# Answer formats the investigator API can return
+RESPONSE_FORMATS = ('text', 'json')
+
+class Response:
+    """An investigator answer: lines of text plus the structured records behind them
+
+    Handlers append lines and records instead of growing one string with +=,
+    which is only linear while CPython can resize the string in place. An N-row
+    answer is one join at the end, or none at all when streamed with write_to.
+    """
+
+    def __init__(self, intent=None):
+        self.intent = intent
+        self.chunks = []
+        self.records = []
+        # False for answers that report a failure and must not be reused from a cache
+        self.cacheable = True
+
+    @classmethod
+    def message(cls, text, intent=None):
+        """A one-line answer with no records, e.g. 'not found'"""
+        return cls(intent).add(text)
+
+    @classmethod
+    def error(cls, text, intent=None):
+        """A one-line failure report, never cached"""
+        response = cls.message(text, intent)
+        response.cacheable = False
+        return response
+
+    def add(self, *lines):
+        # One chunk per call, so a five-line row is one string rather than five
+        self.chunks.append('\n'.join(lines))
+        return self
+
+    def record(self, record):
+        self.records.append(record)
+        return self
+
+    def text(self):
+        return '\n'.join(self.chunks)
+
+    def __str__(self):
+        return self.text()
+
+    def write_to(self, stream):
+        """Write the text to a file-like object chunk by chunk, never building the full string"""
+        for chunk in self.chunks:
+            stream.write(chunk)
+            stream.write('\n')
+
+    def write_json(self, stream):
+        """Write the records as a JSON array one record at a time"""
+        stream.write('[')
+        for i, record in enumerate(self.records):
+            if i:
+                stream.write(',')
+            stream.write(encode_compact(record))
+        stream.write(']')
+
+    def to_dict(self):
+        return {'intent': self.intent, 'response': self.text(), 'records': self.records}
+
+def alert_record(item, *fields):
+    """The given fields of an alert item, with DynamoDB Decimals as floats so they serialize
+
+    Records that carry an anomaly_score also get its risk_bucket, so clients can
+    group alerts without repeating the thresholds.
+    """
+    record = {
+        field: float(item[field]) if isinstance(item.get(field), Decimal) else item.get(field)
+        for field in fields
+    }
+    if record.get('anomaly_score') is not None:
+        record['risk_bucket'] = risk_bucket(record['anomaly_score'])
+    return record
+
+def encode_compact(payload):
+    """JSON without the default spaces after separators"""
+    return json.dumps(payload, separators=(',', ':'))
+
+def etag(payload):
+    """Strong ETag over the compact encoding, so identical answers get identical tags"""
+    digest = hashlib.blake2b(encode_compact(payload).encode('utf-8'), digest_size=8).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import boto3
+from botocore.exceptions import ClientError
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from alert_scan import scan_items, score_shard, SCORE_SHARDS
+
+def backfill_score_shards(table, shards=SCORE_SHARDS):
+    """Set score_shard on every alert that lacks it or has one from a different shard count
+
+    Alerts written before the score-index GSI existed are invisible to top-N
+    questions until they carry the attribute. Re-running the processor cannot
+    fix them: it skips alerts that already exist.
+    """
+    stats = {'scanned': 0, 'updated': 0, 'missing': 0}
+    for item in scan_items(table, attributes=('transaction_id', 'score_shard')):
+        stats['scanned'] += 1
+        shard = score_shard(item['transaction_id'], shards)
+        if item.get('score_shard') == shard:
+            continue
+
+        try:
+            table.update_item(
+                Key={'transaction_id': item['transaction_id']},
+                UpdateExpression='SET score_shard = :shard',
+                # Never recreate an alert deleted since the scan read it
+                ConditionExpression='attribute_exists(transaction_id)',
+                ExpressionAttributeValues={':shard': shard}
+            )
+            stats['updated'] += 1
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            stats['missing'] += 1
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill score_shard so every alert appears in the score-index GSI")
+    parser.add_argument('--table', default='fraud-alerts')
+    parser.add_argument('--shards', type=int, default=SCORE_SHARDS, help="Must match SCORE_SHARDS of the Lambdas")
+    args = parser.parse_args()
+
+    stats = backfill_score_shards(boto3.resource('dynamodb').Table(args.table), args.shards)
+
+    print(f"Scanned {stats['scanned']} alerts")
+    print(f"- score_shard set: {stats['updated']}")
+    print(f"- deleted during the backfill: {stats['missing']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from alert_scan import top_k
+from alert_columns import AlertColumns, np
+from query_router import parse_query
+from response_render import Response, alert_record
+
+# Mix of the phrasings sent by the demo script and chat UI
+ROUTER_QUERIES = [
+    "Show me the top 3 anomalous transactions",
+    "List customers with highest fraud scores",
+    "Explain why transaction TXN999004 was flagged as suspicious",
+    "Give me a summary of fraud metrics",
+    "How many fraud alerts do we have?",
+    "Show alerts for customer CUST9004",
+    "What is going on today?",
+]
+
+def synthetic_alerts(count):
+    """Yield alerts shaped like scanned DynamoDB items"""
+    for i in range(count):
+        yield {
+            'transaction_id': f'TXN{i:09d}',
+            'customer_id': f'CUST{i % 50000:05d}',
+            'amount': Decimal(f'{(i * 7919) % 50000}.25'),
+            'anomaly_score': Decimal(f'{2.5 + ((i * 104729) % 35000) / 10000:.4f}')
+        }
+
+def full_sort(items, k):
+    # Pre-heap behaviour: sort every alert to keep k of them
+    return sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)[:k]
+
+def measure(rank, alerts, k):
+    # Latency: rank an already-scanned list so item generation is not timed
+    items = list(synthetic_alerts(alerts))
+    start = time.perf_counter()
+    top = rank(iter(items), k)
+    elapsed = time.perf_counter() - start
+    del items
+
+    # Memory: rank a live stream, as the investigator does with scan pages
+    tracemalloc.start()
+    rank(synthetic_alerts(alerts), k)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top, elapsed, peak / (1024 * 1024)
+
+def benchmark_topk(alerts, ks):
+    print("TOP-K RANKING - FULL SORT VS BOUNDED HEAP")
+    print("=" * 60)
+    print(f"{'Mode':<10} {'Alerts':>10} {'K':>6} {'Seconds':>9} {'Peak MB':>9}")
+
+    for k in ks:
+        expected = None
+        for mode, rank in [('sort', full_sort), ('heap', top_k)]:
+            top, elapsed, peak = measure(rank, alerts, k)
+            if expected is None:
+                expected = top
+            assert top == expected, "heap and sort rankings differ"
+            print(f"{mode:<10} {alerts:>10,} {k:>6} {elapsed:>9.3f} {peak:>9.1f}")
+
+def item_questions(items):
+    # Pre-columnar behaviour: every question converts Decimals per item
+    total_amount = sum(float(item['amount']) for item in items)
+    critical = sum(1 for item in items if float(item['anomaly_score']) > 5.0)
+    top = top_k(items, 5)
+    best = {}
+    for item in items:
+        score = float(item['anomaly_score'])
+        if item['customer_id'] not in best or score > best[item['customer_id']]:
+            best[item['customer_id']] = score
+    return total_amount, critical, [item['transaction_id'] for item in top], len(best)
+
+def column_questions(columns):
+    total_amount = columns.total('amounts')
+    critical = columns.bucket_counts()['critical']
+    top = columns.top_indices(5)
+    best = columns.best_row_per_customer()
+    return total_amount, critical, [columns.transaction_ids[i] for i in top], len(best)
+
+def benchmark_columns(alerts, rounds):
+    print("INVESTIGATOR AGGREGATES - DECIMAL ITEMS VS COLUMNAR SNAPSHOT")
+    print(f"NumPy: {'yes' if np is not None else 'no (array fallback)'}")
+    print("=" * 60)
+
+    tracemalloc.start()
+    items = list(synthetic_alerts(alerts))
+    _, items_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    columns = AlertColumns.from_items(synthetic_alerts(alerts))
+    _, columns_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        expected = item_questions(items)
+    items_elapsed = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    AlertColumns.from_items(items)
+    build_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = column_questions(columns)
+    columns_elapsed = (time.perf_counter() - start) / rounds
+
+    assert result[2] == expected[2] and result[1:] == expected[1:], "columnar answers differ"
+    assert abs(result[0] - expected[0]) < 1e-6 * max(1.0, expected[0])
+
+    print(f"{'Snapshot':<10} {'Alerts':>10} {'Peak MB':>9} {'Build s':>9} {'Per round s':>12}")
+    print(f"{'items':<10} {alerts:>10,} {items_peak / (1024 * 1024):>9.1f} {'-':>9} {items_elapsed:>12.3f}")
+    print(f"{'columns':<10} {alerts:>10,} {columns_peak / (1024 * 1024):>9.1f} {build_elapsed:>9.3f} {columns_elapsed:>12.3f}")
+
+def legacy_route(query):
+    # Pre-router behaviour: substring chain, then the handler re-splits the query
+    query_lower = query.lower()
+    if "top" in query_lower and ("anomalous" in query_lower or "risky" in query_lower):
+        return 'top_anomalous', next((int(word) for word in query.split() if word.isdigit()), 5)
+    elif "highest" in query_lower and "scores" in query_lower:
+        return 'highest_scores', None
+    elif "explain" in query_lower and "transaction" in query_lower:
+        return 'explain_transaction', next((word for word in query.split() if word.startswith('TXN')), None)
+    elif "summary" in query_lower or "metrics" in query_lower:
+        return 'summary', None
+    elif "count" in query_lower:
+        return 'count', None
+    return 'overview', None
+
+def benchmark_router(iterations):
+    print("QUERY ROUTING - SUBSTRING CHAIN VS COMPILED ROUTER")
+    print("=" * 60)
+    print(f"{'Mode':<10} {'Queries':>10} {'Seconds':>9} {'Queries/s':>12}")
+
+    queries = ROUTER_QUERIES * (iterations // len(ROUTER_QUERIES) + 1)
+    queries = queries[:iterations]
+    for mode, route in [('chain', legacy_route), ('router', parse_query)]:
+        start = time.perf_counter()
+        for query in queries:
+            route(query)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<10} {iterations:>10,} {elapsed:>9.3f} {iterations / elapsed:>12,.0f}")
+
+def concat_render(items):
+    # Pre-Response behaviour: grow one string with += for every line of every row
+    result = f"Here are the top {len(items)} most anomalous transactions:\n\n"
+    for i, item in enumerate(items, 1):
+        result += f"{i}. Transaction {item['transaction_id']}\n"
+        result += f"   Customer: {item['customer_id']}\n"
+        result += f"   Amount: ${float(item['amount']):,.2f}\n"
+        result += f"   Risk Score: {float(item['anomaly_score']):.1f}\n\n"
+    return result
+
+def response_render(items):
+    response = Response().add(f"Here are the top {len(items)} most anomalous transactions:", "")
+    for i, item in enumerate(items, 1):
+        record = alert_record(item, 'transaction_id', 'customer_id', 'amount', 'anomaly_score')
+        response.record(record).add(
+            f"{i}. Transaction {record['transaction_id']}",
+            f"   Customer: {record['customer_id']}",
+            f"   Amount: ${record['amount']:,.2f}",
+            f"   Risk Score: {record['anomaly_score']:.1f}",
+            ""
+        )
+    return response
+
+def benchmark_render(rows, rounds):
+    print("RESPONSE RENDERING - STRING += VS LINE JOIN VS STREAMING")
+    print("=" * 60)
+    print(f"{'Mode':<10} {'Rows':>10} {'Seconds':>9} {'Peak MB':>9} {'Output MB':>10}")
+
+    items = list(synthetic_alerts(rows))
+    with open(os.devnull, 'w') as sink:
+        modes = [
+            ('concat', lambda: concat_render(items)),
+            ('join', lambda: response_render(items).text()),
+            ('json', lambda: response_render(items).write_json(io.StringIO())),
+            ('stream', lambda: response_render(items).write_to(sink)),
+        ]
+        for mode, render in modes:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                output = render()
+            elapsed = (time.perf_counter() - start) / rounds
+
+            tracemalloc.start()
+            output = render()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            size = len(output) / (1024 * 1024) if isinstance(output, str) else 0
+            print(f"{mode:<10} {rows:>10,} {elapsed:>9.3f} {peak / (1024 * 1024):>9.1f} {size:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the FraudInvestigator queries')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    topk_parser = subparsers.add_parser('topk', help='Full sort vs bounded heap for top-N rankings')
+    topk_parser.add_argument('--alerts', type=int, default=1000000)
+    topk_parser.add_argument('--k', type=int, nargs='+', default=[3, 5, 500])
+
+    columns_parser = subparsers.add_parser('columns', help='Per-item Decimal aggregates vs the columnar snapshot')
+    columns_parser.add_argument('--alerts', type=int, default=200000)
+    columns_parser.add_argument('--rounds', type=int, default=5)
+
+    router_parser = subparsers.add_parser('router', help='Queries/sec through the intent router')
+    router_parser.add_argument('--iterations', type=int, default=200000)
+
+    render_parser = subparsers.add_parser('render', help='Building and streaming a large investigator answer')
+    render_parser.add_argument('--rows', type=int, default=10000)
+    render_parser.add_argument('--rounds', type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == 'topk':
+        benchmark_topk(args.alerts, args.k)
+    elif args.command == 'columns':
+        benchmark_columns(args.alerts, args.rounds)
+    elif args.command == 'router':
+        benchmark_router(args.iterations)
+    elif args.command == 'render':
+        benchmark_render(args.rows, args.rounds)
+
+if __name__ == "__main__":
+    main()
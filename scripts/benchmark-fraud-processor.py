@@ -0,0 +1,279 @@
+import argparse
+import csv
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from lambda_function import read_s3_csv, batch_write_alerts, AlertWriter, iter_fraud_alerts, build_alert_item
+
+SCORES_HEADER = 'transaction_id,anomaly_score,is_anomaly'
+RESULTS_HEADER = 'transaction_id,customer_id,amount,timestamp'
+JOINED_HEADER = 'transaction_id,customer_id,amount,timestamp,anomaly_score,is_anomaly'
+
+def synthetic_score(i):
+    # Roughly 1% of transactions land above the 2.5 alert threshold
+    return 2.5 + (i % 997) / 400 if i % 97 == 0 else (i % 1000) / 500
+
+def scores_row(i):
+    score = synthetic_score(i)
+    return f'TXN{i:09d},{score:.3f},{score > 2.5}\n'
+
+def results_row(i):
+    return f'TXN{i:09d},CUST{i % 50000:05d},{(i % 5000) + 0.25:.2f},2025-01-15 {i % 24:02d}:30:00\n'
+
+def joined_row(i):
+    score = synthetic_score(i)
+    return f'{results_row(i)[:-1]},{score:.3f},{score > 2.5}\n'
+
+SYNTHETIC_FILES = {
+    'scored/anomaly_scores.csv': (SCORES_HEADER, scores_row),
+    'scored/anomaly_results.csv': (RESULTS_HEADER, results_row)
+}
+
+class SyntheticBody:
+    """File-like stand-in for an S3 StreamingBody that generates rows lazily"""
+
+    def __init__(self, header, make_row, rows):
+        self.make_row = make_row
+        self.rows = rows
+        self.next_row = 0
+        self.buffer = (header + '\n').encode()
+
+    def _fill(self, size):
+        parts = [self.buffer]
+        length = len(self.buffer)
+        while self.next_row < self.rows and (size is None or length < size):
+            line = self.make_row(self.next_row).encode()
+            parts.append(line)
+            length += len(line)
+            self.next_row += 1
+        self.buffer = b''.join(parts)
+
+    def read(self, amt=None):
+        self._fill(amt)
+        if amt is None:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:amt], self.buffer[amt:]
+        return data
+
+class SyntheticS3:
+    def __init__(self, rows, files=SYNTHETIC_FILES):
+        self.rows = rows
+        self.files = files
+
+    def get_object(self, Bucket, Key):
+        header, make_row = self.files[Key]
+        return {'Body': SyntheticBody(header, make_row, self.rows)}
+
+class SimulatedClient:
+    """DynamoDB client stand-in charging a fixed round trip per call and throttling some writes"""
+
+    def __init__(self, latency, throttle_rate):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+
+    def batch_write_item(self, RequestItems):
+        self.calls += 1
+        time.sleep(self.latency)
+        unprocessed = {}
+        for table_name, requests in RequestItems.items():
+            leftover = [r for r in requests if random.random() < self.throttle_rate]
+            if leftover:
+                unprocessed[table_name] = leftover
+        return {'UnprocessedItems': unprocessed}
+
+class SimulatedTable:
+    def __init__(self, latency, throttle_rate):
+        self.name = 'fraud-alerts-bench'
+        self.meta = type('Meta', (), {'client': SimulatedClient(latency, throttle_rate)})()
+
+    def put_item(self, Item):
+        self.meta.client.calls += 1
+        time.sleep(self.meta.client.latency)
+
+def local_table(endpoint_url):
+    import boto3
+
+    dynamodb = boto3.resource('dynamodb', endpoint_url=endpoint_url, region_name='us-east-1')
+    table = dynamodb.Table('fraud-alerts-bench')
+    try:
+        table.load()
+    except Exception:
+        table = dynamodb.create_table(
+            TableName='fraud-alerts-bench',
+            KeySchema=[{'AttributeName': 'transaction_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'transaction_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table.wait_until_exists()
+    return table
+
+def benchmark_writes(alerts, latency, throttle_rate, endpoint_url, concurrency):
+    items = [
+        {
+            'transaction_id': f'TXN{i:09d}',
+            'customer_id': f'CUST{i % 5000:04d}',
+            'amount': Decimal('1250.50'),
+            'anomaly_score': Decimal('3.1'),
+            'status': 'PENDING_REVIEW'
+        }
+        for i in range(alerts)
+    ]
+
+    print("DYNAMODB ALERT WRITES - PUT_ITEM VS BATCH_WRITE_ITEM")
+    print("=" * 60)
+    if endpoint_url:
+        print(f"Target: DynamoDB at {endpoint_url}")
+    else:
+        print(f"Target: simulated table ({latency * 1000:.0f} ms round trip, {throttle_rate:.0%} throttled)")
+    print(f"{'Mode':<10} {'Alerts':>8} {'Calls':>8} {'Retries':>8} {'Seconds':>9} {'Alerts/s':>10}")
+
+    for mode in ['put_item', 'batch', 'parallel']:
+        table = local_table(endpoint_url) if endpoint_url else SimulatedTable(latency, throttle_rate)
+        start = time.perf_counter()
+
+        if mode == 'put_item':
+            for item in items:
+                table.put_item(Item=item)
+            calls, retries = len(items), 0
+        elif mode == 'batch':
+            stats = batch_write_alerts(table, items)
+            calls, retries = stats['batches'], stats['retries']
+        else:
+            stats = AlertWriter(table, concurrency=concurrency).write(items)
+            calls, retries = stats['batches'], stats['retries']
+
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<10} {alerts:>8,} {calls:>8,} {retries:>8,} {elapsed:>9.2f} {alerts / elapsed:>10,.0f}")
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_reader(mode, rows):
+    s3 = SyntheticS3(rows)
+    start = time.perf_counter()
+
+    if mode == 'streaming':
+        csv_reader = read_s3_csv(s3, 'bench-bucket', 'scored/anomaly_scores.csv')
+    else:
+        # Pre-streaming behaviour: whole body, decoded string and line list at once
+        content = s3.get_object(Bucket='bench-bucket', Key='scored/anomaly_scores.csv')['Body'].read().decode('utf-8')
+        csv_reader = csv.DictReader(content.splitlines())
+
+    flagged = sum(1 for row in csv_reader if float(row['anomaly_score']) > 2.5)
+    elapsed = time.perf_counter() - start
+    print(f"{mode},{rows},{flagged},{elapsed:.2f},{peak_rss_mb():.1f}")
+
+def legacy_join(s3, bucket):
+    # Pre-rework behaviour: a details dict for every row of anomaly_results.csv
+    fraud_alerts = []
+    for row in read_s3_csv(s3, bucket, 'scored/anomaly_scores.csv'):
+        anomaly_score = float(row['anomaly_score'])
+        if anomaly_score > 2.5:
+            fraud_alerts.append({'transaction_id': row['transaction_id'], 'anomaly_score': anomaly_score})
+
+    transaction_details = {}
+    for row in read_s3_csv(s3, bucket, 'scored/anomaly_results.csv'):
+        transaction_details[row['transaction_id']] = {
+            'customer_id': row['customer_id'],
+            'amount': float(row['amount']),
+            'timestamp': row['timestamp']
+        }
+
+    for alert in fraud_alerts:
+        yield build_alert_item(alert['transaction_id'], alert['anomaly_score'],
+                               transaction_details.get(alert['transaction_id']))
+
+def run_join(mode, rows):
+    start = time.perf_counter()
+
+    if mode == 'legacy':
+        alerts = legacy_join(SyntheticS3(rows), 'bench-bucket')
+    elif mode == 'lean':
+        alerts = iter_fraud_alerts(SyntheticS3(rows), 'bench-bucket')
+    else:
+        s3 = SyntheticS3(rows, files={'scored/anomaly_results.csv': (JOINED_HEADER, joined_row)})
+        alerts = iter_fraud_alerts(s3, 'bench-bucket', joined=True)
+
+    flagged = sum(1 for _ in alerts)
+    elapsed = time.perf_counter() - start
+    print(f"{mode},{rows},{flagged},{elapsed:.2f},{peak_rss_mb():.1f}")
+
+def benchmark_join(rows):
+    print("SCORES / DETAILS JOIN - MEMORY AND LATENCY")
+    print("=" * 60)
+    print(f"{'Mode':<8} {'Rows':>12} {'Alerts':>9} {'Seconds':>9} {'Peak RSS (MB)':>15}")
+
+    for mode in ['legacy', 'lean', 'joined']:
+        output = subprocess.run(
+            [sys.executable, __file__, 'join-run', '--mode', mode, '--rows', str(rows)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        _, _, flagged, elapsed, rss = output.split(',')
+        print(f"{mode:<8} {rows:>12,} {int(flagged):>9,} {float(elapsed):>9.2f} {float(rss):>15.1f}")
+
+def benchmark_streaming(sizes):
+    print("S3 CSV READER - PEAK RSS VS FILE SIZE")
+    print("=" * 60)
+    print(f"{'Mode':<10} {'Rows':>12} {'Seconds':>9} {'Peak RSS (MB)':>15}")
+
+    for rows in sizes:
+        for mode in ['wholefile', 'streaming']:
+            # Fresh interpreter per measurement so peak RSS is not shared
+            output = subprocess.run(
+                [sys.executable, __file__, 'reader', '--mode', mode, '--rows', str(rows)],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+            _, _, _, elapsed, rss = output.split(',')
+            print(f"{mode:<10} {rows:>12,} {float(elapsed):>9.2f} {float(rss):>15.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the fraud processor Lambda')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    streaming_parser = subparsers.add_parser('streaming', help='Peak RSS of whole-file vs streaming S3 reads')
+    streaming_parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000, 5000000])
+
+    reader_parser = subparsers.add_parser('reader', help='Single reader measurement (used internally)')
+    reader_parser.add_argument('--mode', choices=['wholefile', 'streaming'], required=True)
+    reader_parser.add_argument('--rows', type=int, required=True)
+
+    join_parser = subparsers.add_parser('join', help='Memory and latency of the scores/details join')
+    join_parser.add_argument('--rows', type=int, default=10000000)
+
+    join_run_parser = subparsers.add_parser('join-run', help='Single join measurement (used internally)')
+    join_run_parser.add_argument('--mode', choices=['legacy', 'lean', 'joined'], required=True)
+    join_run_parser.add_argument('--rows', type=int, required=True)
+
+    writes_parser = subparsers.add_parser('writes', help='Alert write throughput of put_item vs batched writes')
+    writes_parser.add_argument('--alerts', type=int, default=2000)
+    writes_parser.add_argument('--latency', type=float, default=0.005, help='Simulated round trip in seconds')
+    writes_parser.add_argument('--throttle-rate', type=float, default=0.05, help='Simulated share of unprocessed items')
+    writes_parser.add_argument('--endpoint-url', help='Use a DynamoDB Local endpoint instead of the simulation')
+    writes_parser.add_argument('--concurrency', type=int, default=8, help='Worker threads for the parallel writer')
+
+    args = parser.parse_args()
+
+    if args.command == 'streaming':
+        benchmark_streaming(args.sizes)
+    elif args.command == 'writes':
+        benchmark_writes(args.alerts, args.latency, args.throttle_rate, args.endpoint_url, args.concurrency)
+    elif args.command == 'join':
+        benchmark_join(args.rows)
+    elif args.command == 'join-run':
+        run_join(args.mode, args.rows)
+    elif args.command == 'reader':
+        run_reader(args.mode, args.rows)
+
+if __name__ == "__main__":
+    main()
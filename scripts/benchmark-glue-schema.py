@@ -0,0 +1,96 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Make the Glue modules importable the same way the job sees them with --extra-py-files
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
+
+COUNTRIES = ['US', 'UK', 'CA', 'DE', 'FR', 'JP', 'AU', 'BR', 'IN', 'CN']
+CATEGORIES = ['grocery', 'gas', 'restaurant', 'retail', 'online', 'atm', 'transfer', 'bill_pay']
+HEADER = 'transaction_id,customer_id,amount,country,merchant_category,timestamp\n'
+
+def synthetic_row(i, bad_rate):
+    amount = f'{(i % 5000) + 0.25:.2f}'
+    timestamp = f'2025-01-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:00'
+    if random.random() < bad_rate:
+        # Same mix of damage the cleaning job quarantines: bad number, bad date, empty field
+        amount, timestamp = random.choice([('12;50', timestamp), (amount, '15/01/2025'), ('', timestamp)])
+    return f'TXN{i:09d},CUST{i % 50000:05d},{amount},{COUNTRIES[i % 10]},{CATEGORIES[i % 8]},{timestamp}\n'
+
+def write_csv(path, rows, bad_rate):
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        for i in range(rows):
+            f.write(synthetic_row(i, bad_rate))
+
+def string_then_cast(spark, path):
+    # Previous job: every column read as string, then cast and re-parsed
+    from pyspark.sql.functions import col, hour, to_timestamp
+    from pyspark.sql.types import DoubleType
+
+    df = spark.read.option("header", "true").csv(path).dropna()
+    df = df.withColumn("amount", col("amount").cast(DoubleType()))
+    df = df.withColumn("timestamp", to_timestamp(col("timestamp"), "yyyy-MM-dd HH:mm:ss"))
+    return df.withColumn("transaction_hour", hour(col("timestamp")))
+
+def inferred(spark, path):
+    # Schema inference reads the whole file once more before parsing it
+    return spark.read.option("header", "true").option("inferSchema", "true").csv(path)
+
+def declared(spark, path):
+    from transaction_schema import read_transactions, split_transactions
+
+    clean, _ = split_transactions(read_transactions(spark, path))
+    return clean
+
+MODES = {'string-cast': string_then_cast, 'inferred': inferred, 'declared': declared}
+
+def benchmark_schema(rows, bad_rate, repeats):
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.master('local[*]').appName('glue-schema-benchmark').getOrCreate()
+    spark.sparkContext.setLogLevel('ERROR')
+    workdir = tempfile.mkdtemp(prefix='glue-schema-')
+    path = os.path.join(workdir, 'transactions.csv')
+
+    try:
+        write_csv(path, rows, bad_rate)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        print("GLUE CLEANING - INFERRED VS DECLARED SCHEMA")
+        print("=" * 60)
+        print(f"Input: {rows:,} rows, {size_mb:.0f} MB, {bad_rate:.1%} damaged, best of {repeats}")
+        print(f"{'Mode':<12} {'Rows out':>12} {'Seconds':>9} {'Rows/s':>12}")
+
+        for mode, build in MODES.items():
+            best = None
+            for _ in range(repeats):
+                spark.catalog.clearCache()
+                start = time.perf_counter()
+                df = build(spark, path)
+                # The noop sink materializes every column without paying for an output format
+                df.write.format("noop").mode("overwrite").save()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            rows_out = df.count()
+            print(f"{mode:<12} {rows_out:>12,} {best:>9.2f} {rows / best:>12,.0f}")
+    finally:
+        spark.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Spark benchmark of the cleaning job CSV parse')
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--bad-rate', type=float, default=0.01, help='Share of rows with a malformed or empty field')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    benchmark_schema(args.rows, args.bad_rate, args.repeats)
+
+if __name__ == "__main__":
+    main()
@@ -33,29 +33,34 @@ def comprehensive_demo():
         }
     ]
     
-    for i, demo in enumerate(demo_queries, 1):
+    # Every question goes out in one invocation and is answered from one table snapshot
+    try:
+        response = lambda_client.invoke(
+            FunctionName='fraud-investigator',
+            InvocationType='RequestResponse',
+            Payload=json.dumps({'queries': [demo['query'] for demo in demo_queries]})
+        )
+        
+        result = json.loads(response['Payload'].read())
+        body = json.loads(result['body'])
+        if result['statusCode'] != 200:
+            print(f"Error: {body.get('error', 'Unknown error')}")
+            return
+        answers = body['results']
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    
+    for i, (demo, answer) in enumerate(zip(demo_queries, answers), 1):
         print(f"{i}. {demo['description'].upper()}")
         print(f"Query: \"{demo['query']}\"")
         print("-" * 50)
         
-        try:
-            response = lambda_client.invoke(
-                FunctionName='fraud-investigator',
-                InvocationType='RequestResponse',
-                Payload=json.dumps({'query': demo['query']})
-            )
-            
-            result = json.loads(response['Payload'].read())
-            if result['statusCode'] == 200:
-                body = json.loads(result['body'])
-                print("AI Response:")
-                print(body['response'].replace('\\n', '\n'))
-            else:
-                body = json.loads(result['body'])
-                print(f"Error: {body.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            print(f"Error: {e}")
+        if 'error' in answer:
+            print(f"Error: {answer['error']}")
+        else:
+            print("AI Response:")
+            print(answer['response'])
         
         print("\n" + "="*60 + "\n")
     
@@ -1,38 +1,43 @@
 import boto3
+import os
+import sys
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from alert_columns import load_alert_columns
 
 def display_fraud_alerts():
     dynamodb = boto3.resource('dynamodb')
     table = dynamodb.Table('fraud-alerts')
     
-    response = table.scan()
-    items = response['Items']
-    
-    # Sort by anomaly score (highest first)
-    sorted_items = sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)
+    # Every page of the table, with amounts and scores converted to floats once
+    columns = load_alert_columns(table)
     
     print("FRAUD ALERTS - HIGH RISK TRANSACTIONS")
     print("=" * 70)
     
-    for i, item in enumerate(sorted_items, 1):
+    # Sort by anomaly score (highest first)
+    for i, index in enumerate(columns.sorted_indices(reverse=True), 1):
+        item = columns.row(index)
         print(f"{i}. Transaction ID: {item['transaction_id']}")
         print(f"   Customer ID: {item['customer_id']}")
-        print(f"   Amount: ${float(item['amount']):,.2f}")
-        print(f"   Anomaly Score: {float(item['anomaly_score']):.1f}")
+        print(f"   Amount: ${item['amount']:,.2f}")
+        print(f"   Anomaly Score: {item['anomaly_score']:.1f}")
         print(f"   Transaction Time: {item['timestamp']}")
         print(f"   Status: {item['status']}")
         print("-" * 50)
     
     print(f"\nSUMMARY:")
-    print(f"Total High-Risk Alerts: {len(items)}")
+    print(f"Total High-Risk Alerts: {len(columns)}")
     
-    if items:
-        amounts = [float(item['amount']) for item in items]
-        scores = [float(item['anomaly_score']) for item in items]
+    if len(columns):
+        total_amount = columns.total('amounts')
         
-        print(f"Total Amount at Risk: ${sum(amounts):,.2f}")
-        print(f"Average Transaction: ${sum(amounts)/len(amounts):,.2f}")
-        print(f"Highest Risk Score: {max(scores):.1f}")
-        print(f"Average Risk Score: {sum(scores)/len(scores):.1f}")
+        print(f"Total Amount at Risk: ${total_amount:,.2f}")
+        print(f"Average Transaction: ${total_amount/len(columns):,.2f}")
+        print(f"Highest Risk Score: {columns.maximum('scores'):.1f}")
+        print(f"Average Risk Score: {columns.total('scores')/len(columns):.1f}")
 
 if __name__ == "__main__":
-    display_fraud_alerts()
\ No newline at end of file
+    display_fraud_alerts()
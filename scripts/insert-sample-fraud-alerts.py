@@ -1,7 +1,15 @@
 import boto3
+import os
+import sys
 from decimal import Decimal
 from datetime import datetime
 
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+# Partition key for the score-index GSI; SCORE_SHARDS comes from the environment like the Lambdas
+from alert_scan import score_shard
+
 def insert_sample_fraud_alerts():
     dynamodb = boto3.resource('dynamodb')
     table = dynamodb.Table('fraud-alerts')
@@ -58,6 +66,7 @@ def insert_sample_fraud_alerts():
     print("Inserting 5 sample fraud alerts with anomaly_score > 2.5...")
     
     for alert in sample_alerts:
+        alert['score_shard'] = score_shard(alert['transaction_id'])
         table.put_item(Item=alert)
         print(f"Inserted: {alert['transaction_id']} - Score: {alert['anomaly_score']} - Amount: ${alert['amount']}")
     
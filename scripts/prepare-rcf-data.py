@@ -1,73 +1,104 @@
+import argparse
 import boto3
+import os
+import sys
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+from datetime import date, timedelta
 import io
 
-s3 = boto3.client('s3')
-bucket = 'my-secure-bucket-wxj077wp'
-
-# Read parquet files from cleaned folder
-try:
-    # List objects in cleaned folder
-    response = s3.list_objects_v2(Bucket=bucket, Prefix='cleaned/')
-    
-    if 'Contents' not in response:
-        print("No files found in cleaned folder")
-        exit()
-    
-    # Read the first parquet file
-    parquet_key = None
-    for obj in response['Contents']:
-        if obj['Key'].endswith('.parquet'):
-            parquet_key = obj['Key']
-            break
-    
-    if not parquet_key:
-        print("No parquet files found")
-        exit()
-    
-    # Download and read parquet file
-    obj = s3.get_object(Bucket=bucket, Key=parquet_key)
+# The feature pipeline is shared with the Glue jobs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
+
+from transaction_features import RCF_FEATURE_COLUMNS, compute_features, feature_matrix, load_encodings, save_encodings
+
+CLEANED_PREFIX = 'cleaned/'
+
+def partition_values(key):
+    """Hive-style partition columns named in a key, e.g. {'transaction_date': '2025-01-15'}"""
+    return dict(part.split('=', 1) for part in key.split('/')[:-1] if '=' in part)
+
+def list_partition_files(s3, bucket, start_date=None, end_date=None):
+    """Parquet keys in the cleaned/ date partitions from start_date to end_date (inclusive ISO dates)
+
+    Only the date directories are listed up front; files are listed just for
+    the dates in range, so older history is never touched.
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    keys = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=CLEANED_PREFIX, Delimiter='/'):
+        for prefix in page.get('CommonPrefixes', []):
+            partition_date = partition_values(prefix['Prefix']).get('transaction_date')
+            if partition_date is None:
+                continue
+            if (start_date and partition_date < start_date) or (end_date and partition_date > end_date):
+                continue
+            for file_page in paginator.paginate(Bucket=bucket, Prefix=prefix['Prefix']):
+                keys.extend(obj['Key'] for obj in file_page.get('Contents', []) if obj['Key'].endswith('.parquet'))
+    return keys
+
+def read_partition_file(s3, bucket, key):
+    """One parquet file with its partition columns restored from the key"""
+    obj = s3.get_object(Bucket=bucket, Key=key)
     df = pd.read_parquet(io.BytesIO(obj['Body'].read()))
-    
-    print(f"Read {len(df)} records from {parquet_key}")
-    print(f"Columns: {list(df.columns)}")
-    
-    # Prepare data for RCF
-    # Encode categorical variables
-    le_country = LabelEncoder()
-    le_category = LabelEncoder()
-    
-    df['country_encoded'] = le_country.fit_transform(df['country'].astype(str))
-    df['category_encoded'] = le_category.fit_transform(df['merchant_category'].astype(str))
-    
-    # Select numerical features only
-    features = ['amount', 'transaction_hour', 'country_encoded', 'category_encoded']
-    
-    # Ensure all features are present
-    for feature in features:
-        if feature not in df.columns:
-            print(f"Missing feature: {feature}")
-            exit()
-    
-    # Create feature matrix (no headers, no index for RCF)
-    feature_data = df[features].values
-    
-    # Convert to CSV format for RCF
-    csv_buffer = io.StringIO()
-    np.savetxt(csv_buffer, feature_data, delimiter=',', fmt='%.6f')
-    
-    # Upload processed data
-    s3.put_object(
-        Bucket=bucket,
-        Key='rcf-input/training.csv',
-        Body=csv_buffer.getvalue(),
-        ContentType='text/csv'
-    )
-    
-    print(f"Uploaded RCF training data: {feature_data.shape}")
-    print(f"Features: {features}")
-    
-except Exception as e:
-    print(f"Error: {e}")
\ No newline at end of file
+    for column, value in partition_values(key).items():
+        df[column] = int(value) if column == 'transaction_hour' else value
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description="Build RCF training data from the partitioned cleaned dataset")
+    parser.add_argument('--bucket', default='my-secure-bucket-wxj077wp')
+    parser.add_argument('--start-date', help="First transaction date to include (YYYY-MM-DD)")
+    parser.add_argument('--end-date', help="Last transaction date to include (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, help="Only the last N days up to today; overrides --start-date")
+    args = parser.parse_args()
+
+    s3 = boto3.client('s3')
+    bucket = args.bucket
+    start_date = args.start_date
+    if args.days:
+        start_date = (date.today() - timedelta(days=args.days - 1)).isoformat()
+
+    # Read parquet files from the cleaned date partitions in range
+    try:
+        parquet_keys = list_partition_files(s3, bucket, start_date, args.end_date)
+
+        if not parquet_keys:
+            print(f"No parquet files found in {CLEANED_PREFIX} for dates {start_date or '*'} to {args.end_date or '*'}")
+            return
+
+        df = pd.concat([read_partition_file(s3, bucket, key) for key in parquet_keys], ignore_index=True)
+
+        print(f"Read {len(df)} records from {len(parquet_keys)} parquet files")
+        print(f"Columns: {list(df.columns)}")
+
+        # Prepare data for RCF with the persisted encodings, extended with any
+        # categories these partitions introduce
+        encodings = load_encodings(s3, bucket).fit(df)
+        features = RCF_FEATURE_COLUMNS
+
+        # Create feature matrix (no headers, no index for RCF)
+        feature_data = feature_matrix(compute_features(df, encodings), features)
+
+        # Convert to CSV format for RCF
+        csv_buffer = io.StringIO()
+        np.savetxt(csv_buffer, feature_data, delimiter=',', fmt='%.6f')
+
+        # Upload processed data
+        s3.put_object(
+            Bucket=bucket,
+            Key='rcf-input/training.csv',
+            Body=csv_buffer.getvalue(),
+            ContentType='text/csv'
+        )
+
+        save_encodings(s3, bucket, encodings)
+
+        print(f"Uploaded RCF training data: {feature_data.shape}")
+        print(f"Features: {features}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    main()
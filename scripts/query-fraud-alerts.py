@@ -1,41 +1,43 @@
 import boto3
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+import os
+import sys
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from alert_columns import load_alert_columns
 
 def query_top_fraud_alerts():
     dynamodb = boto3.resource('dynamodb')
     table = dynamodb.Table('fraud-alerts')
     
-    # Scan all items and sort by anomaly score
-    response = table.scan()
-    items = response['Items']
+    # Scan all items into columns and sort by anomaly score
+    columns = load_alert_columns(table)
     
     # Sort by anomaly score (most anomalous first - lowest scores)
-    sorted_items = sorted(items, key=lambda x: float(x['anomaly_score']))
+    sorted_indices = columns.sorted_indices()
     
     print("TOP 10 MOST CRITICAL FRAUD ALERTS:")
     print("=" * 80)
     
-    for i, item in enumerate(sorted_items[:10], 1):
+    for i, index in enumerate(sorted_indices[:10], 1):
+        item = columns.row(index)
         print(f"{i:2d}. Transaction ID: {item['transaction_id']}")
         print(f"    Customer ID: {item['customer_id']}")
-        print(f"    Amount: ${float(item['amount']):,.2f}")
-        print(f"    Anomaly Score: {float(item['anomaly_score']):.6f}")
+        print(f"    Amount: ${item['amount']:,.2f}")
+        print(f"    Anomaly Score: {item['anomaly_score']:.6f}")
         print(f"    Timestamp: {item['timestamp']}")
         print(f"    Status: {item['status']}")
         print("-" * 60)
     
-    print(f"\nTotal fraud alerts in database: {len(items)}")
+    print(f"\nTotal fraud alerts in database: {len(columns)}")
     
     # Statistics
-    amounts = [float(item['amount']) for item in items]
-    scores = [float(item['anomaly_score']) for item in items]
-    
     print(f"\nFRAUD ALERT STATISTICS:")
-    print(f"Average transaction amount: ${sum(amounts)/len(amounts):,.2f}")
-    print(f"Highest amount: ${max(amounts):,.2f}")
-    print(f"Most anomalous score: {min(scores):.6f}")
-    print(f"Least anomalous score: {max(scores):.6f}")
+    print(f"Average transaction amount: ${columns.total('amounts')/len(columns):,.2f}")
+    print(f"Highest amount: ${columns.maximum('amounts'):,.2f}")
+    print(f"Most anomalous score: {columns.minimum('scores'):.6f}")
+    print(f"Least anomalous score: {columns.maximum('scores'):.6f}")
 
 if __name__ == "__main__":
-    query_top_fraud_alerts()
\ No newline at end of file
+    query_top_fraud_alerts()
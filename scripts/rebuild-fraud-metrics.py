@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import boto3
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from alert_scan import scan_items
+from alert_metrics import AlertMetrics, read_metrics
+
+def rebuild_metrics(table, metrics_table):
+    """Recompute the summary item from a full scan of the fraud alerts table
+
+    Needed once for alerts written before the processor maintained the metrics,
+    or written directly (e.g. by insert-sample-fraud-alerts.py). The item is
+    overwritten in place rather than deleted, so its version keeps increasing.
+    Processor flushes that land while the table is being scanned are replaced by
+    the recomputed totals, which already include those alerts if the scan saw them.
+    """
+    metrics = AlertMetrics()
+    batch = []
+    for item in scan_items(table, attributes=('transaction_id', 'customer_id', 'amount', 'anomaly_score')):
+        batch.append(item)
+        if len(batch) >= 1000:
+            metrics.add(batch)
+            batch = []
+    metrics.add(batch)
+
+    metrics.overwrite(metrics_table)
+    return read_metrics(metrics_table)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the pre-aggregated fraud alert metrics item")
+    parser.add_argument('--table', default='fraud-alerts')
+    parser.add_argument('--metrics-table', default='fraud-alert-metrics')
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb')
+    summary = rebuild_metrics(dynamodb.Table(args.table), dynamodb.Table(args.metrics_table))
+
+    if not summary:
+        print("No fraud alerts found; metrics totals reset")
+        return
+
+    print(f"Rebuilt metrics for {summary['total_alerts']} alerts")
+    print(f"- Total amount: ${summary['total_amount']:,.2f}")
+    if summary['max_score'] is not None:
+        print(f"- Highest score: {summary['max_score']:.1f}")
+    print(f"- Unique customers (estimate): {summary['unique_customers']}")
+    print(f"- Critical/High/Moderate: {summary['critical']}/{summary['high']}/{summary['moderate']}")
+
+if __name__ == "__main__":
+    main()
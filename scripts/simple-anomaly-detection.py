@@ -1,10 +1,16 @@
 import boto3
+import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import LabelEncoder
 import io
 
+# The feature pipeline is shared with the Glue jobs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
+
+from transaction_features import compute_features, feature_matrix, load_encodings, save_encodings
+
 def detect_anomalies():
     s3 = boto3.client('s3')
     bucket = 'my-secure-bucket-wxj077wp'
@@ -15,21 +21,12 @@ def detect_anomalies():
         df = pd.read_csv(io.BytesIO(obj['Body'].read()))
         print(f"Loaded {len(df)} transactions")
         
-        # Prepare features for anomaly detection
-        le_country = LabelEncoder()
-        le_category = LabelEncoder()
-        
-        df['country_encoded'] = le_country.fit_transform(df['country'])
-        df['category_encoded'] = le_category.fit_transform(df['merchant_category'])
-        
-        # Convert timestamp to hour
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['transaction_hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
-        
-        # Select features for anomaly detection
-        features = ['amount', 'transaction_hour', 'country_encoded', 'category_encoded', 'day_of_week']
-        X = df[features].values
+        # Prepare features for anomaly detection with the persisted encodings,
+        # extended with any categories this batch introduces
+        encodings = load_encodings(s3, bucket).fit(df)
+        features = compute_features(df, encodings)
+        df = df.assign(**features)
+        X = feature_matrix(features)
         
         # Use Isolation Forest for anomaly detection
         iso_forest = IsolationForest(contamination=0.1, random_state=42)
@@ -69,6 +66,9 @@ def detect_anomalies():
             ContentType='text/csv'
         )
         
+        # Keep the category codes this model was fitted with for later runs
+        save_encodings(s3, bucket, encodings)
+        
         print("SCORED FILES ARE READY!")
         print("Files saved to:")
         print("- s3://my-secure-bucket-wxj077wp/scored/anomaly_results.csv")
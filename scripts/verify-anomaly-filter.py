@@ -1,30 +1,33 @@
 import boto3
+import os
+import sys
+
+# Make the Lambda modules importable the same way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from alert_columns import load_alert_columns
 
 def verify_anomaly_filter():
     dynamodb = boto3.resource('dynamodb')
     table = dynamodb.Table('fraud-alerts')
     
     # Scan all items
-    response = table.scan()
-    items = response['Items']
+    columns = load_alert_columns(table)
     
-    print(f"Total records in DynamoDB: {len(items)}")
+    print(f"Total records in DynamoDB: {len(columns)}")
     
     # Check filter condition: anomaly_score > -2.5
-    valid_records = 0
-    invalid_records = 0
+    valid_records = columns.count_above(-2.5)
+    invalid_records = len(columns) - valid_records
     invalid_items = []
     
-    for item in items:
-        score = float(item['anomaly_score'])
-        if score > -2.5:
-            valid_records += 1
-        else:
-            invalid_records += 1
-            invalid_items.append({
-                'transaction_id': item['transaction_id'],
-                'score': score
-            })
+    if invalid_records:
+        for index, score in enumerate(columns.scores):
+            if score <= -2.5:
+                invalid_items.append({
+                    'transaction_id': columns.transaction_ids[index],
+                    'score': score
+                })
     
     print(f"\nFILTER VERIFICATION RESULTS:")
     print(f"Records with anomaly_score > -2.5: {valid_records}")
@@ -40,13 +43,12 @@ def verify_anomaly_filter():
         print("\nSUCCESS: All records correctly have anomaly_score > -2.5")
     
     # Show score distribution
-    scores = [float(item['anomaly_score']) for item in items]
     print(f"\nSCORE STATISTICS:")
-    print(f"Minimum score: {min(scores):.6f}")
-    print(f"Maximum score: {max(scores):.6f}")
-    print(f"Average score: {sum(scores)/len(scores):.6f}")
+    print(f"Minimum score: {columns.minimum('scores'):.6f}")
+    print(f"Maximum score: {columns.maximum('scores'):.6f}")
+    print(f"Average score: {columns.total('scores')/len(columns):.6f}")
     
     return invalid_records == 0
 
 if __name__ == "__main__":
-    verify_anomaly_filter()
\ No newline at end of file
+    verify_anomaly_filter()
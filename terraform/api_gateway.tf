@@ -34,6 +34,31 @@ resource "aws_api_gateway_integration" "fraud_integration" {
   uri                    = aws_lambda_function.fraud_investigator.invoke_arn
 }
 
+# GET method so unchanged answers can be served from the stage cache
+resource "aws_api_gateway_method" "fraud_get_method" {
+  rest_api_id   = aws_api_gateway_rest_api.fraud_api.id
+  resource_id   = aws_api_gateway_resource.fraud_resource.id
+  http_method   = "GET"
+  authorization = "NONE"
+
+  request_parameters = {
+    "method.request.querystring.query"  = true
+    "method.request.querystring.format" = false
+  }
+}
+
+# Lambda integration for GET method, cached per question and format
+resource "aws_api_gateway_integration" "fraud_get_integration" {
+  rest_api_id = aws_api_gateway_rest_api.fraud_api.id
+  resource_id = aws_api_gateway_resource.fraud_resource.id
+  http_method = aws_api_gateway_method.fraud_get_method.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.fraud_investigator.invoke_arn
+  cache_key_parameters    = ["method.request.querystring.query", "method.request.querystring.format"]
+}
+
 # OPTIONS method for CORS
 resource "aws_api_gateway_method" "fraud_options" {
   rest_api_id   = aws_api_gateway_rest_api.fraud_api.id
@@ -76,7 +101,7 @@ resource "aws_api_gateway_integration_response" "fraud_options_integration_respo
   status_code = aws_api_gateway_method_response.fraud_options_response.status_code
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS,POST,PUT'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -86,11 +111,37 @@ resource "aws_api_gateway_integration_response" "fraud_options_integration_respo
 resource "aws_api_gateway_deployment" "fraud_deployment" {
   depends_on = [
     aws_api_gateway_integration.fraud_integration,
+    aws_api_gateway_integration.fraud_get_integration,
     aws_api_gateway_integration.fraud_options_integration,
   ]
 
   rest_api_id = aws_api_gateway_rest_api.fraud_api.id
-  stage_name  = var.environment
+
+  lifecycle {
+    create_before_destroy = true
+  }
+}
+
+# API Gateway stage with a cache cluster for GET answers
+resource "aws_api_gateway_stage" "fraud_stage" {
+  rest_api_id   = aws_api_gateway_rest_api.fraud_api.id
+  deployment_id = aws_api_gateway_deployment.fraud_deployment.id
+  stage_name    = var.environment
+
+  cache_cluster_enabled = true
+  cache_cluster_size    = "0.5"
+}
+
+# Cache GET /investigate on its query and format parameters, for as long as the Lambda caches answers
+resource "aws_api_gateway_method_settings" "fraud_get_cache" {
+  rest_api_id = aws_api_gateway_rest_api.fraud_api.id
+  stage_name  = aws_api_gateway_stage.fraud_stage.stage_name
+  method_path = "${aws_api_gateway_resource.fraud_resource.path_part}/${aws_api_gateway_method.fraud_get_method.http_method}"
+
+  settings {
+    caching_enabled      = var.answer_cache_ttl_seconds > 0
+    cache_ttl_in_seconds = var.answer_cache_ttl_seconds
+  }
 }
 
 # Lambda permission for API Gateway
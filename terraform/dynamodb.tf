@@ -14,13 +14,74 @@ resource "aws_dynamodb_table" "fraud_alerts" {
     type = "S"
   }
 
+  attribute {
+    name = "score_shard"
+    type = "S"
+  }
+
+  attribute {
+    name = "anomaly_score"
+    type = "N"
+  }
+
+  global_secondary_index {
+    name            = "customer-index"
+    hash_key        = "customer_id"
+    projection_type = "ALL"
+  }
+
+  # Score-ordered access path for "top N anomalous" questions; alerts are
+  # spread over var.score_shards partitions to avoid a single hot key
   global_secondary_index {
-    name     = "customer-index"
-    hash_key = "customer_id"
+    name               = "score-index"
+    hash_key           = "score_shard"
+    range_key          = "anomaly_score"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["customer_id", "amount", "timestamp"]
   }
 
   tags = {
     Name        = "fraud-alerts"
     Environment = var.environment
   }
-}
\ No newline at end of file
+}
+
+# Running totals over every alert, maintained by the processor with atomic
+# updates so investigator summaries read one item instead of scanning
+resource "aws_dynamodb_table" "fraud_alert_metrics" {
+  name           = "fraud-alert-metrics"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "metric_id"
+
+  attribute {
+    name = "metric_id"
+    type = "S"
+  }
+
+  tags = {
+    Name        = "fraud-alert-metrics"
+    Environment = var.environment
+  }
+}
+
+# Investigator answers shared across Lambda containers; DynamoDB expires old ones
+resource "aws_dynamodb_table" "fraud_answer_cache" {
+  name           = "fraud-answer-cache"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "cache_key"
+
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "fraud-answer-cache"
+    Environment = var.environment
+  }
+}
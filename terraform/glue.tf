@@ -39,6 +39,8 @@ resource "aws_glue_job" "fraud_detection" {
     "--job-bookmark-option" = "job-bookmark-enable"
     "--TempDir"            = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/temp/"
     "--S3_BUCKET"          = aws_s3_bucket.fraud_detection_bucket.bucket
+    "--bucket-name"        = aws_s3_bucket.fraud_detection_bucket.bucket
+    "--extra-py-files"     = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/scripts/fraud_rules.py"
   }
 
   max_retries = 1
@@ -67,4 +69,74 @@ resource "aws_s3_object" "glue_script" {
   key    = "scripts/fraud_detection.py"
   source = "../glue_scripts/fraud_detection.py"
   etag   = filemd5("../glue_scripts/fraud_detection.py")
-}
\ No newline at end of file
+}
+# Glue job for per-customer rolling features over the cleaned transactions
+resource "aws_glue_job" "customer_features" {
+  name     = "${var.project_name}-customer-features"
+  role_arn = aws_iam_role.glue_role.arn
+
+  command {
+    script_location = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/scripts/customer-features.py"
+    python_version  = "3"
+  }
+
+  default_arguments = {
+    "--job-language"    = "python"
+    "--TempDir"         = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/temp/"
+    "--INPUT_PATH"      = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/cleaned/"
+    "--OUTPUT_PATH"     = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/features/customer/"
+    "--extra-py-files"  = "s3://${aws_s3_bucket.fraud_detection_bucket.bucket}/scripts/transaction_features.py"
+  }
+
+  max_retries = 1
+  timeout     = 60
+  glue_version = "4.0"
+
+  worker_type       = "G.1X"
+  number_of_workers = 2
+}
+
+# Recompute yesterday's and today's customer features after the nightly run
+resource "aws_glue_trigger" "customer_features_trigger" {
+  name = "${var.project_name}-customer-features-trigger"
+  type = "SCHEDULED"
+
+  schedule = "cron(0 3 * * ? *)"  # Run daily at 3 AM
+
+  actions {
+    job_name  = aws_glue_job.customer_features.name
+    arguments = {
+      "--DAYS" = "2"
+    }
+  }
+}
+
+resource "aws_s3_object" "customer_features_script" {
+  bucket = aws_s3_bucket.fraud_detection_bucket.id
+  key    = "scripts/customer-features.py"
+  source = "../glue_scripts/customer-features.py"
+  etag   = filemd5("../glue_scripts/customer-features.py")
+}
+
+# Shared feature pipeline, loaded by the Glue jobs through --extra-py-files
+resource "aws_s3_object" "transaction_features_module" {
+  bucket = aws_s3_bucket.fraud_detection_bucket.id
+  key    = "scripts/transaction_features.py"
+  source = "../glue_scripts/transaction_features.py"
+  etag   = filemd5("../glue_scripts/transaction_features.py")
+}
+
+# Rule engine and the rule definitions the fraud detection job loads
+resource "aws_s3_object" "fraud_rules_module" {
+  bucket = aws_s3_bucket.fraud_detection_bucket.id
+  key    = "scripts/fraud_rules.py"
+  source = "../glue_scripts/fraud_rules.py"
+  etag   = filemd5("../glue_scripts/fraud_rules.py")
+}
+
+resource "aws_s3_object" "fraud_rules_config" {
+  bucket = aws_s3_bucket.fraud_detection_bucket.id
+  key    = "scripts/fraud_rules.json"
+  source = "../glue_scripts/fraud_rules.json"
+  etag   = filemd5("../glue_scripts/fraud_rules.json")
+}
@@ -80,12 +80,19 @@ resource "aws_iam_role_policy" "lambda_dynamodb_policy" {
         Action = [
           "dynamodb:GetItem",
           "dynamodb:PutItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Scan",
           "dynamodb:Query"
         ]
-        Resource = aws_dynamodb_table.fraud_alerts.arn
+        Resource = [
+          aws_dynamodb_table.fraud_alerts.arn,
+          "${aws_dynamodb_table.fraud_alerts.arn}/index/*",
+          aws_dynamodb_table.fraud_alert_metrics.arn,
+          aws_dynamodb_table.fraud_answer_cache.arn
+        ]
       }
     ]
   })
@@ -108,6 +115,12 @@ resource "aws_iam_role_policy" "lambda_s3_policy" {
           aws_s3_bucket.fraud_detection_bucket.arn,
           "${aws_s3_bucket.fraud_detection_bucket.arn}/*"
         ]
+      },
+      {
+        # The processor's incremental checkpoint and per-object processed markers
+        Effect   = "Allow"
+        Action   = ["s3:PutObject"]
+        Resource = "${aws_s3_bucket.fraud_detection_bucket.arn}/checkpoints/*"
       }
     ]
   })
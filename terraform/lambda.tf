@@ -9,8 +9,12 @@ resource "aws_lambda_function" "fraud_processor" {
 
   environment {
     variables = {
-      DYNAMODB_TABLE = aws_dynamodb_table.fraud_alerts.name
-      S3_BUCKET      = aws_s3_bucket.fraud_detection_bucket.bucket
+      DYNAMODB_TABLE     = aws_dynamodb_table.fraud_alerts.name
+      METRICS_TABLE      = aws_dynamodb_table.fraud_alert_metrics.name
+      S3_BUCKET          = aws_s3_bucket.fraud_detection_bucket.bucket
+      SCORE_SHARDS       = var.score_shards
+      INCREMENTAL        = tostring(var.incremental_processing)
+      CONDITIONAL_WRITES = tostring(var.conditional_writes)
     }
   }
 
@@ -32,7 +36,11 @@ resource "aws_lambda_function" "fraud_investigator" {
 
   environment {
     variables = {
-      DYNAMODB_TABLE = aws_dynamodb_table.fraud_alerts.name
+      DYNAMODB_TABLE           = aws_dynamodb_table.fraud_alerts.name
+      METRICS_TABLE            = aws_dynamodb_table.fraud_alert_metrics.name
+      ANSWER_CACHE_TABLE       = aws_dynamodb_table.fraud_answer_cache.name
+      ANSWER_CACHE_TTL_SECONDS = var.answer_cache_ttl_seconds
+      SCORE_SHARDS             = var.score_shards
     }
   }
 
@@ -40,4 +48,25 @@ resource "aws_lambda_function" "fraud_investigator" {
     aws_iam_role_policy_attachment.lambda_basic_execution,
     aws_iam_role_policy.lambda_dynamodb_policy,
   ]
-}
\ No newline at end of file
+}
+# Lambda permission for S3 notifications on scored output
+resource "aws_lambda_permission" "s3_scored_lambda" {
+  statement_id  = "AllowExecutionFromS3"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.fraud_processor.function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = aws_s3_bucket.fraud_detection_bucket.arn
+}
+
+# Each object written under scored/ invokes the processor for that object alone
+resource "aws_s3_bucket_notification" "scored_objects" {
+  bucket = aws_s3_bucket.fraud_detection_bucket.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.fraud_processor.arn
+    events              = ["s3:ObjectCreated:*"]
+    filter_prefix       = "scored/"
+  }
+
+  depends_on = [aws_lambda_permission.s3_scored_lambda]
+}
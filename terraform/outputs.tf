@@ -40,7 +40,7 @@ output "fraud_investigator_function_name" {
 
 output "api_gateway_url" {
   description = "URL of the API Gateway"
-  value       = "${aws_api_gateway_deployment.fraud_deployment.invoke_url}/investigate"
+  value       = "${aws_api_gateway_stage.fraud_stage.invoke_url}/investigate"
 }
 
 output "sagemaker_role_arn" {
@@ -20,4 +20,28 @@ variable "lambda_zip_path" {
   description = "Path to Lambda deployment package"
   type        = string
   default     = "../lambda/fraud_investigator.zip"
-}
\ No newline at end of file
+}
+
+variable "score_shards" {
+  description = "Number of score_shard partitions in the fraud-alerts score-index GSI"
+  type        = number
+  default     = 4
+}
+
+variable "answer_cache_ttl_seconds" {
+  description = "Seconds the investigator and the API Gateway stage cache reuse an answer (0 = off)"
+  type        = number
+  default     = 10
+}
+
+variable "incremental_processing" {
+  description = "Whether the processor resumes from its S3 checkpoint and only writes new alerts"
+  type        = bool
+  default     = true
+}
+
+variable "conditional_writes" {
+  description = "Write each alert with a conditional PutItem instead of batched BatchGetItem + BatchWriteItem; slower, but exact when processor runs overlap on the same transactions"
+  type        = bool
+  default     = false
+}
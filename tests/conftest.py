@@ -7,6 +7,33 @@ from unittest.mock import Mock
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+# Lambda modules import their shared helpers (e.g. aws_clients) as top-level
+# modules, the way the Lambda runtime sees them
+sys.path.insert(0, os.path.join(project_root, 'lambda'))
+
+@pytest.fixture(autouse=True)
+def reset_aws_clients():
+    """Start every test from a cold container so cached clients never leak between tests"""
+    import aws_clients
+    aws_clients.reset_clients()
+    yield
+    aws_clients.reset_clients()
+
+@pytest.fixture(scope='session')
+def spark():
+    """Local SparkSession for the Glue transforms; skipped where pyspark is not installed"""
+    pytest.importorskip('pyspark')
+    from pyspark.sql import SparkSession
+    session = SparkSession.builder \
+        .master('local[2]') \
+        .appName('fraud-detector-tests') \
+        .config('spark.sql.shuffle.partitions', '2') \
+        .config('spark.sql.session.timeZone', 'UTC') \
+        .config('spark.ui.enabled', 'false') \
+        .getOrCreate()
+    yield session
+    session.stop()
+
 @pytest.fixture
 def mock_aws_credentials():
     """Mock AWS credentials for testing"""
@@ -2,12 +2,14 @@ import pytest
 import pandas as pd
 import numpy as np
 from unittest.mock import Mock, patch, MagicMock
+from botocore.exceptions import ClientError
 import io
 import sys
 import os
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
 
 from scripts.simple_anomaly_detection import detect_anomalies
 
@@ -41,39 +43,33 @@ class TestAnomalyDetection:
         # Mock CSV reading
         mock_read_csv.return_value = sample_transaction_data
         
-        # Mock S3 get_object
-        mock_s3.get_object.return_value = {
-            'Body': Mock(read=Mock(return_value=b'mock_csv_data'))
-        }
+        # Mock S3 get_object: the transactions, then no encodings persisted yet
+        mock_s3.get_object.side_effect = [
+            {'Body': Mock(read=Mock(return_value=b'mock_csv_data'))},
+            ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'missing'}}, 'GetObject')
+        ]
         
         result = detect_anomalies()
         
         # Verify S3 operations
         assert mock_s3.get_object.called
-        assert mock_s3.put_object.call_count == 2  # Two files uploaded
+        assert mock_s3.put_object.call_count == 3  # Two scored files plus the encodings
         
         # Verify put_object calls for results
         put_calls = mock_s3.put_object.call_args_list
         keys = [call[1]['Key'] for call in put_calls]
         assert 'scored/anomaly_results.csv' in keys
         assert 'scored/anomaly_scores.csv' in keys
+        assert 'models/feature-encodings.json' in keys
     
     def test_feature_engineering(self, sample_transaction_data):
         """Test feature engineering for ML model"""
-        df = sample_transaction_data.copy()
-        
-        # Convert timestamp
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['transaction_hour'] = df['timestamp'].dt.hour
-        df['day_of_week'] = df['timestamp'].dt.dayofweek
+        from transaction_features import FeatureEncodings, compute_features
         
-        # Encode categorical variables
-        from sklearn.preprocessing import LabelEncoder
-        le_country = LabelEncoder()
-        le_category = LabelEncoder()
+        df = sample_transaction_data.copy()
         
-        df['country_encoded'] = le_country.fit_transform(df['country'])
-        df['category_encoded'] = le_category.fit_transform(df['merchant_category'])
+        # Same shared pipeline the scorers use
+        df = df.assign(**compute_features(df, FeatureEncodings().fit(df)))
         
         # Verify features
         assert 'transaction_hour' in df.columns
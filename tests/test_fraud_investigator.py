@@ -1,4 +1,5 @@
 import pytest
+import io
 import json
 from unittest.mock import Mock, patch
 from decimal import Decimal
@@ -8,7 +9,17 @@ import os
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from lambda.fraud_investigator_lambda import FraudInvestigator, lambda_handler
+from fraud_investigator_lambda import FraudInvestigator, lambda_handler
+from alert_scan import (
+    scan_items, count_items, top_k, score_shard, query_top_scores, query_customer_alerts, batch_get_alerts
+)
+from alert_snapshot import AlertSnapshotCache
+from query_router import parse_query
+from alert_columns import AlertColumns, np as columns_numpy
+from alert_metrics import AlertMetrics, read_metrics, estimate_cardinality, sketch_register, METRICS_KEY
+from response_render import Response, alert_record, etag
+from answer_cache import AnswerCache, MemoryCacheBackend, DynamoDBCacheBackend, CacheEntry, cache_key
+from botocore.exceptions import ClientError
 
 class TestFraudInvestigator:
     
@@ -40,8 +51,24 @@ class TestFraudInvestigator:
                 'anomaly_score': Decimal('4.5')
             }
         }
+        table.query.side_effect = self._index_query(table.scan.return_value['Items'])
         return table
     
+    @staticmethod
+    def _index_query(items):
+        """Emulate GSI queries on score-index (per shard, descending) and customer-index"""
+        def query(**kwargs):
+            key_value = kwargs['KeyConditionExpression'].get_expression()['values'][1]
+            if kwargs['IndexName'] == 'customer-index':
+                return {'Items': [item for item in items if item['customer_id'] == key_value]}
+            
+            assert kwargs['IndexName'] == 'score-index'
+            assert kwargs['ScanIndexForward'] is False
+            matching = [item for item in items if score_shard(item['transaction_id']) == key_value]
+            matching.sort(key=lambda x: x['anomaly_score'], reverse=True)
+            return {'Items': matching[:kwargs['Limit']]}
+        return query
+    
     @pytest.fixture
     def investigator(self, mock_table):
         return FraudInvestigator(mock_table)
@@ -53,12 +80,65 @@ class TestFraudInvestigator:
         assert "TXN002" in result
         assert "5.7" in result
     
+    def test_top_anomalous_uses_score_index(self, investigator, mock_table):
+        """Test that top-N reads come from the score index instead of a scan"""
+        result = investigator.query_fraud_data("Show me top 1 anomalous transactions")
+        
+        assert "1. TXN002 - Score: 5.7" in result
+        assert "TXN001" not in result
+        mock_table.scan.assert_not_called()
+        assert all(c[1]['Limit'] == 1 for c in mock_table.query.call_args_list)
+    
+    def test_top_anomalous_falls_back_without_index(self, investigator, mock_table):
+        """Test that a missing score index falls back to a scan"""
+        from botocore.exceptions import ClientError
+        mock_table.query.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException', 'Message': 'no such index'}}, 'Query'
+        )
+        
+        result = investigator.query_fraud_data("Show me top 2 anomalous transactions")
+        
+        assert "1. TXN002 - Score: 5.7" in result
+        assert "2. TXN001 - Score: 4.5" in result
+        mock_table.scan.assert_called_once()
+    
     def test_query_highest_fraud_scores(self, investigator):
         """Test highest fraud scores query"""
         result = investigator.query_fraud_data("List customers with highest fraud scores")
         assert "Customers with highest fraud scores" in result
         assert "CUST002: 5.7" in result
     
+    def test_customer_alerts_use_customer_index(self, investigator, mock_table):
+        """Test that a per-customer question is a single indexed read"""
+        mock_table.scan.return_value['Items'].append({
+            'transaction_id': 'TXN003',
+            'customer_id': 'CUST002',
+            'amount': Decimal('700.00'),
+            'anomaly_score': Decimal('3.1'),
+            'timestamp': '2025-01-15 02:10:00'
+        })
+        for item in mock_table.scan.return_value['Items']:
+            item.setdefault('timestamp', '2025-01-15 10:00:00')
+        
+        result = investigator.query_fraud_data("Show alerts for customer CUST002")
+        
+        assert "Alerts for customer CUST002 (2)" in result
+        assert result.index("TXN002") < result.index("TXN003")
+        assert "Highest Score: 5.7" in result
+        assert "TXN001" not in result
+        mock_table.scan.assert_not_called()
+        assert mock_table.query.call_args[1]['IndexName'] == 'customer-index'
+    
+    def test_customer_alerts_unknown_customer(self, investigator):
+        """Test the answer for a customer without alerts"""
+        result = investigator.query_fraud_data("show alerts for customer CUST404")
+        assert "No fraud alerts found for customer CUST404" in result
+    
+    def test_customers_question_without_id_is_not_customer_intent(self, investigator):
+        """Test that the plural 'customers' does not trigger the per-customer intent"""
+        result = investigator.query_fraud_data("List customers with highest fraud scores")
+        assert "Customers with highest fraud scores" in result
+    
     def test_explain_transaction_flag(self, investigator):
         """Test transaction explanation query"""
         result = investigator.query_fraud_data("Explain why transaction TXN001 was flagged")
@@ -66,6 +146,24 @@ class TestFraudInvestigator:
         assert "Anomaly Score: 4.5" in result
         assert "Amount: $5,000.00" in result
     
+    def test_explain_many_transactions_batches_reads(self, investigator, mock_table):
+        """Test that several IDs are fetched with one BatchGetItem and explained in order"""
+        mock_table.name = 'fraud-alerts'
+        mock_table.meta.client.batch_get_item.return_value = {
+            'Responses': {'fraud-alerts': [
+                {'transaction_id': 'TXN002', 'amount': Decimal('15000.00'), 'anomaly_score': Decimal('5.7')},
+                {'transaction_id': 'TXN001', 'amount': Decimal('5000.00'), 'anomaly_score': Decimal('4.5')}
+            ]}
+        }
+        
+        result = investigator.query_fraud_data("Explain TXN001, TXN002 and TXN404, TXN001")
+        
+        keys = mock_table.meta.client.batch_get_item.call_args[1]['RequestItems']['fraud-alerts']['Keys']
+        assert keys == [{'transaction_id': 'TXN001'}, {'transaction_id': 'TXN002'}, {'transaction_id': 'TXN404'}]
+        assert result.index("TXN001 flagged") < result.index("TXN002 flagged") < result.index("TXN404 not found")
+        assert "CRITICAL" in result
+        mock_table.get_item.assert_not_called()
+    
     def test_summary_metrics(self, investigator):
         """Test summary metrics query"""
         result = investigator.query_fraud_data("Give me fraud summary")
@@ -83,11 +181,751 @@ class TestFraudInvestigator:
         result = investigator.query_fraud_data("Random query")
         assert "Monitoring 2 fraud alerts" in result
         assert "TXN002" in result
+    
+    def test_answer_carries_records_and_real_newlines(self, investigator):
+        """Test that answers are rendered with real newlines alongside typed records"""
+        answer = investigator.answer("Show me top 2 anomalous transactions")
+        
+        assert answer.intent == 'top_anomalous'
+        assert "\\n" not in answer.text()
+        assert answer.text().splitlines()[2] == "1. TXN002 - Score: 5.7 - $15,000.00"
+        assert answer.records == [
+            {'transaction_id': 'TXN002', 'anomaly_score': 5.7, 'amount': 15000.0, 'risk_bucket': 'critical'},
+            {'transaction_id': 'TXN001', 'anomaly_score': 4.5, 'amount': 5000.0, 'risk_bucket': 'high'}
+        ]
+
+    def test_summary_metrics_follows_pagination(self, mock_table):
+        """Test that aggregations include items beyond the first scan page"""
+        first_page = mock_table.scan.return_value
+        mock_table.scan.side_effect = [
+            dict(first_page, LastEvaluatedKey={'transaction_id': 'TXN002'}),
+            {'Items': [{'transaction_id': 'TXN003', 'customer_id': 'CUST003',
+                        'amount': Decimal('1000.00'), 'anomaly_score': Decimal('6.1')}]}
+        ]
+        investigator = FraudInvestigator(mock_table)
+        
+        result = investigator.query_fraud_data("Give me fraud summary")
+        
+        assert "Total Alerts: 3" in result
+        assert "Total at Risk: $21,000.00" in result
+        assert "Highest Score: 6.1" in result
+        assert mock_table.scan.call_args_list[1][1]['ExclusiveStartKey'] == {'transaction_id': 'TXN002'}
+
+    def test_repeated_questions_share_one_scan(self, investigator, mock_table):
+        """Test that a burst of questions is answered from a single snapshot scan"""
+        investigator.query_fraud_data("Show me top 2 anomalous transactions")
+        investigator.query_fraud_data("List customers with highest fraud scores")
+        investigator.query_fraud_data("Give me fraud summary")
+        investigator.query_fraud_data("fraud count")
+        investigator.query_fraud_data("Random query")
+        
+        # Top-N is served by the score index; everything else shares one scan
+        assert mock_table.scan.call_count == 1
+        assert investigator.snapshot.stats()['hits'] == 3
+        assert investigator.snapshot.stats()['misses'] == 1
+
+    @pytest.fixture
+    def metrics_table(self):
+        """Metrics table holding the processor's running totals for the two sample alerts"""
+        table = Mock()
+        table.get_item.return_value = {
+            'Item': {
+                'metric_id': 'alerts-summary',
+                'total_alerts': Decimal('2'),
+                'total_amount': Decimal('20000.00'),
+                'total_score': Decimal('10.2'),
+                'max_score': Decimal('5.7'),
+                'critical_alerts': Decimal('1'),
+                'high_alerts': Decimal('1'),
+                'moderate_alerts': Decimal('0'),
+                'customer_sketch': {Decimal(r * 64 + rank) for r, rank in
+                                    (sketch_register('CUST001'), sketch_register('CUST002'))},
+                'version': Decimal('3')
+            }
+        }
+        return table
+    
+    def test_summary_reads_metrics_item(self, mock_table, metrics_table):
+        """Test that summary and count are answered from the metrics item without scanning"""
+        investigator = FraudInvestigator(mock_table, metrics_table=metrics_table)
+        
+        summary = investigator.query_fraud_data("Show me fraud summary")
+        count = investigator.query_fraud_data("count alerts")
+        
+        assert "Total Alerts: 2" in summary
+        assert "$20,000.00" in summary
+        assert "Average Score: 5.1" in summary
+        assert "Highest Score: 5.7" in summary
+        assert "Current fraud alerts: 2" in count
+        mock_table.scan.assert_not_called()
+    
+    def test_summary_without_max_score(self, mock_table, metrics_table):
+        """Test that a metrics item without max_score still renders a summary"""
+        del metrics_table.get_item.return_value['Item']['max_score']
+        investigator = FraudInvestigator(mock_table, metrics_table=metrics_table)
+        
+        response = investigator.answer("fraud summary")
+        
+        assert "Highest Score: n/a" in response.text()
+        assert response.records[0]['max_score'] is None
+    
+    def test_summary_falls_back_to_scan_without_metrics(self, mock_table, metrics_table):
+        """Test that a missing metrics item or a failed read falls back to the scan path"""
+        metrics_table.get_item.return_value = {}
+        investigator = FraudInvestigator(mock_table, metrics_table=metrics_table)
+        assert "Total Alerts: 2" in investigator.query_fraud_data("fraud summary")
+        
+        metrics_table.get_item.side_effect = ClientError(
+            {'Error': {'Code': 'ResourceNotFoundException', 'Message': 'no table'}}, 'GetItem'
+        )
+        investigator = FraudInvestigator(mock_table, metrics_table=metrics_table)
+        assert "Total Alerts: 2" in investigator.query_fraud_data("fraud summary")
+        assert mock_table.scan.called
+    
+    def test_metrics_version_invalidates_snapshot(self, mock_table, metrics_table):
+        """Test that a processor flush (new metrics version) forces a fresh scan"""
+        investigator = FraudInvestigator(mock_table, metrics_table=metrics_table)
+        
+        investigator.query_fraud_data("general overview")
+        investigator.query_fraud_data("general overview")
+        assert mock_table.scan.call_count == 1
+        
+        metrics_table.get_item.return_value['Item']['version'] = Decimal('4')
+        investigator.query_fraud_data("general overview")
+        assert mock_table.scan.call_count == 2
+
+class TestQueryRouter:
+    
+    @pytest.mark.parametrize('query, intent', [
+        ("Show me the top 3 anomalous transactions", 'top_anomalous'),
+        ("top 5 risky transactions", 'top_anomalous'),
+        ("List customers with highest fraud scores", 'highest_scores'),
+        ("Explain why transaction TXN999004 was flagged as suspicious", 'explain_transaction'),
+        ("Explain TXN999004", 'explain_transaction'),
+        ("Give me a summary of fraud metrics", 'summary'),
+        ("How many fraud alerts do we have?", 'count'),
+        ("Show alerts for customer CUST9004", 'customer_alerts'),
+        ("Explain transaction TXN1 for CUST9004", 'explain_transaction'),
+        ("Any bank accounts at risk?", 'overview'),
+    ])
+    def test_intents(self, query, intent):
+        """Test that demo and UI phrasings route to the expected intent"""
+        assert parse_query(query).intent == intent
+    
+    def test_extracts_entities_in_one_pass(self):
+        """Test that limit, IDs and dates come out of the same parse"""
+        parsed = parse_query("Top 7 anomalous for CUST12 and TXN99, txn TXN100? 2025-01-15 to 2025-01-10")
+        
+        assert parsed.limit == 7
+        assert parsed.customer_ids == ['CUST12']
+        assert parsed.transaction_ids == ['TXN99', 'TXN100']
+        assert parsed.date_range == ('2025-01-10', '2025-01-15')
+    
+    def test_relative_dates(self):
+        """Test today/yesterday resolve against the given day"""
+        from datetime import date
+        assert parse_query("summary for today", today=date(2025, 1, 15)).date_range == ('2025-01-15', '2025-01-15')
+        assert parse_query("summary for yesterday", today=date(2025, 1, 15)).date_range == ('2025-01-14', '2025-01-14')
+        assert parse_query("summary").date_range is None
+
+class TestAlertColumns:
+    
+    @pytest.fixture(params=['numpy', 'python'])
+    def vectorized(self, request):
+        """Run each test with NumPy views and with the pure array('d') fallback"""
+        if request.param == 'numpy':
+            if columns_numpy is None:
+                pytest.skip("NumPy not installed")
+            yield True
+        else:
+            with patch('alert_columns.np', None):
+                yield False
+    
+    @staticmethod
+    def _items():
+        scores = ['3.1', '5.7', '4.5', '5.7', '2.6', '4.0', '5.7', '3.3']
+        return [
+            {
+                'transaction_id': f'TXN{i}',
+                'customer_id': f'CUST{i % 3}',
+                'amount': Decimal(f'{100 * (i + 1)}.25'),
+                'anomaly_score': Decimal(score),
+                'timestamp': f'2025-01-15 0{i}:00:00',
+                'status': 'PENDING_REVIEW'
+            }
+            for i, score in enumerate(scores)
+        ]
+    
+    def test_columns_convert_once(self, vectorized):
+        """Test that scores and amounts become float columns and customers are dictionary encoded"""
+        columns = AlertColumns.from_items(self._items())
+        
+        assert len(columns) == 8
+        assert columns.scores.typecode == 'd'
+        assert columns.customers == ['CUST0', 'CUST1', 'CUST2']
+        assert list(columns.customer_codes) == [0, 1, 2, 0, 1, 2, 0, 1]
+        assert columns.row(1) == {
+            'transaction_id': 'TXN1', 'customer_id': 'CUST1', 'amount': 200.25,
+            'anomaly_score': 5.7, 'timestamp': '2025-01-15 01:00:00', 'status': 'PENDING_REVIEW'
+        }
+    
+    def test_top_indices_match_top_k_with_ties(self, vectorized):
+        """Test that the selection path orders ties exactly like the heap over items"""
+        items = self._items()
+        columns = AlertColumns.from_items(items)
+        
+        for k in range(0, 10):
+            expected = [item['transaction_id'] for item in top_k(items, k)]
+            assert [columns.transaction_ids[i] for i in columns.top_indices(k)] == expected
+    
+    def test_aggregates(self, vectorized):
+        """Test sums, extremes and risk buckets over the columns"""
+        columns = AlertColumns.from_items(self._items())
+        
+        assert columns.total('amounts') == pytest.approx(3602.0)
+        assert columns.total('scores') == pytest.approx(34.6)
+        assert columns.maximum('scores') == 5.7
+        assert columns.minimum('amounts') == 100.25
+        assert columns.bucket_counts() == {'critical': 3, 'high': 1, 'moderate': 4}
+        assert columns.sorted_indices(reverse=True)[:4] == [1, 3, 6, 2]
+    
+    def test_best_row_per_customer(self, vectorized):
+        """Test each customer's first highest-scoring row, in first-seen customer order"""
+        columns = AlertColumns.from_items(self._items())
+        
+        assert columns.best_row_per_customer() == [3, 1, 2]
+    
+    def test_empty_columns(self, vectorized):
+        """Test that empty columns aggregate without errors"""
+        columns = AlertColumns()
+        
+        assert columns.top_indices(3) == []
+        assert columns.maximum('scores') is None
+        assert columns.total('amounts') == 0
+        assert columns.best_row_per_customer() == []
+
+class TestAlertMetrics:
+    
+    @staticmethod
+    def _alerts():
+        return [
+            {'transaction_id': 'TXN1', 'customer_id': 'CUST1', 'amount': Decimal('100.50'), 'anomaly_score': Decimal('5.5')},
+            {'transaction_id': 'TXN2', 'customer_id': 'CUST1', 'amount': Decimal('200.00'), 'anomaly_score': Decimal('4.2')},
+            {'transaction_id': 'TXN3', 'customer_id': 'CUST2', 'amount': Decimal('50.00'), 'anomaly_score': Decimal('3.0')}
+        ]
+    
+    def test_flush_adds_aggregates_atomically(self):
+        """Test that one run is folded into the summary item with ADD plus a conditional max"""
+        table = Mock()
+        metrics = AlertMetrics()
+        metrics.add(self._alerts())
+        
+        assert metrics.flush(table) is True
+        
+        add_call, max_call = table.update_item.call_args_list
+        values = add_call[1]['ExpressionAttributeValues']
+        assert add_call[1]['Key'] == METRICS_KEY
+        assert add_call[1]['UpdateExpression'].startswith('ADD total_alerts :alerts')
+        # The first flush sets max_score together with the totals, so readers never see one without the other
+        assert 'max_score = if_not_exists(max_score, :max)' in add_call[1]['UpdateExpression']
+        assert (values[':max'], values[':txn']) == (Decimal('5.5'), 'TXN1')
+        assert values[':alerts'] == 3
+        assert values[':amount'] == Decimal('350.50')
+        assert values[':score'] == Decimal('12.7')
+        assert (values[':critical'], values[':high'], values[':moderate']) == (1, 1, 1)
+        assert estimate_cardinality(values[':sketch']) == 2
+        assert max_call[1]['ConditionExpression'] == 'attribute_not_exists(max_score) OR max_score < :max'
+        assert max_call[1]['ExpressionAttributeValues'] == {':max': Decimal('5.5'), ':txn': 'TXN1'}
+        
+        # Flushed totals are not sent twice
+        assert metrics.flush(table) is False
+        assert table.update_item.call_count == 2
+    
+    def test_flush_ignores_lower_max_score(self):
+        """Test that a lower run maximum does not overwrite the stored one"""
+        table = Mock()
+        table.update_item.side_effect = [
+            {},
+            ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'lower'}}, 'UpdateItem')
+        ]
+        metrics = AlertMetrics()
+        metrics.add(self._alerts())
+        
+        assert metrics.flush(table) is True
+    
+    def test_overwrite_replaces_totals_and_bumps_version(self):
+        """Test that a rebuild overwrites the totals in one update and keeps the version counting up"""
+        table = Mock()
+        metrics = AlertMetrics()
+        metrics.add(self._alerts())
+        
+        metrics.overwrite(table)
+        
+        call = table.update_item.call_args[1]
+        assert table.update_item.call_count == 1
+        assert call['UpdateExpression'].startswith('SET total_alerts = :alerts')
+        assert call['UpdateExpression'].endswith('ADD #version :one')
+        assert call['ExpressionAttributeValues'][':alerts'] == 3
+        assert call['ExpressionAttributeValues'][':max'] == Decimal('5.5')
+        table.delete_item.assert_not_called()
+    
+    def test_overwrite_empty_table_clears_max_and_sketch(self):
+        """Test that rebuilding from an empty table zeroes the totals without an empty set"""
+        table = Mock()
+        
+        AlertMetrics().overwrite(table)
+        
+        call = table.update_item.call_args[1]
+        assert call['UpdateExpression'].endswith('REMOVE customer_sketch, max_score, max_transaction_id')
+        assert call['ExpressionAttributeValues'][':alerts'] == 0
+        assert ':sketch' not in call['ExpressionAttributeValues']
+    
+    def test_cardinality_estimate_accuracy(self):
+        """Test that the customer sketch stays within a few percent at scale"""
+        metrics = AlertMetrics()
+        metrics.add(
+            {'transaction_id': f'TXN{i}', 'customer_id': f'CUST{i % 20000}', 'amount': 1, 'anomaly_score': 3}
+            for i in range(60000)
+        )
+        entries = [register * 64 + rank for register, rank in metrics.sketch.items()]
+        
+        assert abs(estimate_cardinality(entries) - 20000) / 20000 < 0.1
+    
+    def test_read_metrics_empty(self):
+        """Test that an absent summary item reads as None"""
+        table = Mock()
+        table.get_item.return_value = {}
+        assert read_metrics(table) is None
+
+class TestAlertSnapshotCache:
+    
+    @pytest.fixture
+    def table(self):
+        table = Mock()
+        table.scan.return_value = {'Items': [
+            {'transaction_id': 'TXN001', 'anomaly_score': Decimal('3.1')},
+            {'transaction_id': 'TXN002', 'anomaly_score': Decimal('4.2')}
+        ]}
+        return table
+    
+    @patch('alert_snapshot.time.monotonic')
+    def test_snapshot_expires_after_ttl(self, mock_monotonic, table):
+        """Test that a stale snapshot is rescanned"""
+        cache = AlertSnapshotCache(table, ttl_seconds=30)
+        
+        mock_monotonic.return_value = 100.0
+        cache.get()
+        mock_monotonic.return_value = 129.0
+        cache.get()
+        mock_monotonic.return_value = 131.0
+        items = cache.get()
+        
+        assert len(items) == 2
+        assert table.scan.call_count == 2
+        assert (cache.hits, cache.misses) == (1, 2)
+    
+    def test_snapshot_invalidated_by_version(self, table):
+        """Test that a changed data version forces a rescan within the TTL"""
+        versions = iter(['v1', 'v1', 'v2'])
+        cache = AlertSnapshotCache(table, ttl_seconds=300, version_source=lambda: next(versions))
+        
+        cache.get()
+        cache.get()
+        cache.get()
+        
+        assert table.scan.call_count == 2
+        assert (cache.hits, cache.misses) == (1, 2)
+    
+    def test_snapshot_size_cap(self, table):
+        """Test that tables above the size cap are not cached"""
+        cache = AlertSnapshotCache(table, ttl_seconds=300, max_items=1)
+        
+        assert cache.get() is None
+        assert cache.get() is None
+        # The oversized table is not rescanned for every query
+        assert table.scan.call_count == 1
+        assert cache.stats()['items'] is None
+    
+    def test_snapshot_disabled_with_zero_ttl(self, table):
+        """Test that a zero TTL turns the cache off"""
+        cache = AlertSnapshotCache(table, ttl_seconds=0)
+        
+        assert cache.get() is None
+        table.scan.assert_not_called()
+    
+    def test_pinned_snapshot_shares_one_scan(self, table):
+        """Test that a pinned block sees one snapshot even with caching off or a new version"""
+        versions = iter(['v1', 'v2', 'v3'])
+        cache = AlertSnapshotCache(table, ttl_seconds=0, version_source=lambda: next(versions))
+        
+        with cache.pinned():
+            items = cache.get()
+            assert len(items) == 2
+            assert cache.get() is items
+            assert cache.get() is items
+        
+        assert table.scan.call_count == 1
+        assert (cache.hits, cache.misses) == (2, 1)
+        # Outside the block a zero TTL still means no caching
+        assert cache.get() is None
+        assert cache.stats()['items'] is None
+    
+    def test_pinned_snapshot_loads_lazily(self, table):
+        """Test that a pinned block scans nothing until a question needs the snapshot"""
+        cache = AlertSnapshotCache(table, ttl_seconds=0)
+        
+        with cache.pinned():
+            pass
+        
+        table.scan.assert_not_called()
+        assert (cache.hits, cache.misses) == (0, 0)
+    
+    def test_batch_of_point_reads_never_scans(self, table):
+        """Test that a batch answered by GetItem/BatchGetItem does not pay for a table scan"""
+        investigator = FraudInvestigator(table)
+        table.get_item.return_value = {'Item': {
+            'transaction_id': 'TXN1', 'anomaly_score': Decimal('3.1'), 'amount': Decimal('250')
+        }}
+        
+        results = investigator.query_batch(['Explain TXN1', 'explain TXN1'])
+        
+        assert all('error' not in result for result in results)
+        table.scan.assert_not_called()
+    
+    def test_fingerprint_follows_data_not_scan_order(self, table):
+        """Test that snapshots of the same alerts agree on a fingerprint and different alerts do not"""
+        first = AlertSnapshotCache(table, ttl_seconds=300)
+        assert first.fingerprint() is None
+        first.get()
+        
+        reordered = Mock()
+        reordered.scan.return_value = {'Items': list(reversed(table.scan.return_value['Items']))}
+        second = AlertSnapshotCache(reordered, ttl_seconds=300)
+        second.get()
+        
+        changed = Mock()
+        changed.scan.return_value = {'Items': [
+            {'transaction_id': 'TXN001', 'anomaly_score': Decimal('3.1')},
+            {'transaction_id': 'TXN002', 'anomaly_score': Decimal('4.9')}
+        ]}
+        third = AlertSnapshotCache(changed, ttl_seconds=300)
+        third.get()
+        
+        assert first.fingerprint().startswith('snapshot-2-')
+        assert first.fingerprint() == second.fingerprint()
+        assert first.fingerprint() != third.fingerprint()
+    
+    def test_investigator_streams_when_snapshot_oversized(self, table):
+        """Test that queries fall back to streamed scans above the size cap"""
+        investigator = FraudInvestigator(table)
+        investigator.snapshot.max_items = 0
+        table.scan.return_value = {'Items': [{'transaction_id': 'TXN001', 'anomaly_score': Decimal('3.1')}], 'Count': 7}
+        
+        assert "Current fraud alerts: 7" in investigator.query_fraud_data("fraud count")
+    
+    def test_streamed_answers_never_build_columns(self, table):
+        """Without a snapshot, rankings and totals come from the scan stream, not a per-question AlertColumns"""
+        investigator = FraudInvestigator(table, score_index='')
+        investigator.snapshot.ttl_seconds = 0
+        table.scan.return_value = {'Items': [
+            {'transaction_id': 'TXN001', 'customer_id': 'CUST001', 'amount': Decimal('100'), 'anomaly_score': Decimal('3.1')},
+            {'transaction_id': 'TXN002', 'customer_id': 'CUST001', 'amount': Decimal('900'), 'anomaly_score': Decimal('5.5')},
+            {'transaction_id': 'TXN003', 'customer_id': 'CUST002', 'amount': Decimal('50'), 'anomaly_score': Decimal('4.2')}
+        ]}
+        
+        with patch('alert_columns.AlertColumns.append', side_effect=AssertionError('columns built')):
+            top = investigator.answer("top 2 anomalous transactions")
+            highest = investigator.answer("highest fraud scores")
+            summary = investigator.answer("fraud summary")
+            overview = investigator.answer("hello")
+        
+        assert [r['transaction_id'] for r in top.records] == ['TXN002', 'TXN003']
+        assert [(r['customer_id'], r['anomaly_score']) for r in highest.records] == [('CUST001', 5.5), ('CUST002', 4.2)]
+        assert summary.records[0]['total_alerts'] == 3
+        assert (summary.records[0]['critical'], summary.records[0]['high'], summary.records[0]['moderate']) == (1, 1, 1)
+        assert overview.records[0] == {'transaction_id': 'TXN002', 'anomaly_score': 5.5, 'risk_bucket': 'critical', 'total_alerts': 3}
+
+class TestResponseRender:
+    
+    def test_text_joins_lines_once(self):
+        response = Response('count').add("first", "").add("second")
+        assert response.text() == "first\n\nsecond"
+        assert str(response) == response.text()
+    
+    def test_streams_text_and_records(self):
+        """Test that a large answer can be written out without building the full text"""
+        response = Response('top_anomalous')
+        for i in range(10000):
+            response.record({'transaction_id': f'TXN{i}', 'anomaly_score': i / 10}).add(f"{i}. TXN{i}")
+        
+        text, records = io.StringIO(), io.StringIO()
+        response.write_to(text)
+        response.write_json(records)
+        
+        assert text.getvalue() == response.text() + "\n"
+        assert json.loads(records.getvalue()) == response.records
+        assert response.to_dict()['intent'] == 'top_anomalous'
+    
+    def test_alert_record_converts_decimals(self):
+        item = {'transaction_id': 'TXN001', 'amount': Decimal('12.50'), 'anomaly_score': Decimal('4.5')}
+        record = alert_record(item, 'transaction_id', 'amount', 'anomaly_score', 'timestamp')
+        assert record == {'transaction_id': 'TXN001', 'amount': 12.5, 'anomaly_score': 4.5, 'timestamp': None,
+                          'risk_bucket': 'high'}
+        json.dumps(record)
+
+class TestAnswerCache:
+    
+    def test_cache_key_ignores_wording(self):
+        """Test that keys depend only on intent, format and the parameters the intent uses"""
+        key = lambda query, response_format='text': cache_key(parse_query(query), response_format)
+        
+        assert key("Give me a summary of fraud metrics") == key("fraud summary for the last 3 days")
+        assert key("top 3 anomalous transactions") == key("Show me the TOP 3 risky ones")
+        assert key("top 3 anomalous transactions") != key("top 5 anomalous transactions")
+        assert key("explain transaction TXN001 and TXN002") != key("explain transaction TXN002 and TXN001")
+        assert key("fraud summary") != key("fraud summary", 'json')
+    
+    @patch('answer_cache.time')
+    def test_entries_expire_and_follow_data_version(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        cache = AnswerCache(MemoryCacheBackend(), ttl_seconds=10)
+        cache.put('summary|text', 'metrics-1', {'intent': 'summary'})
+        
+        assert cache.get('summary|text', 'metrics-1').value == {'intent': 'summary'}
+        assert cache.get('summary|text', 'metrics-2') is None
+        mock_time.time.return_value = 1010.0
+        assert cache.get('summary|text', 'metrics-1') is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+    
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        for key in ('a', 'b'):
+            backend.put(key, CacheEntry(None, key, 0, 1))
+        backend.get('a')
+        backend.put('c', CacheEntry(None, 'c', 0, 1))
+        
+        assert backend.get('b') is None
+        assert backend.get('a').value == 'a'
+    
+    def test_dynamodb_backend_round_trip(self):
+        """Test that answers are shared through one item per key with a TTL attribute"""
+        items = {}
+        table = Mock()
+        table.put_item.side_effect = lambda Item: items.__setitem__(Item['cache_key'], Item)
+        table.get_item.side_effect = lambda Key: {'Item': items[Key['cache_key']]} if Key['cache_key'] in items else {}
+        backend = DynamoDBCacheBackend(table)
+        
+        backend.put('count|json', CacheEntry('metrics-3', {'records': [{'total_alerts': 2}]}, 1000.25, 1010.25))
+        entry = backend.get('count|json')
+        
+        assert entry[:3] == ('metrics-3', {'records': [{'total_alerts': 2}]}, 1000.25)
+        # Whole epoch seconds for the table's TTL attribute, rounded up
+        assert items['count|json']['expires_at'] == entry.expires_at == 1011
+        assert backend.get('summary|json') is None
+    
+    def test_backend_errors_are_misses(self):
+        backend = Mock()
+        backend.get.side_effect = ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'GetItem')
+        backend.put.side_effect = ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'PutItem')
+        cache = AnswerCache(backend, ttl_seconds=10)
+        
+        cache.put('count|text', None, {})
+        assert cache.get('count|text', None) is None
+    
+    def test_investigator_reuses_answers_until_version_changes(self):
+        table = Mock()
+        table.scan.return_value = {'Items': [], 'Count': 4}
+        investigator = FraudInvestigator(table, answer_cache=AnswerCache(MemoryCacheBackend(), ttl_seconds=10))
+        
+        first, first_entry = investigator.respond("fraud count", 'json', 'metrics-1')
+        second, second_entry = investigator.respond("how many alerts are there", 'json', 'metrics-1')
+        third, third_entry = investigator.respond("fraud count", 'json', 'metrics-2')
+        
+        assert first_entry is None and third_entry is None
+        assert second_entry is not None
+        assert second == dict(first, query="how many alerts are there")
+        assert investigator.answer_cache.stats()['hits'] == 1
+    
+    def test_error_answers_are_not_cached(self):
+        table = Mock()
+        table.get_item.side_effect = Exception("lookup failed")
+        investigator = FraudInvestigator(table, answer_cache=AnswerCache(MemoryCacheBackend(), ttl_seconds=10))
+        
+        investigator.respond("explain transaction TXN001")
+        _, entry = investigator.respond("explain transaction TXN001")
+        
+        assert entry is None
+        assert table.get_item.call_count == 2
+
+class TestAlertScan:
+    
+    def test_scan_items_follows_last_evaluated_key(self):
+        """Test that every page is read until LastEvaluatedKey is absent"""
+        table = Mock()
+        table.scan.side_effect = [
+            {'Items': [{'transaction_id': 'TXN001'}], 'LastEvaluatedKey': {'transaction_id': 'TXN001'}},
+            {'Items': [{'transaction_id': 'TXN002'}], 'LastEvaluatedKey': {'transaction_id': 'TXN002'}},
+            {'Items': [{'transaction_id': 'TXN003'}]}
+        ]
+        
+        items = list(scan_items(table))
+        
+        assert [item['transaction_id'] for item in items] == ['TXN001', 'TXN002', 'TXN003']
+        assert table.scan.call_count == 3
+        assert 'ExclusiveStartKey' not in table.scan.call_args_list[0][1]
+        assert table.scan.call_args_list[2][1]['ExclusiveStartKey'] == {'transaction_id': 'TXN002'}
+    
+    def test_scan_items_projection_expression(self):
+        """Test that only requested attributes are transferred, reserved words included"""
+        table = Mock()
+        table.scan.return_value = {'Items': []}
+        
+        list(scan_items(table, attributes=('transaction_id', 'timestamp')))
+        
+        kwargs = table.scan.call_args[1]
+        assert kwargs['ProjectionExpression'] == '#p0, #p1'
+        assert kwargs['ExpressionAttributeNames'] == {'#p0': 'transaction_id', '#p1': 'timestamp'}
+    
+    def test_count_items_uses_select_count(self):
+        """Test that counting transfers no items and sums every page"""
+        table = Mock()
+        table.scan.side_effect = [
+            {'Count': 1000, 'LastEvaluatedKey': {'transaction_id': 'TXN999'}},
+            {'Count': 42}
+        ]
+        
+        assert count_items(table) == 1042
+        assert all(c[1]['Select'] == 'COUNT' for c in table.scan.call_args_list)
+    
+    def test_scan_items_parallel_segments(self):
+        """Test that a segmented scan covers every segment and page"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        
+        def segment_scan(**kwargs):
+            segment = kwargs['Segment']
+            if 'ExclusiveStartKey' not in kwargs:
+                return {'Items': [{'transaction_id': f'TXN{segment}A'}], 'LastEvaluatedKey': {'transaction_id': 'x'}}
+            return {'Items': [{'transaction_id': f'TXN{segment}B'}]}
+        
+        table.meta.client.scan.side_effect = segment_scan
+        
+        items = list(scan_items(table, attributes=('transaction_id',), segments=3))
+        
+        assert sorted(item['transaction_id'] for item in items) == [
+            'TXN0A', 'TXN0B', 'TXN1A', 'TXN1B', 'TXN2A', 'TXN2B'
+        ]
+        assert all(c[1]['TotalSegments'] == 3 and c[1]['TableName'] == 'fraud-alerts'
+                   for c in table.meta.client.scan.call_args_list)
+        table.scan.assert_not_called()
+    
+    def test_query_top_scores_merges_shards(self):
+        """Test that per-shard descending pages merge into the overall top k"""
+        table = Mock()
+        shard_pages = {
+            '0': [{'transaction_id': 'A', 'anomaly_score': Decimal('9.0')},
+                  {'transaction_id': 'B', 'anomaly_score': Decimal('3.0')}],
+            '1': [{'transaction_id': 'C', 'anomaly_score': Decimal('7.5')},
+                  {'transaction_id': 'D', 'anomaly_score': Decimal('6.0')}],
+            '2': []
+        }
+        table.query.side_effect = lambda **kw: {
+            'Items': shard_pages[kw['KeyConditionExpression'].get_expression()['values'][1]][:kw['Limit']]
+        }
+        
+        top = query_top_scores(table, 3, index_name='score-index', shards=3)
+        
+        assert [item['transaction_id'] for item in top] == ['A', 'C', 'D']
+        assert table.query.call_count == 3
+    
+    def test_score_shard_is_stable(self):
+        """Test that shard assignment is deterministic and within range"""
+        assert score_shard('TXN999004', shards=4) == score_shard('TXN999004', shards=4)
+        assert {score_shard(f'TXN{i}', shards=4) for i in range(100)} == {'0', '1', '2', '3'}
+    
+    def test_query_customer_alerts_follows_pagination(self):
+        """Test that customer queries read every page of the customer-index"""
+        table = Mock()
+        table.query.side_effect = [
+            {'Items': [{'transaction_id': 'TXN1'}], 'LastEvaluatedKey': {'transaction_id': 'TXN1'}},
+            {'Items': [{'transaction_id': 'TXN2'}]}
+        ]
+        
+        items = list(query_customer_alerts(table, 'CUST9004', attributes=('transaction_id',)))
+        
+        assert [item['transaction_id'] for item in items] == ['TXN1', 'TXN2']
+        first_call = table.query.call_args_list[0][1]
+        assert first_call['IndexName'] == 'customer-index'
+        assert first_call['KeyConditionExpression'].get_expression()['values'][1] == 'CUST9004'
+        assert table.query.call_args_list[1][1]['ExclusiveStartKey'] == {'transaction_id': 'TXN1'}
+    
+    @patch('alert_scan.time.sleep')
+    def test_batch_get_alerts_chunks_and_retries(self, mock_sleep):
+        """Test 100-key chunks and retries of unprocessed keys"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        ids = [f'TXN{i:03d}' for i in range(150)]
+        
+        def batch_get_item(RequestItems):
+            keys = RequestItems['fraud-alerts']['Keys']
+            # The first call leaves its last key unprocessed
+            if batch_get_item.calls == 0:
+                batch_get_item.calls += 1
+                return {'Responses': {'fraud-alerts': [dict(k) for k in keys[:-1]]},
+                        'UnprocessedKeys': {'fraud-alerts': {'Keys': keys[-1:]}}}
+            batch_get_item.calls += 1
+            return {'Responses': {'fraud-alerts': [dict(k) for k in keys]}}
+        batch_get_item.calls = 0
+        table.meta.client.batch_get_item.side_effect = batch_get_item
+        
+        found = batch_get_alerts(table, ids, attributes=('amount',))
+        
+        assert sorted(found) == ids
+        sizes = [len(c[1]['RequestItems']['fraud-alerts']['Keys'])
+                 for c in table.meta.client.batch_get_item.call_args_list]
+        assert sizes == [100, 1, 50]
+        request = table.meta.client.batch_get_item.call_args_list[0][1]['RequestItems']['fraud-alerts']
+        assert set(request['ExpressionAttributeNames'].values()) == {'transaction_id', 'amount'}
+        mock_sleep.assert_called_once()
+    
+    @patch('alert_scan.time.sleep')
+    def test_batch_get_alerts_gives_up(self, mock_sleep):
+        """Test that keys left unprocessed past the retry limit raise"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        table.meta.client.batch_get_item.return_value = {
+            'UnprocessedKeys': {'fraud-alerts': {'Keys': [{'transaction_id': 'TXN1'}]}}
+        }
+        
+        with pytest.raises(RuntimeError):
+            batch_get_alerts(table, ['TXN1', 'TXN2'], max_retries=2)
+        assert table.meta.client.batch_get_item.call_count == 3
+    
+    def test_top_k_matches_full_sort(self):
+        """Test that the bounded heap returns what a full sort would, ties included"""
+        items = [
+            {'transaction_id': f'TXN{i:03d}', 'anomaly_score': Decimal(str((i * 37) % 11 / 2))}
+            for i in range(100)
+        ]
+        expected = sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)[:7]
+        
+        assert top_k(iter(items), 7) == expected
+        assert top_k(items, 500) == sorted(items, key=lambda x: float(x['anomaly_score']), reverse=True)
+        assert top_k([], 3) == []
+    
+    def test_scan_items_parallel_propagates_errors(self):
+        """Test that a failing segment surfaces its error to the consumer"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        table.meta.client.scan.side_effect = Exception("segment failed")
+        
+        with pytest.raises(Exception, match="segment failed"):
+            list(scan_items(table, segments=2))
 
 class TestLambdaHandler:
     
     @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
-    @patch('lambda.fraud_investigator_lambda.boto3')
+    @patch('aws_clients.boto3')
     def test_lambda_handler_success(self, mock_boto3):
         """Test successful lambda handler execution"""
         # Mock DynamoDB
@@ -103,10 +941,12 @@ class TestLambdaHandler:
         assert result['statusCode'] == 200
         body = json.loads(result['body'])
         assert body['query'] == 'Show me fraud summary'
+        assert body['intent'] == 'summary'
         assert 'response' in body
+        assert body['records'] == []
     
     @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
-    @patch('lambda.fraud_investigator_lambda.boto3')
+    @patch('aws_clients.boto3')
     def test_lambda_handler_error(self, mock_boto3):
         """Test lambda handler error handling"""
         # Mock DynamoDB to raise exception
@@ -119,4 +959,175 @@ class TestLambdaHandler:
         
         assert result['statusCode'] == 500
         body = json.loads(result['body'])
-        assert 'error' in body
\ No newline at end of file
+        assert 'error' in body
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_reuses_clients_when_warm(self, mock_boto3):
+        """Test that clients and the investigator are built once per container"""
+        mock_table = Mock()
+        mock_table.scan.return_value = {'Items': []}
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        
+        first = json.loads(lambda_handler({'query': 'count'}, {})['body'])
+        second = json.loads(lambda_handler({'query': 'count'}, {})['body'])
+        
+        mock_boto3.resource.assert_called_once()
+        mock_boto3.resource.return_value.Table.assert_called_once_with('test-table')
+        assert first['timing']['cold_start'] is True
+        assert second['timing']['cold_start'] is False
+        assert second['timing']['duration_ms'] >= 0
+        
+        # The warm investigator answers the repeat question from its answer cache
+        assert first['cache']['misses'] == 1
+        assert second['answer_cache']['hits'] == 1
+        mock_table.scan.assert_called_once()
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_batch_queries(self, mock_boto3):
+        """Test that a batch is answered in order from a single scan"""
+        mock_table = Mock()
+        mock_table.scan.return_value = {'Items': [
+            {'transaction_id': 'TXN001', 'customer_id': 'CUST001', 'amount': Decimal('100'), 'anomaly_score': Decimal('4.5')},
+            {'transaction_id': 'TXN002', 'customer_id': 'CUST002', 'amount': Decimal('300'), 'anomaly_score': Decimal('5.7')}
+        ]}
+        mock_table.get_item.side_effect = Exception("lookup failed")
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        
+        queries = ['Give me fraud summary', 'List customers with highest fraud scores',
+                   'fraud count', 'Explain transaction TXN001', 'overview']
+        result = lambda_handler({'queries': queries}, {})
+        
+        assert result['statusCode'] == 200
+        results = json.loads(result['body'])['results']
+        assert [r['query'] for r in results] == queries
+        assert "Total Alerts: 2" in results[0]['response']
+        assert "CUST002: 5.7" in results[1]['response']
+        assert "Current fraud alerts: 2" in results[2]['response']
+        assert "lookup failed" in results[3]['response']
+        assert "Monitoring 2 fraud alerts" in results[4]['response']
+        assert len({r['etag'] for r in results}) == len(queries)
+        mock_table.scan.assert_called_once()
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table', 'MAX_BATCH_QUERIES': '50'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_rejects_bad_batches(self, mock_boto3):
+        """Test that oversized or malformed batches are rejected before any reads"""
+        too_many = lambda_handler({'queries': ['count'] * 51}, {})
+        not_a_list = lambda_handler({'queries': 'count'}, {})
+        
+        assert too_many['statusCode'] == 400
+        assert not_a_list['statusCode'] == 400
+        mock_boto3.resource.assert_not_called()
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_api_gateway_body(self, mock_boto3):
+        """Test that API Gateway proxy events carry the request in a JSON body"""
+        mock_table = Mock()
+        mock_table.scan.return_value = {'Items': []}
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        
+        result = lambda_handler({'body': json.dumps({'queries': ['fraud count', 'overview']})}, {})
+        
+        results = json.loads(result['body'])['results']
+        assert results[0]['response'] == "Current fraud alerts: 0"
+        assert results[1]['response'] == "No fraud alerts in system."
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table', 'METRICS_TABLE': 'test-metrics'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_summary_from_metrics_table(self, mock_boto3):
+        """Test that the handler wires METRICS_TABLE into the investigator"""
+        alerts_table = Mock()
+        metrics_table = Mock()
+        metrics_table.get_item.return_value = {
+            'Item': {'total_alerts': Decimal('7'), 'total_amount': Decimal('700'),
+                     'total_score': Decimal('21'), 'max_score': Decimal('4.0'), 'version': Decimal('1')}
+        }
+        tables = {'test-table': alerts_table, 'test-metrics': metrics_table}
+        mock_boto3.resource.return_value.Table.side_effect = tables.get
+        
+        body = json.loads(lambda_handler({'query': 'Show me fraud summary'}, {})['body'])
+        
+        assert "Total Alerts: 7" in body['response']
+        assert body['records'][0]['total_alerts'] == 7
+        assert body['version'] == 'metrics-1'
+        alerts_table.scan.assert_not_called()
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_json_format(self, mock_boto3):
+        """Test that format=json returns compact typed records with an ETag and data version"""
+        mock_table = Mock()
+        mock_table.scan.return_value = {'Items': [
+            {'transaction_id': 'TXN001', 'customer_id': 'CUST001', 'amount': Decimal('100'), 'anomaly_score': Decimal('4.5')},
+            {'transaction_id': 'TXN002', 'customer_id': 'CUST002', 'amount': Decimal('300'), 'anomaly_score': Decimal('5.7')}
+        ]}
+        mock_table.query.side_effect = ClientError({'Error': {'Code': 'ValidationException'}}, 'Query')
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        
+        result = lambda_handler({'query': 'top 2 anomalous transactions', 'format': 'json'}, {})
+        body = json.loads(result['body'])
+        
+        assert ', ' not in result['body'] and ': ' not in result['body']
+        assert 'response' not in body
+        assert body['intent'] == 'top_anomalous'
+        assert body['records'][0] == {'transaction_id': 'TXN002', 'anomaly_score': 5.7, 'amount': 300.0,
+                                      'risk_bucket': 'critical'}
+        assert body['version'].startswith('snapshot-')
+        assert result['headers']['ETag'] == body['etag']
+        assert body['etag'] == etag({'query': body['query'], 'intent': body['intent'], 'records': body['records']})
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('fraud_investigator_lambda.build_answer_cache', lambda: AnswerCache(MemoryCacheBackend(), ttl_seconds=0))
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_not_modified(self, mock_boto3):
+        """Test that an unchanged answer is a bodiless 304 and a changed one is re-sent"""
+        mock_table = Mock()
+        mock_table.get_item.return_value = {'Item': {
+            'transaction_id': 'TXN001', 'customer_id': 'CUST001', 'amount': Decimal('100'), 'anomaly_score': Decimal('4.5')
+        }}
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        event = {'httpMethod': 'GET', 'queryStringParameters': {'query': 'Explain transaction TXN001', 'format': 'json'}}
+        
+        first = lambda_handler(event, {})
+        tag = first['headers']['ETag']
+        repeat = lambda_handler(dict(event, headers={'if-none-match': tag}), {})
+        # A point read needs no snapshot, so without a metrics table there is no data version to report
+        assert 'version' not in json.loads(first['body'])
+        mock_table.scan.assert_not_called()
+        
+        mock_table.get_item.return_value['Item']['anomaly_score'] = Decimal('5.2')
+        changed = lambda_handler(dict(event, headers={'If-None-Match': tag}), {})
+        
+        assert repeat['statusCode'] == 304
+        assert repeat['body'] == ''
+        assert changed['statusCode'] == 200
+        assert changed['headers']['ETag'] != tag
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_rejects_unknown_format(self, mock_boto3):
+        result = lambda_handler({'query': 'fraud count', 'format': 'xml'}, {})
+        assert result['statusCode'] == 400
+        mock_boto3.resource.assert_not_called()
+    
+    @patch.dict(os.environ, {'DYNAMODB_TABLE': 'test-table'})
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_cache_headers(self, mock_boto3):
+        """Test that a repeated question is served from the answer cache with cache headers"""
+        mock_table = Mock()
+        mock_table.scan.return_value = {'Items': [], 'Count': 3}
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        
+        miss = lambda_handler({'query': 'fraud count'}, {})
+        hit = lambda_handler({'query': 'How many fraud alerts?'}, {})
+        
+        assert miss['headers']['X-Cache'] == 'Miss'
+        assert miss['headers']['Cache-Control'] == 'max-age=10'
+        assert hit['headers']['X-Cache'] == 'Hit'
+        assert 'Age' in hit['headers']
+        assert json.loads(hit['body'])['answer_cache']['hits'] == 1
+        assert json.loads(hit["body"])["response"] == json.loads(miss["body"])["response"]
+        mock_table.scan.assert_called_once()
@@ -0,0 +1,103 @@
+import pytest
+import json
+import sys
+import os
+from datetime import datetime
+
+# The rule engine lives with the Glue job that imports it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
+
+from fraud_rules import load_rules, apply_rules, FIRED_RULES_COLUMN
+
+RULES_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts', 'fraud_rules.json')
+
+class TestFraudRules:
+    
+    def test_shipped_config_keeps_original_rule(self):
+        """The default rules reproduce amount > 1500 OR country != US; disabled rules are dropped"""
+        with open(RULES_CONFIG) as f:
+            rules = load_rules(f.read())
+        
+        assert [rule['name'] for rule in rules] == ['high_amount', 'foreign_country']
+        assert rules[0]['conditions'] == {'amount_above': 1500}
+        assert rules[1]['conditions'] == {'country_not_in': ['US']}
+    
+    def test_description_is_not_a_condition(self):
+        rules = load_rules(json.dumps({'rules': [
+            {'name': 'night', 'description': 'late hours', 'hour_between': [22, 5], 'merchant_category_in': ['atm']}
+        ]}))
+        
+        assert rules[0]['conditions'] == {'hour_between': [22, 5], 'merchant_category_in': ['atm']}
+    
+    @pytest.mark.parametrize('rule, message', [
+        ({'amount_above': 100}, 'without a name'),
+        ({'name': 'typo', 'amount_over': 100}, 'unknown conditions: amount_over'),
+        ({'name': 'empty'}, 'no conditions'),
+        ({'name': 'hours', 'hour_between': [22]}, r'\[start, end\]'),
+    ])
+    def test_invalid_rules_rejected(self, rule, message):
+        with pytest.raises(ValueError, match=message):
+            load_rules(json.dumps({'rules': [rule]}))
+    
+    def test_duplicate_names_rejected(self):
+        config = {'rules': [{'name': 'a', 'amount_above': 1}, {'name': 'a', 'amount_below': 1}]}
+        
+        with pytest.raises(ValueError, match='Duplicate rule name: a'):
+            load_rules(json.dumps(config))
+
+class TestApplyRules:
+    
+    COLUMNS = ['transaction_id', 'amount', 'country', 'merchant_category', 'timestamp']
+    
+    @staticmethod
+    def _fired(spark, rules, rows):
+        df = spark.createDataFrame(
+            [(txn, amount, country, category, datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S'))
+             for txn, amount, country, category, timestamp in rows],
+            TestApplyRules.COLUMNS
+        )
+        return {row['transaction_id']: (row[FIRED_RULES_COLUMN], row['is_fraud'])
+                for row in apply_rules(df, rules).collect()}
+    
+    def test_shipped_config_names_each_fired_rule(self, spark):
+        """Every matching rule is listed in config order; a row no rule matches gets '' and is_fraud 0"""
+        with open(RULES_CONFIG) as f:
+            rules = load_rules(f.read())
+        
+        fired = self._fired(spark, rules, [
+            ('TXN1', 2000.0, 'US', 'retail', '2025-01-15 10:00:00'),
+            ('TXN2', 100.0, 'UK', 'grocery', '2025-01-15 11:00:00'),
+            ('TXN3', 5000.0, 'FR', 'online', '2025-01-15 23:30:00'),
+            ('TXN4', 100.0, 'US', 'transfer', '2025-01-15 23:30:00'),
+        ])
+        
+        assert fired == {
+            'TXN1': ('high_amount', 1),
+            'TXN2': ('foreign_country', 1),
+            'TXN3': ('high_amount;foreign_country', 1),
+            # late_night_transfer is disabled in the shipped config
+            'TXN4': ('', 0),
+        }
+    
+    def test_all_conditions_of_a_rule_must_hold(self, spark):
+        """hour_between wraps past midnight and is combined with the other conditions of its rule"""
+        rules = load_rules(json.dumps({'rules': [
+            {'name': 'late_night_transfer', 'amount_above': 1000,
+             'merchant_category_in': ['transfer', 'atm'], 'hour_between': [22, 5]}
+        ]}))
+        
+        fired = self._fired(spark, rules, [
+            ('TXN1', 1200.0, 'US', 'transfer', '2025-01-15 22:00:00'),
+            ('TXN2', 1200.0, 'US', 'atm', '2025-01-16 05:59:00'),
+            ('TXN3', 1200.0, 'US', 'atm', '2025-01-16 06:00:00'),
+            ('TXN4', 1200.0, 'US', 'grocery', '2025-01-15 23:00:00'),
+            ('TXN5', 900.0, 'US', 'transfer', '2025-01-15 23:00:00'),
+        ])
+        
+        assert fired == {
+            'TXN1': ('late_night_transfer', 1),
+            'TXN2': ('late_night_transfer', 1),
+            'TXN3': ('', 0),
+            'TXN4': ('', 0),
+            'TXN5': ('', 0),
+        }
@@ -1,6 +1,7 @@
 import pytest
 import json
 import csv
+import hashlib
 import io
 from unittest.mock import Mock, patch, MagicMock
 from decimal import Decimal
@@ -10,7 +11,18 @@ import os
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from lambda.lambda_function import lambda_handler
+from lambda_function import (
+    lambda_handler,
+    iter_s3_lines,
+    read_s3_csv,
+    batch_write_alerts,
+    load_flagged_scores,
+    iter_fraud_alerts,
+    plan_incremental_read,
+    tail_digest,
+    AlertWriter
+)
+from botocore.exceptions import ClientError
 
 class TestLambdaFunction:
     
@@ -36,18 +48,20 @@ TXN003,CUST003,8500.00,2025-01-15 18:45:00"""
         'S3_BUCKET': 'test-bucket',
         'DYNAMODB_TABLE': 'test-table'
     })
-    @patch('lambda.lambda_function.boto3')
+    @patch('aws_clients.boto3')
     def test_lambda_handler_success(self, mock_boto3, mock_s3_data):
         """Test successful fraud alert processing"""
         # Mock S3 client
         mock_s3 = Mock()
         mock_s3.get_object.side_effect = [
-            {'Body': Mock(read=Mock(return_value=mock_s3_data['scored/anomaly_scores.csv'].encode()))},
-            {'Body': Mock(read=Mock(return_value=mock_s3_data['scored/anomaly_results.csv'].encode()))}
+            {'Body': io.BytesIO(mock_s3_data['scored/anomaly_scores.csv'].encode())},
+            {'Body': io.BytesIO(mock_s3_data['scored/anomaly_results.csv'].encode())}
         ]
         
         # Mock DynamoDB table
         mock_table = Mock()
+        mock_table.name = 'test-table'
+        mock_table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
         
         # Mock boto3 clients
         mock_boto3.client.return_value = mock_s3
@@ -62,12 +76,133 @@ TXN003,CUST003,8500.00,2025-01-15 18:45:00"""
         body = json.loads(result['body'])
         assert 'Successfully processed' in body['message']
         assert body['alerts_written'] == 2  # Only TXN001 and TXN003 have score > 2.5
+        assert body['batches'] == 1
+        assert body['retries'] == 0
+        assert body['timing']['cold_start'] is True
+        
+        # Both alerts go out in a single BatchWriteItem call
+        request_items = mock_table.meta.client.batch_write_item.call_args[1]['RequestItems']
+        written = [r['PutRequest']['Item'] for r in request_items['test-table']]
+        assert [item['transaction_id'] for item in written] == ['TXN001', 'TXN003']
+        assert written[1]['customer_id'] == 'CUST003'
+        assert written[1]['anomaly_score'] == Decimal('4.8')
+        assert written[1]['score_shard'] in {'0', '1', '2', '3'}
+        mock_table.put_item.assert_not_called()
+    
+    @patch.dict(os.environ, {
+        'S3_BUCKET': 'test-bucket',
+        'DYNAMODB_TABLE': 'test-table',
+        'METRICS_TABLE': 'test-metrics'
+    })
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_updates_metrics(self, mock_boto3, mock_s3_data):
+        """Test that written alerts are folded into the metrics item once per run"""
+        mock_s3 = Mock()
+        mock_s3.get_object.side_effect = [
+            {'Body': io.BytesIO(mock_s3_data['scored/anomaly_scores.csv'].encode())},
+            {'Body': io.BytesIO(mock_s3_data['scored/anomaly_results.csv'].encode())}
+        ]
+        mock_table = Mock()
+        mock_table.name = 'test-table'
+        mock_table.meta.client.batch_get_item.return_value = {'Responses': {'test-table': []}}
+        mock_table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
+        metrics_table = Mock()
+        tables = {'test-table': mock_table, 'test-metrics': metrics_table}
+        mock_boto3.client.return_value = mock_s3
+        mock_boto3.resource.return_value.Table.side_effect = tables.get
+        
+        result = lambda_handler({}, {})
+        
+        assert result['statusCode'] == 200
+        add_call = metrics_table.update_item.call_args_list[0]
+        values = add_call[1]['ExpressionAttributeValues']
+        assert values[':alerts'] == 2
+        assert values[':amount'] == Decimal('13500.0')
+        assert values[':score'] == Decimal('8.3')
+        assert values[':one'] == 1
+        # Metrics only count alerts the batch's key lookup found missing, still written in one batch
+        keys = mock_table.meta.client.batch_get_item.call_args[1]['RequestItems']['test-table']['Keys']
+        assert keys == [{'transaction_id': 'TXN001'}, {'transaction_id': 'TXN003'}]
+        assert mock_table.meta.client.batch_write_item.call_count == 1
+        mock_table.meta.client.put_item.assert_not_called()
+        assert json.loads(result['body'])['write_mode'] == 'batch_skip_existing'
+    
+    @patch.dict(os.environ, {
+        'S3_BUCKET': 'test-bucket',
+        'DYNAMODB_TABLE': 'test-table',
+        'METRICS_TABLE': 'test-metrics',
+        'CONDITIONAL_WRITES': 'true'
+    })
+    @patch('aws_clients.boto3')
+    def test_conditional_writes_put_each_alert(self, mock_boto3, mock_s3_data, alerts_table):
+        """Test that CONDITIONAL_WRITES trades batching for a conditional put per alert"""
+        mock_boto3.client.return_value = FakeS3(mock_s3_data)
+        mock_boto3.resource.return_value.Table.side_effect = {'test-table': alerts_table, 'test-metrics': Mock()}.get
+        
+        body = json.loads(lambda_handler({}, {})['body'])
+        
+        assert body['write_mode'] == 'conditional_put'
+        assert body['alerts_written'] == 2
+        call = alerts_table.meta.client.put_item.call_args[1]
+        assert call['ConditionExpression'] == 'attribute_not_exists(transaction_id)'
+        alerts_table.meta.client.batch_write_item.assert_not_called()
+    
+    @patch.dict(os.environ, {
+        'S3_BUCKET': 'test-bucket',
+        'DYNAMODB_TABLE': 'test-table',
+        'METRICS_TABLE': 'test-metrics'
+    })
+    @patch('aws_clients.boto3')
+    def test_rerun_on_same_input_does_not_recount_metrics(self, mock_boto3, mock_s3_data, alerts_table):
+        """Re-processing a scored file must leave the metrics totals where they were"""
+        s3 = FakeS3(mock_s3_data)
+        metrics_table = Mock()
+        tables = {'test-table': alerts_table, 'test-metrics': metrics_table}
+        mock_boto3.client.return_value = s3
+        mock_boto3.resource.return_value.Table.side_effect = tables.get
+        
+        first = json.loads(lambda_handler({}, {})['body'])
+        totals = [c[1]['ExpressionAttributeValues'] for c in metrics_table.update_item.call_args_list
+                  if ':alerts' in c[1]['ExpressionAttributeValues']]
+        second = json.loads(lambda_handler({}, {})['body'])
+        totals_after = [c[1]['ExpressionAttributeValues'] for c in metrics_table.update_item.call_args_list
+                        if ':alerts' in c[1]['ExpressionAttributeValues']]
+        
+        assert first['alerts_written'] == 2
+        assert second['alerts_written'] == 0
+        assert second['skipped_existing'] == 2
+        assert [values[':alerts'] for values in totals] == [2]
+        assert totals_after == totals
+    
+    @patch.dict(os.environ, {
+        'S3_BUCKET': 'test-bucket',
+        'DYNAMODB_TABLE': 'test-table',
+        'BATCH_WRITES': 'false'
+    })
+    @patch('aws_clients.boto3')
+    def test_lambda_handler_single_item_writes(self, mock_boto3, mock_s3_data):
+        """Test that batch writes can be switched off in favour of put_item"""
+        mock_s3 = Mock()
+        mock_s3.get_object.side_effect = [
+            {'Body': io.BytesIO(mock_s3_data['scored/anomaly_scores.csv'].encode())},
+            {'Body': io.BytesIO(mock_s3_data['scored/anomaly_results.csv'].encode())}
+        ]
+        mock_table = Mock()
+        mock_boto3.client.return_value = mock_s3
+        mock_boto3.resource.return_value.Table.return_value = mock_table
+        
+        result = lambda_handler({}, {})
+        
+        body = json.loads(result['body'])
+        assert body['alerts_written'] == 2
+        assert mock_table.put_item.call_count == 2
+        mock_table.meta.client.batch_write_item.assert_not_called()
     
     @patch.dict(os.environ, {
         'S3_BUCKET': 'test-bucket',
         'DYNAMODB_TABLE': 'test-table'
     })
-    @patch('lambda.lambda_function.boto3')
+    @patch('aws_clients.boto3')
     def test_lambda_handler_s3_error(self, mock_boto3):
         """Test S3 error handling"""
         # Mock S3 to raise exception
@@ -98,4 +233,529 @@ TXN003,CUST003,8500.00,2025-01-15 18:45:00"""
         assert len(fraud_alerts) == 2
         assert 'TXN001' in fraud_alerts
         assert 'TXN003' in fraud_alerts
-        assert 'TXN002' not in fraud_alerts
\ No newline at end of file
+        assert 'TXN002' not in fraud_alerts
+    
+    def test_iter_s3_lines_across_chunks(self, mock_s3_data):
+        """Test that lines split across chunk boundaries are reassembled"""
+        content = mock_s3_data['scored/anomaly_results.csv']
+        body = io.BytesIO(content.encode())
+        
+        lines = list(iter_s3_lines(body, chunk_size=7))
+        
+        assert ''.join(lines) == content
+        assert lines[0] == 'transaction_id,customer_id,amount,timestamp\n'
+        assert lines[-1] == 'TXN003,CUST003,8500.00,2025-01-15 18:45:00'
+    
+    def test_iter_s3_lines_multibyte_chars(self):
+        """Test that UTF-8 characters split across chunks decode correctly"""
+        content = "merchant,country\nCafé Müller,DE\n"
+        body = io.BytesIO(content.encode('utf-8'))
+        
+        lines = list(iter_s3_lines(body, chunk_size=1))
+        
+        assert lines == ["merchant,country\n", "Café Müller,DE\n"]
+    
+    def test_read_s3_csv_streams_body(self, mock_s3_data):
+        """Test that CSV rows are parsed from the streamed S3 body"""
+        mock_s3 = Mock()
+        body = Mock(wraps=io.BytesIO(mock_s3_data['scored/anomaly_scores.csv'].encode()))
+        mock_s3.get_object.return_value = {'Body': body}
+        
+        rows = list(read_s3_csv(mock_s3, 'test-bucket', 'scored/anomaly_scores.csv'))
+        
+        mock_s3.get_object.assert_called_once_with(Bucket='test-bucket', Key='scored/anomaly_scores.csv')
+        assert [row['transaction_id'] for row in rows] == ['TXN001', 'TXN002', 'TXN003']
+        assert rows[2]['anomaly_score'] == '4.8'
+        # Body is read in bounded chunks, never as a single unbounded read()
+        assert all(call.args for call in body.read.call_args_list)
+
+    
+    def _alert_items(self, count):
+        return [
+            {'transaction_id': f'TXN{i:06d}', 'anomaly_score': Decimal('3.0')}
+            for i in range(count)
+        ]
+    
+    def test_batch_write_alerts_chunks_of_25(self):
+        """Test that items are written in BatchWriteItem calls of at most 25"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
+        
+        stats = batch_write_alerts(table, self._alert_items(60))
+        
+        sizes = [len(c[1]['RequestItems']['fraud-alerts'])
+                 for c in table.meta.client.batch_write_item.call_args_list]
+        assert sizes == [25, 25, 10]
+        assert stats == {'items_written': 60, 'batches': 3, 'retries': 0, 'unprocessed_items': 0, 'failed_items': 0}
+    
+    @patch('lambda_function.time.sleep')
+    def test_batch_write_alerts_retries_unprocessed(self, mock_sleep):
+        """Test that unprocessed items are resubmitted with backoff"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        items = self._alert_items(3)
+        leftover = [{'PutRequest': {'Item': items[2]}}]
+        table.meta.client.batch_write_item.side_effect = [
+            {'UnprocessedItems': {'fraud-alerts': leftover}},
+            {'UnprocessedItems': {}}
+        ]
+        
+        stats = batch_write_alerts(table, items)
+        
+        retry_call = table.meta.client.batch_write_item.call_args_list[1]
+        assert retry_call[1]['RequestItems'] == {'fraud-alerts': leftover}
+        assert stats == {'items_written': 3, 'batches': 2, 'retries': 1, 'unprocessed_items': 0, 'failed_items': 0}
+        mock_sleep.assert_called_once()
+    
+    @patch('lambda_function.random.uniform', side_effect=lambda low, high: high)
+    @patch('lambda_function.time.sleep')
+    def test_batch_write_alerts_gives_up_after_max_retries(self, mock_sleep, mock_uniform):
+        """Test that persistently unprocessed items are reported, not retried forever"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        items = self._alert_items(2)
+        leftover = [{'PutRequest': {'Item': items[0]}}]
+        table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {'fraud-alerts': leftover}}
+        
+        stats = batch_write_alerts(table, items, max_retries=3, backoff_seconds=1.0)
+        
+        assert stats['batches'] == 4
+        assert stats['retries'] == 3
+        assert stats['items_written'] == 1
+        assert stats['unprocessed_items'] == 1
+        
+        # Backoff window doubles on each retry
+        windows = [c[0][0] for c in mock_sleep.call_args_list]
+        assert windows == pytest.approx([1.0, 2.0, 4.0], abs=0.01)
+
+    
+    def _s3_for(self, files):
+        mock_s3 = Mock()
+        mock_s3.get_object.side_effect = lambda Bucket, Key: {'Body': io.BytesIO(files[Key].encode())}
+        return mock_s3
+    
+    def test_load_flagged_scores_keeps_only_flagged(self, mock_s3_data):
+        """Test that only transactions above the threshold are retained"""
+        flagged = load_flagged_scores(self._s3_for(mock_s3_data), 'test-bucket')
+        
+        assert flagged == {'TXN001': 3.5, 'TXN003': 4.8}
+    
+    def test_iter_fraud_alerts_joins_flagged_details(self, mock_s3_data):
+        """Test that details are attached to flagged transactions only"""
+        mock_s3_data['scored/anomaly_scores.csv'] += "\nTXN404,3.1,True"
+        
+        alerts = list(iter_fraud_alerts(self._s3_for(mock_s3_data), 'test-bucket'))
+        
+        assert [a['transaction_id'] for a in alerts] == ['TXN001', 'TXN003', 'TXN404']
+        assert alerts[0]['customer_id'] == 'CUST001'
+        assert alerts[0]['amount'] == Decimal('5000.0')
+        assert alerts[1]['timestamp'] == '2025-01-15 18:45:00'
+        # Flagged transaction without details falls back to placeholders
+        assert alerts[2]['customer_id'] == 'UNKNOWN'
+        assert alerts[2]['amount'] == Decimal('0.0')
+    
+    def test_iter_fraud_alerts_stops_once_all_flagged_found(self, mock_s3_data):
+        """Test that the details file is not read past the last flagged transaction"""
+        mock_s3_data['scored/anomaly_scores.csv'] = "transaction_id,anomaly_score,is_anomaly\nTXN001,3.5,True"
+        mock_s3_data['scored/anomaly_results.csv'] += "\nnot,a,valid,row,at,all"
+        
+        alerts = list(iter_fraud_alerts(self._s3_for(mock_s3_data), 'test-bucket'))
+        
+        assert [a['transaction_id'] for a in alerts] == ['TXN001']
+    
+    def test_iter_fraud_alerts_joined_single_file(self):
+        """Test that a pre-joined results file is processed in a single pass"""
+        joined_csv = """transaction_id,customer_id,amount,timestamp,anomaly_score,is_anomaly
+TXN001,CUST001,5000.00,2025-01-15 10:30:00,3.5,True
+TXN002,CUST002,1200.00,2025-01-15 14:20:00,1.2,False"""
+        mock_s3 = self._s3_for({'scored/anomaly_results.csv': joined_csv})
+        
+        alerts = list(iter_fraud_alerts(mock_s3, 'test-bucket', joined=True))
+        
+        mock_s3.get_object.assert_called_once_with(Bucket='test-bucket', Key='scored/anomaly_results.csv')
+        assert len(alerts) == 1
+        assert alerts[0]['transaction_id'] == 'TXN001'
+        assert alerts[0]['anomaly_score'] == Decimal('3.5')
+        assert alerts[0]['customer_id'] == 'CUST001'
+
+    
+    def test_alert_writer_parallel_writes_all_items(self):
+        """Test that batches fanned out across the pool cover every item once"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
+        
+        writer = AlertWriter(table, concurrency=4)
+        stats = writer.write(self._alert_items(260))
+        
+        written = [r['PutRequest']['Item']['transaction_id']
+                   for c in table.meta.client.batch_write_item.call_args_list
+                   for r in c[1]['RequestItems']['fraud-alerts']]
+        assert sorted(written) == [f'TXN{i:06d}' for i in range(260)]
+        assert stats['batches'] == 11
+        assert stats['items_written'] == 260
+        assert stats['failed_items'] == 0
+    
+    def test_alert_writer_records_failed_items(self):
+        """Test that a rejected batch is accounted per item without stopping other batches"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        validation_error = ClientError(
+            {'Error': {'Code': 'ValidationException', 'Message': 'bad item'}}, 'BatchWriteItem'
+        )
+        table.meta.client.batch_write_item.side_effect = [validation_error, {'UnprocessedItems': {}}]
+        
+        writer = AlertWriter(table, concurrency=1)
+        stats = writer.write(self._alert_items(30))
+        
+        assert stats['failed_items'] == 25
+        assert stats['items_written'] == 5
+        assert len(writer.errors) == 25
+        assert writer.errors[0]['transaction_id'] == 'TXN000000'
+        assert 'bad item' in writer.errors[0]['error']
+    
+    @patch('lambda_function.time.sleep')
+    def test_alert_writer_reports_only_accepted_items(self, mock_sleep):
+        """Test that on_written never sees items DynamoDB left unprocessed"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        items = self._alert_items(3)
+        table.meta.client.batch_write_item.side_effect = [
+            {'UnprocessedItems': {'fraud-alerts': [{'PutRequest': {'Item': items[2]}}]}},
+            {'UnprocessedItems': {}}
+        ]
+        written = []
+        
+        AlertWriter(table, concurrency=1, on_written=written.extend).write(items)
+        
+        assert [item['transaction_id'] for item in written] == ['TXN000000', 'TXN000001', 'TXN000002']
+        assert table.meta.client.batch_write_item.call_count == 2
+    
+    @patch('lambda_function.time.sleep')
+    def test_alert_writer_retries_throttled_batch(self, mock_sleep):
+        """Test that throttling errors back off and resend the whole batch"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        throttled = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'slow down'}}, 'BatchWriteItem'
+        )
+        table.meta.client.batch_write_item.side_effect = [throttled, {'UnprocessedItems': {}}]
+        
+        writer = AlertWriter(table, concurrency=1)
+        stats = writer.write(self._alert_items(10))
+        
+        assert stats['retries'] == 1
+        assert stats['items_written'] == 10
+        assert stats['failed_items'] == 0
+        assert table.meta.client.batch_write_item.call_count == 2
+    
+    def test_alert_writer_conditional_skips_existing(self):
+        """Test that conditional writes leave stored alerts alone and report only new ones"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        exists = ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'exists'}}, 'PutItem')
+        table.meta.client.put_item.side_effect = [None, exists, None]
+        written = []
+        
+        writer = AlertWriter(table, concurrency=1, on_written=written.extend, conditional=True)
+        stats = writer.write(self._alert_items(3))
+        
+        assert stats['items_written'] == 2
+        assert stats['skipped_existing'] == 1
+        assert [item['transaction_id'] for item in written] == ['TXN000000', 'TXN000002']
+        call = table.meta.client.put_item.call_args_list[0][1]
+        assert call['ConditionExpression'] == 'attribute_not_exists(transaction_id)'
+        table.meta.client.batch_write_item.assert_not_called()
+    
+    def test_alert_writer_skip_existing_batches_new_items(self):
+        """Test that skip_existing looks each batch up once and batch-writes only the missing alerts"""
+        table = Mock()
+        table.name = 'fraud-alerts'
+        table.meta.client.batch_get_item.return_value = {'Responses': {'fraud-alerts': [{'transaction_id': 'TXN000001'}]}}
+        table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
+        written = []
+        
+        writer = AlertWriter(table, concurrency=1, on_written=written.extend, skip_existing=True)
+        stats = writer.write(self._alert_items(3))
+        
+        assert stats['items_written'] == 2
+        assert stats['skipped_existing'] == 1
+        assert [item['transaction_id'] for item in written] == ['TXN000000', 'TXN000002']
+        requests = table.meta.client.batch_write_item.call_args[1]['RequestItems']['fraud-alerts']
+        assert [r['PutRequest']['Item']['transaction_id'] for r in requests] == ['TXN000000', 'TXN000002']
+        table.meta.client.put_item.assert_not_called()
+
+class FakeS3:
+    """Just enough of S3 for checkpointed reads: ETags, ranged GETs and IfMatch"""
+    
+    def __init__(self, files):
+        self.files = {key: data.encode() for key, data in files.items()}
+        self.ranges = []
+    
+    def etag(self, key):
+        return '"' + hashlib.md5(self.files[key]).hexdigest() + '"'
+    
+    def head_object(self, Bucket, Key):
+        return {'ETag': self.etag(Key), 'ContentLength': len(self.files[Key])}
+    
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        if Key not in self.files:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'missing'}}, 'GetObject')
+        if IfMatch is not None and IfMatch != self.etag(Key):
+            raise ClientError({'Error': {'Code': 'PreconditionFailed', 'Message': 'changed'}}, 'GetObject')
+        data = self.files[Key]
+        if Range:
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1 if end else None]
+            self.ranges.append((Key, Range))
+        return {'Body': io.BytesIO(data)}
+    
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.files[Key] = Body
+
+@pytest.fixture
+def alerts_table():
+    """Table that remembers written alerts: batch reads see them and conditional puts fail on them"""
+    stored = {}
+    
+    def put_item(TableName, Item, ConditionExpression):
+        if Item['transaction_id'] in stored:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'exists'}}, 'PutItem')
+        stored[Item['transaction_id']] = Item
+    
+    def batch_get_item(RequestItems):
+        keys = RequestItems['test-table']['Keys']
+        return {'Responses': {'test-table': [
+            {'transaction_id': key['transaction_id']} for key in keys if key['transaction_id'] in stored
+        ]}}
+    
+    def batch_write_item(RequestItems):
+        for request in RequestItems['test-table']:
+            item = request['PutRequest']['Item']
+            stored[item['transaction_id']] = item
+        return {'UnprocessedItems': {}}
+    
+    table = Mock()
+    table.name = 'test-table'
+    table.meta.client.put_item.side_effect = put_item
+    table.meta.client.batch_get_item.side_effect = batch_get_item
+    table.meta.client.batch_write_item.side_effect = batch_write_item
+    table.stored = stored
+    return table
+
+class TestIncrementalProcessing:
+    
+    RESULTS = """transaction_id,customer_id,amount,timestamp,anomaly_score
+TXN001,CUST001,5000.00,2025-01-15 10:30:00,3.5
+TXN002,CUST002,1200.00,2025-01-15 14:20:00,1.2
+"""
+    
+    def _run(self, mock_boto3, s3, table):
+        mock_boto3.client.return_value = s3
+        mock_boto3.resource.return_value.Table.return_value = table
+        return json.loads(lambda_handler({}, {})['body'])
+    
+    @patch.dict(os.environ, {'S3_BUCKET': 'test-bucket', 'DYNAMODB_TABLE': 'test-table',
+                             'INCREMENTAL': 'true', 'SCORED_INPUT': 'joined'})
+    @patch('aws_clients.boto3')
+    def test_second_run_reads_only_appended_rows(self, mock_boto3, alerts_table):
+        s3 = FakeS3({'scored/anomaly_results.csv': self.RESULTS})
+        first = self._run(mock_boto3, s3, alerts_table)
+        first_size = len(self.RESULTS)
+        
+        s3.files['scored/anomaly_results.csv'] += b"TXN003,CUST003,8500.00,2025-01-15 18:45:00,4.8\n"
+        second = self._run(mock_boto3, s3, alerts_table)
+        
+        assert first['alerts_written'] == 1
+        assert first['incremental']['checkpoint_saved'] is True
+        assert second['alerts_written'] == 1
+        assert second['incremental']['resumed_at'] == {'scored/anomaly_results.csv': first_size}
+        assert ('scored/anomaly_results.csv', f'bytes={first_size}-') in s3.ranges
+        assert sorted(alerts_table.stored) == ['TXN001', 'TXN003']
+        assert alerts_table.stored['TXN003']['customer_id'] == 'CUST003'
+        assert alerts_table.meta.client.batch_write_item.call_count == 2
+    
+    @patch.dict(os.environ, {'S3_BUCKET': 'test-bucket', 'DYNAMODB_TABLE': 'test-table',
+                             'INCREMENTAL': 'true', 'SCORED_INPUT': 'joined'})
+    @patch('aws_clients.boto3')
+    def test_unchanged_file_writes_nothing(self, mock_boto3, alerts_table):
+        s3 = FakeS3({'scored/anomaly_results.csv': self.RESULTS})
+        self._run(mock_boto3, s3, alerts_table)
+        
+        second = self._run(mock_boto3, s3, alerts_table)
+        
+        assert second['alerts_written'] == 0
+        assert alerts_table.meta.client.batch_write_item.call_count == 1
+    
+    @patch.dict(os.environ, {'S3_BUCKET': 'test-bucket', 'DYNAMODB_TABLE': 'test-table',
+                             'METRICS_TABLE': 'test-metrics', 'INCREMENTAL': 'true', 'SCORED_INPUT': 'joined'})
+    @patch('aws_clients.boto3')
+    def test_replaced_file_is_reread_without_overwriting(self, mock_boto3, alerts_table):
+        """Test that a rewritten file starts over but existing alerts are skipped, not reset or re-counted"""
+        s3 = FakeS3({'scored/anomaly_results.csv': self.RESULTS})
+        metrics_table = Mock()
+        tables = {'test-table': alerts_table, 'test-metrics': metrics_table}
+        mock_boto3.client.return_value = s3
+        mock_boto3.resource.return_value.Table.side_effect = tables.get
+        lambda_handler({}, {})
+        alerts_table.stored['TXN001']['status'] = 'CONFIRMED_FRAUD'
+        
+        s3.files['scored/anomaly_results.csv'] = (
+            "transaction_id,customer_id,amount,timestamp,anomaly_score\n"
+            "TXN001,CUST001,5000.00,2025-01-15 10:30:00,3.5\n"
+            "TXN004,CUST004,700.00,2025-01-16 09:00:00,2.9\n"
+            "TXN005,CUST005,900.00,2025-01-16 09:05:00,0.4\n"
+        ).encode()
+        body = json.loads(lambda_handler({}, {})['body'])
+        
+        assert body['incremental']['resumed_at'] == {'scored/anomaly_results.csv': 0}
+        assert body['incremental']['skipped_existing'] == 1
+        assert body['alerts_written'] == 1
+        assert alerts_table.stored['TXN001']['status'] == 'CONFIRMED_FRAUD'
+        second_flush = metrics_table.update_item.call_args_list[2][1]['ExpressionAttributeValues']
+        assert second_flush[':alerts'] == 1
+    
+    @patch.dict(os.environ, {'S3_BUCKET': 'test-bucket', 'DYNAMODB_TABLE': 'test-table',
+                             'INCREMENTAL': 'true', 'SCORED_INPUT': 'joined'})
+    @patch('aws_clients.boto3')
+    def test_failed_writes_keep_checkpoint(self, mock_boto3):
+        s3 = FakeS3({'scored/anomaly_results.csv': self.RESULTS})
+        table = Mock()
+        table.name = 'test-table'
+        table.meta.client.batch_get_item.return_value = {'Responses': {}}
+        table.meta.client.batch_write_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException', 'Message': 'bad item'}}, 'BatchWriteItem'
+        )
+        
+        body = self._run(mock_boto3, s3, table)
+        
+        assert body['failed_items'] == 1
+        assert body['incremental']['checkpoint_saved'] is False
+        assert 'checkpoints/fraud-processor.json' not in s3.files
+    
+    def test_split_files_find_details_before_checkpoint(self):
+        """Test that new scores still get details that were written before the checkpoint"""
+        s3 = FakeS3({
+            'scored/anomaly_scores.csv': "transaction_id,anomaly_score\nTXN001,3.5\n",
+            'scored/anomaly_results.csv': "transaction_id,customer_id,amount,timestamp\n"
+                                          "TXN001,CUST001,5000.00,2025-01-15 10:30:00\n"
+                                          "TXN002,CUST002,1200.00,2025-01-15 14:20:00\n"
+        })
+        reads = {key: plan_incremental_read(s3, 'test-bucket', key) for key in s3.files}
+        list(iter_fraud_alerts(s3, 'test-bucket', reads=reads))
+        checkpoint = {
+            key: dict(read, tail_digest=tail_digest(s3, 'test-bucket', key, read['size']))
+            for key, read in reads.items()
+        }
+        
+        s3.files['scored/anomaly_scores.csv'] += b"TXN002,4.1\n"
+        reads = {key: plan_incremental_read(s3, 'test-bucket', key, checkpoint[key]) for key in s3.files}
+        alerts = list(iter_fraud_alerts(s3, 'test-bucket', reads=reads))
+        
+        assert reads['scored/anomaly_results.csv']['start'] == reads['scored/anomaly_results.csv']['size']
+        assert [alert['transaction_id'] for alert in alerts] == ['TXN002']
+        assert alerts[0]['customer_id'] == 'CUST002'
+
+class TestScoredObjectEvents:
+    
+    PART = """transaction_id,customer_id,amount,timestamp,anomaly_score
+{0}1,CUST001,5000.00,2025-01-15 10:30:00,3.5
+{0}2,CUST002,1200.00,2025-01-15 14:20:00,1.2
+"""
+    
+    @staticmethod
+    def _event(s3, *keys):
+        return {'Records': [
+            {'eventSource': 'aws:s3', 'eventName': 'ObjectCreated:Put',
+             's3': {'bucket': {'name': 'test-bucket'},
+                    'object': {'key': key.replace(' ', '+'),
+                               'eTag': s3.etag(key).strip('"') if key in s3.files else 'gone'}}}
+            for key in keys
+        ]}
+    
+    @pytest.fixture
+    def env(self, alerts_table):
+        with patch.dict(os.environ, {'S3_BUCKET': 'test-bucket', 'DYNAMODB_TABLE': 'test-table'}), \
+                patch('aws_clients.boto3') as mock_boto3:
+            mock_boto3.resource.return_value.Table.return_value = alerts_table
+            yield mock_boto3
+    
+    def test_each_part_processed_independently(self, env, alerts_table):
+        s3 = FakeS3({
+            'scored/part 0.csv': self.PART.format('TXNA'),
+            'scored/part-1.csv': self.PART.format('TXNB'),
+            'scored/anomaly_scores.csv': "transaction_id,anomaly_score\nTXNC1,9.0\n",
+            'scored/': ''
+        })
+        env.client.return_value = s3
+        
+        result = lambda_handler(self._event(s3, 'scored/part 0.csv', 'scored/part-1.csv',
+                                            'scored/anomaly_scores.csv', 'scored/'), {})
+        body = json.loads(result['body'])
+        
+        assert result['statusCode'] == 200
+        assert [o['key'] for o in body['objects']] == ['scored/part 0.csv', 'scored/part-1.csv']
+        assert body['alerts_written'] == 2
+        assert sorted(alerts_table.stored) == ['TXNA1', 'TXNB1']
+        assert alerts_table.stored['TXNA1']['customer_id'] == 'CUST001'
+        assert 'checkpoints/processed/scored/part 0.csv.json' in s3.files
+    
+    def test_redelivered_event_is_a_no_op(self, env, alerts_table):
+        s3 = FakeS3({'scored/part-0.csv': self.PART.format('TXNA')})
+        env.client.return_value = s3
+        event = self._event(s3, 'scored/part-0.csv')
+        
+        lambda_handler(event, {})
+        body = json.loads(lambda_handler(event, {})['body'])
+        
+        assert body['objects'][0]['status'] == 'already_processed'
+        assert alerts_table.meta.client.batch_write_item.call_count == 1
+    
+    def test_overwritten_object_is_superseded(self, env, alerts_table):
+        s3 = FakeS3({'scored/part-0.csv': self.PART.format('TXNA')})
+        env.client.return_value = s3
+        event = self._event(s3, 'scored/part-0.csv')
+        s3.files['scored/part-0.csv'] = self.PART.format('TXNZ').encode()
+        
+        body = json.loads(lambda_handler(event, {})['body'])
+        
+        assert body['objects'][0]['status'] == 'superseded'
+        assert alerts_table.stored == {}
+    
+    def test_failed_writes_raise_for_retry(self, env, alerts_table):
+        s3 = FakeS3({'scored/part-0.csv': self.PART.format('TXNA')})
+        env.client.return_value = s3
+        alerts_table.meta.client.batch_write_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException', 'Message': 'bad item'}}, 'BatchWriteItem'
+        )
+        
+        with pytest.raises(RuntimeError, match='scored/part-0.csv'):
+            lambda_handler(self._event(s3, 'scored/part-0.csv'), {})
+        assert not any(key.startswith('checkpoints/') for key in s3.files)
+    
+    def test_event_without_etag_uses_current_version(self, env, alerts_table):
+        """Test that a record without an eTag is pinned to the object's current ETag, not '"None"'"""
+        s3 = FakeS3({'scored/part-0.csv': self.PART.format('TXNA')})
+        env.client.return_value = s3
+        event = self._event(s3, 'scored/part-0.csv')
+        del event['Records'][0]['s3']['object']['eTag']
+        
+        body = json.loads(lambda_handler(event, {})['body'])
+        
+        assert body['objects'][0]['status'] == 'processed'
+        assert sorted(alerts_table.stored) == ['TXNA1']
+        marker = json.loads(s3.files['checkpoints/processed/scored/part-0.csv.json'])
+        assert marker['etag'] == s3.etag('scored/part-0.csv').strip('"')
+    
+    def test_part_without_scores_is_skipped_not_marked(self, env, alerts_table):
+        s3 = FakeS3({'scored/transactions.csv.out': '{"score": 1.7}\n{"score": 0.4}\n'})
+        env.client.return_value = s3
+        
+        result = lambda_handler(self._event(s3, 'scored/transactions.csv.out'), {})
+        body = json.loads(result['body'])
+        
+        assert result['statusCode'] == 200
+        assert body['objects'][0]['status'] == 'skipped'
+        assert body['objects'][0]['missing_columns'] == ['transaction_id', 'anomaly_score']
+        assert not any(key.startswith('checkpoints/') for key in s3.files)
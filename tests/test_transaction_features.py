@@ -0,0 +1,143 @@
+import pytest
+import io
+import json
+import numpy as np
+from unittest.mock import Mock
+from botocore.exceptions import ClientError
+import sys
+import os
+from datetime import datetime
+
+# The feature pipeline lives with the Glue scripts that also import it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
+
+from transaction_features import (
+    FEATURE_COLUMNS, RCF_FEATURE_COLUMNS, UNKNOWN_CODE, ENCODINGS_KEY, FeatureEncodings,
+    compute_features, feature_matrix, load_encodings, save_encodings, add_customer_features
+)
+
+class TestTransactionFeatures:
+    
+    @pytest.fixture
+    def transactions(self):
+        """Columns as the scorers read them: strings straight from the CSV"""
+        return {
+            'amount': np.array([100.0, 5000.0, 200.0, 10000.0]),
+            'country': np.array(['US', 'UK', 'US', 'FR'], dtype=object),
+            'merchant_category': np.array(['grocery', 'retail', 'gas', 'online'], dtype=object),
+            'timestamp': np.array([
+                '2025-01-15 10:30:00',
+                '2025-01-15 14:20:00',
+                '2025-01-19 18:45:00',
+                '2025-01-20 00:15:00'
+            ], dtype=object)
+        }
+    
+    def test_time_features(self, transactions):
+        """Hour and Monday-based day of week, as pandas .dt.hour / .dt.dayofweek give them"""
+        features = compute_features(transactions, FeatureEncodings().fit(transactions))
+        
+        assert features['transaction_hour'].tolist() == [10, 14, 18, 0]
+        # Wednesday, Wednesday, Sunday, Monday
+        assert features['day_of_week'].tolist() == [2, 2, 6, 0]
+    
+    def test_first_fit_matches_label_encoder(self, transactions):
+        """Sorted codes, the same numbers LabelEncoder assigned before"""
+        encodings = FeatureEncodings().fit(transactions)
+        features = compute_features(transactions, encodings)
+        
+        assert encodings.vocabularies['country'] == {'FR': 0, 'UK': 1, 'US': 2}
+        assert features['country_encoded'].tolist() == [2, 1, 2, 0]
+        assert features['category_encoded'].tolist() == [1, 3, 0, 2]
+    
+    def test_refit_keeps_existing_codes(self, transactions):
+        """New categories are appended, so earlier models still read the same codes"""
+        encodings = FeatureEncodings().fit(transactions)
+        encodings.fit({'country': ['AU', 'US'], 'merchant_category': ['atm']})
+        
+        assert encodings.vocabularies['country'] == {'FR': 0, 'UK': 1, 'US': 2, 'AU': 3}
+        assert encodings.encode('merchant_category', ['atm', 'grocery']).tolist() == [4, 1]
+    
+    def test_unseen_category_gets_unknown_code(self, transactions):
+        encodings = FeatureEncodings().fit(transactions)
+        
+        assert encodings.encode('country', ['JP', 'UK']).tolist() == [UNKNOWN_CODE, 1]
+    
+    def test_feature_matrix_column_order(self, transactions):
+        features = compute_features(transactions, FeatureEncodings().fit(transactions))
+        
+        matrix = feature_matrix(features)
+        rcf = feature_matrix(features, RCF_FEATURE_COLUMNS)
+        
+        assert matrix.shape == (4, len(FEATURE_COLUMNS))
+        assert matrix.dtype == np.float64
+        assert matrix[1].tolist() == [5000.0, 14.0, 1.0, 3.0, 2.0]
+        assert rcf.shape == (4, 4)
+    
+    def test_encodings_round_trip_through_s3(self, transactions):
+        encodings = FeatureEncodings().fit(transactions)
+        s3 = Mock()
+        
+        save_encodings(s3, 'test-bucket', encodings)
+        body = s3.put_object.call_args[1]['Body']
+        s3.get_object.return_value = {'Body': io.BytesIO(body.encode())}
+        loaded = load_encodings(s3, 'test-bucket')
+        
+        assert s3.put_object.call_args[1]['Key'] == ENCODINGS_KEY
+        assert json.loads(body)['vocabularies'] == encodings.vocabularies
+        assert loaded.vocabularies == encodings.vocabularies
+    
+    def test_missing_encodings_start_empty(self):
+        s3 = Mock()
+        s3.get_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'missing'}}, 'GetObject')
+        
+        encodings = load_encodings(s3, 'test-bucket')
+        
+        assert encodings.vocabularies == {'country': {}, 'merchant_category': {}}
+
+class TestCustomerFeatures:
+    
+    # C1's rows sit exactly on, and one second past, the 1h and 24h window edges
+    HISTORY = [
+        ('T1', 'C1', 100.0, 'US', '2025-01-15 10:00:00'),
+        ('T2', 'C1', 200.0, 'US', '2025-01-15 11:00:00'),
+        ('T3', 'C1', 300.0, 'UK', '2025-01-15 11:00:01'),
+        ('T4', 'C1', 400.0, 'US', '2025-01-16 10:00:00'),
+        ('T5', 'C1', 1000.0, 'UK', '2025-01-16 10:00:01'),
+        ('U1', 'C2', 50.0, 'FR', '2025-01-15 10:30:00'),
+    ]
+    
+    @pytest.fixture
+    def features(self, spark):
+        rows = [(txn, customer, amount, country, datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S'))
+                for txn, customer, amount, country, timestamp in self.HISTORY]
+        df = spark.createDataFrame(rows, ['transaction_id', 'customer_id', 'amount', 'country', 'timestamp'])
+        return {row['transaction_id']: row for row in add_customer_features(df).collect()}
+    
+    def test_rolling_counts_include_window_boundaries(self, features):
+        """A transaction exactly 1h (24h) earlier is inside the window; one second more is not"""
+        counts = {txn: (row['txn_count_1h'], row['txn_count_24h']) for txn, row in features.items()}
+        
+        assert counts == {
+            'T1': (1, 1),
+            'T2': (2, 2),
+            'T3': (2, 3),
+            'T4': (1, 4),
+            'T5': (2, 4),
+            'U1': (1, 1),
+        }
+    
+    def test_amount_zscore_against_earlier_amounts(self, features):
+        """The z-score uses only earlier amounts of the same customer, and is 0 until two exist"""
+        assert features['T1']['amount_zscore'] == 0.0
+        assert features['T2']['amount_zscore'] == 0.0
+        assert features['T3']['amount_zscore'] == pytest.approx(150 / np.std([100, 200], ddof=1))
+        assert features['T4']['amount_zscore'] == pytest.approx(2.0)
+        assert features['T5']['amount_zscore'] == pytest.approx(750 / np.std([100, 200, 300, 400], ddof=1))
+        assert features['U1']['amount_zscore'] == 0.0
+    
+    def test_new_country_only_for_existing_customers(self, features):
+        """A customer's first transaction is not a new country; a first visit to a later country is"""
+        assert {txn: row['is_new_country'] for txn, row in features.items()} == {
+            'T1': 0, 'T2': 0, 'T3': 1, 'T4': 0, 'T5': 0, 'U1': 0
+        }
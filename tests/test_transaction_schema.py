@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+
+# The schema module imports pyspark at the top, as the Glue job does
+pytest.importorskip('pyspark')
+
+# The schema lives with the Glue job that imports it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'glue_scripts'))
+
+from transaction_schema import read_transactions, split_transactions
+
+TRANSACTIONS_CSV = """transaction_id,customer_id,amount,country,merchant_category,timestamp
+TXN001,CUST001,1250.50,US,grocery,2025-01-15 14:30:00
+TXN002,CUST002,not-a-number,UK,retail,2025-01-15 02:15:00
+TXN003,CUST003,89.99,FR,online,2025-01-16 09:05:00
+"""
+
+class TestQuarantineSplit:
+    
+    @pytest.fixture
+    def outputs(self, spark, tmp_path):
+        """Run the clean-transactions read and split, writing both outputs the way the job does"""
+        source = tmp_path / 'transactions.csv'
+        source.write_text(TRANSACTIONS_CSV)
+        cleaned_path = str(tmp_path / 'cleaned')
+        quarantine_path = str(tmp_path / 'cleaned_quarantine')
+        
+        clean, quarantined = split_transactions(read_transactions(spark, str(source)))
+        clean.write.mode('overwrite').partitionBy('transaction_date').parquet(cleaned_path)
+        quarantined.write.mode('append').partitionBy('quarantine_date').json(quarantine_path)
+        
+        return spark.read.parquet(cleaned_path), spark.read.json(quarantine_path)
+    
+    def test_malformed_row_is_quarantined_not_cleaned(self, outputs):
+        cleaned, quarantined = outputs
+        
+        assert sorted(row['transaction_id'] for row in cleaned.collect()) == ['TXN001', 'TXN003']
+        rejected = quarantined.collect()
+        assert [row['transaction_id'] for row in rejected] == ['TXN002']
+        assert rejected[0]['quarantine_reason'] == 'malformed'
+        assert 'not-a-number' in rejected[0]['_corrupt_record']
+    
+    def test_clean_rows_are_typed_and_partitioned_by_date(self, outputs):
+        cleaned, _ = outputs
+        
+        rows = {row['transaction_id']: row for row in cleaned.collect()}
+        assert rows['TXN001']['amount'] == 1250.50
+        assert str(rows['TXN001']['transaction_date']) == '2025-01-15'
+        assert str(rows['TXN003']['transaction_date']) == '2025-01-16'
+        assert rows['TXN001']['transaction_hour'] == 14
+        assert '_corrupt_record' not in cleaned.columns